@@ -0,0 +1,43 @@
+"""per-candidate log count and per-category score aggregates
+
+Revision ID: add_candidate_log_aggregates
+Revises: add_candidate_telegram_id_unique
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_candidate_log_aggregates'
+down_revision = 'add_candidate_telegram_id_unique'
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = (
+    'candidate_daily_stats', 'candidate_activity_daily', 'interview_category_daily',
+    'candidate_score_stats', 'candidate_category_stats'
+)
+
+
+def upgrade():
+    op.add_column('candidate_score_stats', sa.Column('log_count', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table('candidate_category_stats',
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('score_sum', sa.Integer(), nullable=False),
+    sa.Column('score_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('candidate_id', 'category')
+    )
+    # Новые счётчики нужно посчитать с нуля: пустые агрегаты пересчитает install_rollups
+    # при следующем старте приложения (или python -m backend.app.services.metrics_rollup --rebuild)
+    for table in ROLLUP_TABLES:
+        op.execute(f"DELETE FROM {table}")
+
+
+def downgrade():
+    op.drop_table('candidate_category_stats')
+    with op.batch_alter_table('candidate_score_stats') as batch_op:
+        batch_op.drop_column('log_count')
@@ -0,0 +1,71 @@
+"""unique partial index on candidates.telegram_id and idempotency keys
+
+Revision ID: add_candidate_telegram_id_unique
+Revises: add_notion_sync_tables
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_candidate_telegram_id_unique'
+down_revision = 'add_notion_sync_tables'
+branch_labels = None
+depends_on = None
+
+# Кандидаты с тем же telegram_id и меньшим id - дубликаты последней записи
+DUPLICATES = """
+    SELECT c.id FROM candidates c
+    WHERE c.telegram_id IS NOT NULL
+      AND c.id < (SELECT MAX(k.id) FROM candidates k WHERE k.telegram_id = c.telegram_id)
+"""
+KEEPER = """
+    (SELECT MAX(k.id) FROM candidates k
+     WHERE k.telegram_id = (SELECT c.telegram_id FROM candidates c WHERE c.id = {table}.candidate_id))
+"""
+
+
+def upgrade():
+    op.execute("UPDATE candidates SET telegram_id = NULL WHERE TRIM(telegram_id) = ''")
+
+    # Дубликаты сливаются в последнюю запись (с самыми свежими результатами):
+    # логи интервью и комментарии переносятся, остальные строки удаляются
+    connection = op.get_bind()
+    merged = connection.execute(sa.text(f"SELECT COUNT(*) FROM ({DUPLICATES}) d")).scalar()
+    if merged:
+        for table in ('interview_logs', 'comments'):
+            op.execute(
+                f"UPDATE {table} SET candidate_id = {KEEPER.format(table=table)} "
+                f"WHERE candidate_id IN ({DUPLICATES})"
+            )
+        op.execute(f"DELETE FROM notion_candidate_snapshots WHERE candidate_id IN ({DUPLICATES})")
+        op.execute(f"DELETE FROM candidates WHERE id IN (SELECT id FROM ({DUPLICATES}) d)")
+        # Агрегаты метрик пересчитает install_rollups при следующем старте приложения
+        for table in ('candidate_daily_stats', 'candidate_activity_daily', 'interview_category_daily', 'candidate_score_stats'):
+            op.execute(f"DELETE FROM {table}")
+
+    op.drop_index('ix_candidates_telegram_id', table_name='candidates')
+    op.create_index(
+        'uq_candidates_telegram_id', 'candidates', ['telegram_id'], unique=True,
+        postgresql_where=sa.text('telegram_id IS NOT NULL'),
+        sqlite_where=sa.text('telegram_id IS NOT NULL')
+    )
+    op.create_table('idempotency_keys',
+    sa.Column('scope', sa.String(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('fingerprint', sa.String(), nullable=True),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('scope', 'key')
+    )
+    op.create_index('ix_idempotency_keys_created_at', 'idempotency_keys', ['created_at'], unique=False)
+
+
+def downgrade():
+    # Слитые дубликаты не восстанавливаются
+    op.drop_index('ix_idempotency_keys_created_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
+    op.drop_index('uq_candidates_telegram_id', table_name='candidates')
+    op.create_index('ix_candidates_telegram_id', 'candidates', ['telegram_id'], unique=False)
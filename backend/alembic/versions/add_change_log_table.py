@@ -0,0 +1,36 @@
+"""change log for the /api/changes feed
+
+Revision ID: add_change_log_table
+Revises: add_candidate_log_aggregates
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_change_log_table'
+down_revision = 'add_candidate_log_aggregates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Журнал заполняется текущими записями при старте приложения (install_change_log)
+    op.create_table('change_log',
+    sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('txid', sa.BigInteger(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=True),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_change_log_txid_seq', 'change_log', ['txid', 'seq'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_change_log_txid_seq', table_name='change_log')
+    op.drop_table('change_log')
@@ -0,0 +1,51 @@
+"""add indexes for hot filter columns
+
+Revision ID: add_hot_filter_indexes
+Revises: add_pending_admins_table
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_filter_indexes'
+down_revision = 'add_pending_admins_table'
+branch_labels = None
+depends_on = None
+
+
+# (имя индекса, таблица, колонки)
+INDEXES = [
+    ('ix_candidates_status_created_at', 'candidates', ['status', 'created_at']),
+    ('ix_candidates_created_at_id', 'candidates', ['created_at', 'id']),
+    ('ix_candidates_last_action_date', 'candidates', ['last_action_date']),
+    ('ix_candidates_telegram_id', 'candidates', ['telegram_id']),
+    ('ix_candidates_telegram_username', 'candidates', ['telegram_username']),
+    ('ix_interview_logs_candidate_id_score', 'interview_logs', ['candidate_id', 'score']),
+    ('ix_interview_logs_category_score', 'interview_logs', ['category', 'score']),
+    ('ix_comments_candidate_id', 'comments', ['candidate_id']),
+    ('ix_users_is_admin', 'users', ['is_admin']),
+    ('ix_users_telegram_username', 'users', ['telegram_username']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY не блокирует запись в PostgreSQL, но требует работы вне транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                if_not_exists=True,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True
+            )
@@ -0,0 +1,55 @@
+"""add metrics rollup tables
+
+Revision ID: add_metrics_rollup_tables
+Revises: add_hot_filter_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_metrics_rollup_tables'
+down_revision = 'add_hot_filter_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблицы заполняются при старте приложения (install_rollups)
+    # или вручную: python -m backend.app.services.metrics_rollup --rebuild
+    op.create_table('candidate_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+    op.create_table('candidate_activity_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('interview_category_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('score_sum', sa.Integer(), nullable=False),
+    sa.Column('score_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'category')
+    )
+    op.create_table('candidate_score_stats',
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Integer(), nullable=False),
+    sa.Column('score_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('candidate_id')
+    )
+    op.create_index('ix_candidate_score_stats_score_count', 'candidate_score_stats', ['score_count'])
+
+
+def downgrade():
+    op.drop_index('ix_candidate_score_stats_score_count', table_name='candidate_score_stats')
+    op.drop_table('candidate_score_stats')
+    op.drop_table('interview_category_daily')
+    op.drop_table('candidate_activity_daily')
+    op.drop_table('candidate_daily_stats')
@@ -0,0 +1,41 @@
+"""add notion sync state and snapshot tables
+
+Revision ID: add_notion_sync_tables
+Revises: add_telegram_outbox_table
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_notion_sync_tables'
+down_revision = 'add_telegram_outbox_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notion_sync_state',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('watermark', sa.DateTime(), nullable=True),
+    sa.Column('watermark_id', sa.Integer(), nullable=False),
+    sa.Column('locked_by', sa.String(), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('notion_candidate_snapshots',
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('properties', sa.Text(), nullable=False),
+    sa.Column('synced_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('candidate_id')
+    )
+    op.create_index('ix_candidates_updated_at_id', 'candidates', ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_candidates_updated_at_id', table_name='candidates')
+    op.drop_table('notion_candidate_snapshots')
+    op.drop_table('notion_sync_state')
@@ -0,0 +1,39 @@
+"""add telegram_outbox table
+
+Revision ID: add_telegram_outbox_table
+Revises: add_metrics_rollup_tables
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_telegram_outbox_table'
+down_revision = 'add_metrics_rollup_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('telegram_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_telegram_outbox_id'), 'telegram_outbox', ['id'], unique=False)
+    op.create_index('ix_telegram_outbox_status_next_attempt_at', 'telegram_outbox', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_telegram_outbox_status_next_attempt_at', table_name='telegram_outbox')
+    op.drop_index(op.f('ix_telegram_outbox_id'), table_name='telegram_outbox')
+    op.drop_table('telegram_outbox')
@@ -0,0 +1,34 @@
+"""drive notion sync from the change log instead of an updated_at watermark
+
+Revision ID: notion_sync_change_log_cursor
+Revises: add_change_log_table
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'notion_sync_change_log_cursor'
+down_revision = 'add_change_log_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Позиция начинается с начала журнала: кандидаты, которых водяной знак мог пропустить, будут
+    # отправлены, а уже синхронизированные отсеются по снимкам свойств без запросов к Notion
+    with op.batch_alter_table('notion_sync_state') as batch_op:
+        batch_op.add_column(sa.Column('cursor_txid', sa.BigInteger(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('cursor_seq', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.drop_column('watermark')
+        batch_op.drop_column('watermark_id')
+
+
+def downgrade():
+    with op.batch_alter_table('notion_sync_state') as batch_op:
+        batch_op.add_column(sa.Column('watermark', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('watermark_id', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.drop_column('cursor_seq')
+        batch_op.drop_column('cursor_txid')
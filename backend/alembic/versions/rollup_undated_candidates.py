@@ -0,0 +1,34 @@
+"""count candidates without created_at in the metrics rollups
+
+Revision ID: rollup_undated_candidates
+Revises: notion_sync_change_log_cursor
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'rollup_undated_candidates'
+down_revision = 'notion_sync_change_log_cursor'
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = (
+    'candidate_daily_stats', 'candidate_activity_daily', 'interview_category_daily',
+    'candidate_score_stats', 'candidate_category_stats'
+)
+
+
+def upgrade():
+    # Кандидаты без created_at теперь попадают в агрегаты (отдельным днём): пустые агрегаты
+    # пересчитает install_rollups при следующем старте приложения
+    # (или python -m backend.app.services.metrics_rollup --rebuild)
+    for table in ROLLUP_TABLES:
+        op.execute(f"DELETE FROM {table}")
+
+
+def downgrade():
+    for table in ROLLUP_TABLES:
+        op.execute(f"DELETE FROM {table}")
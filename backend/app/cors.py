@@ -0,0 +1,48 @@
+import os
+import re
+
+# Настройки CORS для обоих main.py. Список источников разбирается один раз при импорте: "*" разрешает
+# все источники (так было и раньше - 25 адресов localhost рядом с "*" ни на что не влияли), иначе
+# точные адреса попадают в frozenset, а шаблоны вида https://*.example.com - в одно регулярное
+# выражение, которое CORSMiddleware компилирует при старте. Проверка Origin - поиск в множестве
+# и, если есть шаблоны, один fullmatch вместо перебора списка.
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")  # через запятую
+
+def compile_origins(origins) -> dict:
+    """allow_origins/allow_origin_regex для CORSMiddleware из списка источников"""
+    origins = {origin.strip().rstrip("/") for origin in origins if origin.strip()}
+    if "*" in origins:
+        return {"allow_origins": frozenset(["*"]), "allow_origin_regex": None}
+    exact = frozenset(origin for origin in origins if "*" not in origin)
+    # Поддомен в шаблоне - одна или несколько меток без "/" и ":"
+    patterns = sorted(re.escape(origin).replace(r"\*", r"[^/:.]+(?:\.[^/:.]+)*") for origin in origins - exact)
+    return {"allow_origins": exact, "allow_origin_regex": "|".join(patterns) if patterns else None}
+
+CORS_OPTIONS = {
+    **compile_origins(CORS_ORIGINS.split(",")),
+    "allow_credentials": True,
+    "allow_methods": ["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"],
+    "allow_headers": ["*"],
+    # Content-Length, Cache-Control, Last-Modified, Expires, Pragma браузер и так отдаёт скриптам
+    "expose_headers": [
+        "Content-Range",
+        "X-Total-Count",
+        "X-Page-Count",
+        "X-Current-Page",
+        "X-Next-Page",
+        "X-Prev-Page",
+        "X-Total-Pages",
+        "X-Has-Next",
+        "X-Has-Prev",
+        "X-Request-ID",
+        "X-Response-Time",
+        "X-Rate-Limit-Limit",
+        "X-Rate-Limit-Remaining",
+        "X-Rate-Limit-Reset",
+        "X-Powered-By",
+        "Server",
+        "Date",
+        "ETag",
+    ],
+    "max_age": 86400,  # 24 часа кэширования preflight запросов
+}
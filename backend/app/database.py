@@ -1,8 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, exc, text, Column, Integer, BigInteger, String, Date, DateTime, Text, Boolean, ForeignKey, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from datetime import datetime
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,16 +16,152 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./hr_admin.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
+def get_async_database_url(url: str) -> str:
+    """Подобрать асинхронный драйвер для URL базы данных"""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+# LISTEN-соединение потока изменений (services/change_stream.py) держится каждым воркером отдельно от пула
+DEDICATED_CONNECTIONS = 1 if ASYNC_DATABASE_URL.startswith("postgresql+asyncpg://") else 0
+
+def get_pool_settings() -> dict:
+    """Параметры пула соединений из окружения.
+
+    Если DB_POOL_SIZE / DB_MAX_OVERFLOW не заданы, пул делит бюджет
+    DB_MAX_CONNECTIONS (за вычетом DB_RESERVED_CONNECTIONS) поровну между
+    WEB_CONCURRENCY воркерами, чтобы суммарно не превысить max_connections.
+    Из доли воркера вычитаются его постоянные соединения вне пула
+    (LISTEN потока изменений на PostgreSQL).
+    """
+    workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+    max_connections = _env_int("DB_MAX_CONNECTIONS", 100)
+    reserved = _env_int("DB_RESERVED_CONNECTIONS", 10)
+    per_worker = max(2, (max_connections - reserved) // workers - DEDICATED_CONNECTIONS)
+
+    pool_size = _env_int("DB_POOL_SIZE", max(1, per_worker // 2))
+    max_overflow = _env_int("DB_MAX_OVERFLOW", max(0, per_worker - pool_size))
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+
+class PoolStats:
+    """Счётчики пула соединений текущего воркера"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+pool_stats = PoolStats()
+
+class _TimedPoolMixin:
+    """Замеряет время ожидания свободного соединения в пуле"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+# SQLite работает со своими пулами по умолчанию, настройки нужны только серверным БД
+_use_pool_settings = not DATABASE_URL.startswith("sqlite")
+POOL_SETTINGS = get_pool_settings() if _use_pool_settings else {}
+
+# Синхронный движок нужен для alembic и служебных скриптов: воркеры его не используют, поэтому он не
+# держит пул и не входит в бюджет соединений - каждое соединение закрывается сразу после работы
+engine = create_engine(
+    DATABASE_URL,
+    **({"poolclass": NullPool} if _use_pool_settings else {})
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Асинхронный движок используется всеми роутерами, чтобы не блокировать event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **({"poolclass": TimedAsyncAdaptedQueuePool, **POOL_SETTINGS} if _use_pool_settings else {})
+)
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.record_checkout()
+
+def get_pool_status() -> dict:
+    """Состояние пула асинхронного движка для мониторинга"""
+    pool = async_engine.pool
+    status = {
+        "pid": os.getpid(),
+        "pool_class": type(pool).__name__,
+        "settings": POOL_SETTINGS,
+        "dedicated_connections": DEDICATED_CONNECTIONS,
+    }
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    status.update(pool_stats.snapshot())
+    return status
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def advisory_xact_lock(connection, name: str):
+    """Блокировка PostgreSQL до конца транзакции: разовую работу при старте выполняет один воркер,
+    остальные ждут его коммита и видят результат (синхронное соединение)"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": name})
 
 # Модели данных
 class Candidate(Base):
@@ -30,11 +170,11 @@ class Candidate(Base):
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, nullable=False)
     name = Column(String, nullable=True)  # Добавляем поле name
-    telegram_username = Column(String, nullable=True)
+    telegram_username = Column(String, nullable=True, index=True)
     telegram_id = Column(String, nullable=True)
     results = Column(String, nullable=True)
     status = Column(String, default="ожидает")  # ожидает, берем, не берем
-    last_action_date = Column(DateTime, default=datetime.utcnow)
+    last_action_date = Column(DateTime, default=datetime.utcnow, index=True)
     last_action_type = Column(String, nullable=True)
     notion_id = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -43,6 +183,21 @@ class Candidate(Base):
     # Отношения
     interview_logs = relationship("InterviewLog", back_populates="candidate")
     comments = relationship("Comment", back_populates="candidate")
+    
+    __table_args__ = (
+        # Фильтр по статусу за период (overview, status-distribution)
+        Index("ix_candidates_status_created_at", "status", "created_at"),
+        # Фильтр по периоду и keyset-пагинация списка
+        Index("ix_candidates_created_at_id", "created_at", "id"),
+        # Водяной знак синхронизации с Notion
+        Index("ix_candidates_updated_at_id", "updated_at", "id"),
+        # Один кандидат на telegram_id: повторные результаты обновляют запись (services/candidate_upsert.py)
+        Index(
+            "uq_candidates_telegram_id", "telegram_id", unique=True,
+            postgresql_where=text("telegram_id IS NOT NULL"),
+            sqlite_where=text("telegram_id IS NOT NULL")
+        ),
+    )
 
 class InterviewLog(Base):
     __tablename__ = "interview_logs"
@@ -56,12 +211,19 @@ class InterviewLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     candidate = relationship("Candidate", back_populates="interview_logs")
+    
+    __table_args__ = (
+        # Логи кандидата и средний балл (create_interview_log, top-candidates)
+        Index("ix_interview_logs_candidate_id_score", "candidate_id", "score"),
+        # Статистика по категориям (interview-stats)
+        Index("ix_interview_logs_category_score", "category", "score"),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
     
     id = Column(Integer, primary_key=True, index=True)
-    candidate_id = Column(Integer, ForeignKey("candidates.id"))
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), index=True)
     hr_comment = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -77,8 +239,8 @@ class User(Base):
     email = Column(String, unique=True, nullable=True)  # может быть null для Telegram пользователей
     password = Column(String, nullable=True)  # может быть null для Telegram пользователей
     telegram_id = Column(String, unique=True, nullable=True)
-    telegram_username = Column(String, nullable=True)
-    is_admin = Column(Boolean, default=False)  # флаг администратора
+    telegram_username = Column(String, nullable=True, index=True)
+    is_admin = Column(Boolean, default=False, index=True)  # флаг администратора
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -91,4 +253,110 @@ class PendingAdmin(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Отношение к пользователю, который добавил
-    created_by_user = relationship("User") 
\ No newline at end of file
+    created_by_user = relationship("User")
+
+# Агрегаты для дашборда метрик, обновляются инкрементально (services/metrics_rollup.py)
+class CandidateDailyStat(Base):
+    """Количество кандидатов по дню создания и статусу"""
+    __tablename__ = "candidate_daily_stats"
+    
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class CandidateActivityDaily(Base):
+    """Количество кандидатов по дню последнего действия"""
+    __tablename__ = "candidate_activity_daily"
+    
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class InterviewCategoryDaily(Base):
+    """Сумма и количество оценок по категории и дню создания кандидата"""
+    __tablename__ = "interview_category_daily"
+    
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    score_sum = Column(Integer, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
+
+class CandidateScoreStat(Base):
+    """Количество логов интервью, сумма и количество оценок кандидата"""
+    __tablename__ = "candidate_score_stats"
+    
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    log_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0, index=True)
+
+class CandidateCategoryStat(Base):
+    """Сумма и количество оценок кандидата по категории"""
+    __tablename__ = "candidate_category_stats"
+    
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String, primary_key=True)
+    score_sum = Column(Integer, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
+
+class TelegramOutbox(Base):
+    """Очередь уведомлений Telegram, разбирается фоновым диспетчером (services/telegram_outbox.py)"""
+    __tablename__ = "telegram_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String, nullable=False, default="pending")  # pending, processing, sent, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_telegram_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+class NotionSyncState(Base):
+    """Позиция в журнале изменений и аренда воркера синхронизации с Notion (services/notion_sync.py)"""
+    __tablename__ = "notion_sync_state"
+    
+    name = Column(String, primary_key=True)
+    # (txid, seq) последней обработанной строки change_log, как курсор /api/changes
+    cursor_txid = Column(BigInteger, nullable=False, default=0)
+    cursor_seq = Column(Integer, nullable=False, default=0)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+
+class NotionCandidateSnapshot(Base):
+    """Свойства кандидата, последний раз отправленные в Notion"""
+    __tablename__ = "notion_candidate_snapshots"
+    
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    properties = Column(Text, nullable=False, default="{}")  # JSON
+    synced_at = Column(DateTime, default=datetime.utcnow)
+
+class IdempotencyKey(Base):
+    """Сохранённые ответы на запросы с заголовком Idempotency-Key (services/idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+    
+    scope = Column(String, primary_key=True)  # эндпоинт, к которому относится ключ
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=True)  # sha256 тела запроса
+    response = Column(Text, nullable=True)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ChangeLogEntry(Base):
+    """Журнал изменений кандидатов, логов интервью и комментариев для /api/changes (services/change_log.py)"""
+    __tablename__ = "change_log"
+    
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    txid = Column(BigInteger, nullable=False, default=0)  # txid_current() записавшей транзакции в PostgreSQL
+    entity = Column(String, nullable=False)  # candidate, interview_log, comment
+    entity_id = Column(Integer, nullable=False)
+    candidate_id = Column(Integer, nullable=True)
+    op = Column(String, nullable=False)  # upsert, delete
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_change_log_txid_seq", "txid", "seq"),
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 # Базовые модели
@@ -26,17 +26,21 @@ class CandidateUpdate(BaseModel):
 class Candidate(CandidateBase):
     id: int
     status: str
-    telegram_id: str
+    telegram_id: Optional[str] = None
     results: str
     last_action_date: datetime
     last_action_type: Optional[str] = None
     notion_id: Optional[str] = None
-    created_at: datetime
+    created_at: Optional[datetime] = None  # пусто у старых записей
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+class CandidatePage(BaseModel):
+    items: List[Candidate]
+    next_cursor: Optional[str] = None
+
 # Модели для интервью
 class InterviewLogBase(BaseModel):
     question: str
@@ -55,6 +59,21 @@ class InterviewLog(InterviewLogBase):
     class Config:
         from_attributes = True
 
+class CategoryScore(BaseModel):
+    category: str
+    score_sum: int
+    score_count: int
+    avg_score: float
+
+class CandidateScoreStats(BaseModel):
+    """Накопленные агрегаты логов интервью кандидата"""
+    candidate_id: int
+    log_count: int
+    score_sum: int
+    score_count: int
+    avg_score: float
+    categories: List[CategoryScore]
+
 # Модели для комментариев
 class CommentBase(BaseModel):
     hr_comment: str
@@ -72,12 +91,33 @@ class Comment(CommentBase):
 
 
 
+# Модели журнала изменений
+class Change(BaseModel):
+    seq: int
+    entity: str  # candidate, interview_log, comment
+    id: int
+    candidate_id: Optional[int] = None
+    op: str  # upsert, delete
+    data: Optional[Dict[str, Any]] = None  # текущее состояние записи для upsert
+
+class ChangeFeed(BaseModel):
+    changes: List[Change]
+    next_cursor: str
+    has_more: bool
+
 # Модели для метрик
 class Metrics(BaseModel):
     total_candidates: int
     passed_candidates: int
     test_pass_rate: float
 
+class DashboardMetrics(BaseModel):
+    overview: Metrics
+    distribution: List[Dict[str, Any]]
+    timeline: List[Dict[str, Any]]
+    category_stats: List[Dict[str, Any]]
+    top_candidates: List[Dict[str, Any]]
+
 # Модели для фильтрации
 class CandidateFilter(BaseModel):
     search: Optional[str] = None
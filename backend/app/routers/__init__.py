@@ -1,2 +1,2 @@
 # Routers package
-from . import candidates, metrics, user, telegram_auth, admins, external_api 
\ No newline at end of file
+from . import candidates, metrics, user, telegram_auth, admins, external_api, changes 
\ No newline at end of file
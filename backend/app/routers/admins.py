@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from backend.app.database import get_db, User
 from backend.app.models import UserProfile, AdminCreateRequest
 from backend.app.routers.telegram_auth import get_current_user_from_token
@@ -10,14 +11,14 @@ router = APIRouter()
 
 @router.get("/admins", response_model=List[UserProfile])
 async def get_admins(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token)
 ):
     """Получить список всех администраторов (только для админов)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Недостаточно прав")
     
-    admins = db.query(User).filter(User.is_admin == True).all()
+    admins = (await db.scalars(select(User).where(User.is_admin == True))).all()
     
     return [
         UserProfile(
@@ -33,7 +34,7 @@ async def get_admins(
 @router.post("/admins")
 async def create_admin(
     admin_request: AdminCreateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token)
 ):
     """Создать нового администратора (только для существующих админов)"""
@@ -49,7 +50,7 @@ async def create_admin(
         telegram_username = telegram_username[1:]
     
     # Ищем пользователя по username
-    user = db.query(User).filter(User.telegram_username == telegram_username).first()
+    user = await db.scalar(select(User).where(User.telegram_username == telegram_username))
     if not user:
         raise HTTPException(
             status_code=404, 
@@ -63,8 +64,8 @@ async def create_admin(
         )
     
     user.is_admin = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     logging.info(f"Пользователь {user.name} (@{user.telegram_username}) назначен администратором")
     
@@ -83,7 +84,7 @@ async def create_admin(
 @router.delete("/admins/{user_id}")
 async def remove_admin(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token)
 ):
     """Удалить администратора (только для существующих админов)"""
@@ -94,7 +95,7 @@ async def remove_admin(
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Нельзя удалить самого себя из администраторов")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
@@ -102,8 +103,8 @@ async def remove_admin(
         raise HTTPException(status_code=400, detail="Пользователь не является администратором")
     
     user.is_admin = False
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     logging.info(f"Пользователь {user.name} (@{user.telegram_username}) удален из администраторов")
     
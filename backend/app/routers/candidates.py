@@ -1,85 +1,176 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Body, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Union
 from datetime import datetime
+import base64
+import binascii
+import json
 
-from backend.app.database import get_db, Candidate, InterviewLog, Comment
+from backend.app.database import get_db, Candidate, InterviewLog, Comment, CandidateScoreStat, CandidateCategoryStat
 from backend.app.models import (
-    CandidateCreate, CandidateUpdate, Candidate as CandidateModel,
-    InterviewLogCreate, InterviewLog as InterviewLogModel,
+    CandidateCreate, CandidateUpdate, Candidate as CandidateModel, CandidatePage,
+    InterviewLogCreate, InterviewLog as InterviewLogModel, CandidateScoreStats,
     CommentCreate, Comment as CommentModel,
     CandidateFilter, QuickAction
 )
-from backend.app.services.telegram_service import TelegramService
-from backend.app.services.notion_service import NotionService
+from backend.app.services.telegram_service import TelegramService, get_telegram_service
+from backend.app.services.notion_service import create_notion_task
+from backend.app.services.search_service import SearchService
+from backend.app.services.telegram_outbox import enqueue_notification
+from backend.app.services.candidate_upsert import (
+    candidate_data_from_results, normalize_telegram_id, upsert_candidate, UNCHANGED, RESULT_MESSAGES
+)
+from backend.app.services.candidate_export import export_query, stream_export, EXPORT_MEDIA_TYPES
+from backend.app.services.idempotency import (
+    claim_idempotency_key, store_idempotent_response, request_fingerprint, IdempotencyConflict
+)
 
 router = APIRouter()
 
+def apply_candidate_filters(query, matches, status: Optional[str]):
+    """Применить результаты поиска и фильтр статуса к запросу кандидатов"""
+    if matches is not None:
+        query = query.join(matches, matches.c.candidate_id == Candidate.id)
+    if status:
+        # Фильтруем по всем возможным статусам
+        if status in ["берем", "не берем", "прошёл", "отклонён", "ожидает"]:
+            query = query.where(Candidate.status == status)
+    return query
+
+def encode_cursor(candidate: Candidate, rank: float = None) -> str:
+    """Упаковать позицию в непрозрачный курсор: (rank, id) при поиске, иначе (created_at, id)"""
+    if rank is not None:
+        position = {"r": rank, "i": candidate.id}
+    else:
+        # У старых записей created_at может быть пустым
+        position = {"c": candidate.created_at.isoformat() if candidate.created_at else None, "i": candidate.id}
+    raw = json.dumps(position)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, ranked: bool):
+    """Распаковать курсор в пару (rank, id) для поиска или (created_at или None, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if ranked:
+            return float(data["r"]), int(data["i"])
+        return datetime.fromisoformat(data["c"]) if data["c"] is not None else None, int(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        # В том числе курсор списка без поиска, переданный вместе с search, и наоборот
+        raise HTTPException(status_code=400, detail="Неверный курсор")
+
 @router.get("/count")
 async def get_candidates_count(
     search: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(Candidate)
-    if search:
-        query = query.filter(Candidate.full_name.ilike(f"%{search}%"))
-    if status:
-        # Фильтруем по всем возможным статусам
-        if status in ["берем", "не берем", "прошёл", "отклонён", "ожидает"]:
-            query = query.filter(Candidate.status == status)
-    total = query.count()
+    matches = await SearchService(db).ranked_subquery(search) if search else None
+    query = apply_candidate_filters(select(func.count(Candidate.id)).select_from(Candidate), matches, status)
+    total = await db.scalar(query)
     return {"total": total}
 
-@router.get("/", response_model=List[CandidateModel])
+@router.get("/export")
+async def export_candidates(
+    format: str = Query("csv", description="Формат выгрузки: csv, ndjson, parquet"),
+    search: Optional[str] = Query(None, description="Поиск как в списке кандидатов"),
+    status: Optional[str] = Query(None, description="Фильтр по статусу: берем, не берем"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Выгрузить всех подходящих кандидатов с логами интервью и комментариями потоком"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Неизвестный формат: {format}. Доступны: {', '.join(EXPORT_MEDIA_TYPES)}")
+    matches = await SearchService(db).ranked_subquery(search) if search else None
+    query = apply_candidate_filters(export_query(), matches, status)
+    filename = f"candidates-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream_export(query, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/", response_model=Union[List[CandidateModel], CandidatePage])
 async def get_candidates(
-    search: Optional[str] = Query(None, description="Поиск по ФИО"),
+    search: Optional[str] = Query(None, description="Поиск по ФИО, username, результатам и ответам (с учётом опечаток)"),
     status: Optional[str] = Query(None, description="Фильтр по статусу: берем, не берем"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(
+        None,
+        description="Курсор из next_cursor; пустое значение - первая страница в режиме курсоров"
+    ),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить список кандидатов с фильтрацией"""
-    query = db.query(Candidate)
+    matches = await SearchService(db).ranked_subquery(search) if search else None
+    query = apply_candidate_filters(select(Candidate), matches, status)
     
-    if search:
-        query = query.filter(Candidate.full_name.ilike(f"%{search}%"))
+    if cursor is None:
+        # Старый режим для существующих клиентов; при поиске сначала самые релевантные
+        if matches is not None:
+            query = query.order_by(matches.c.rank.desc(), Candidate.id)
+        candidates = (await db.scalars(query.offset(skip).limit(limit))).all()
+        return candidates
     
-    if status:
-        # Фильтруем по всем возможным статусам
-        if status in ["берем", "не берем", "прошёл", "отклонён", "ожидает"]:
-            query = query.filter(Candidate.status == status)
+    # Keyset-пагинация: глубокие страницы стоят столько же, сколько первая.
+    # При поиске порядок тот же, что без курсора: по релевантности, затем по id
+    if matches is not None:
+        rank = matches.c.rank
+        if cursor:
+            after_rank, candidate_id = decode_cursor(cursor, ranked=True)
+            query = query.where(or_(rank < after_rank, and_(rank == after_rank, Candidate.id > candidate_id)))
+        query = query.add_columns(rank).order_by(rank.desc(), Candidate.id)
+    else:
+        # Записи без created_at идут в конце по id
+        if cursor:
+            created_at, candidate_id = decode_cursor(cursor, ranked=False)
+            if created_at is None:
+                query = query.where(Candidate.created_at.is_(None), Candidate.id > candidate_id)
+            else:
+                query = query.where(or_(
+                    tuple_(Candidate.created_at, Candidate.id) > tuple_(created_at, candidate_id),
+                    Candidate.created_at.is_(None)
+                ))
+        query = query.order_by(Candidate.created_at.asc().nulls_last(), Candidate.id)
+    rows = (await db.execute(query.limit(limit + 1))).all()
     
-    candidates = query.offset(skip).limit(limit).all()
-    return candidates
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[0], last[1] if matches is not None else None)
+    return CandidatePage(items=[row[0] for row in rows[:limit]], next_cursor=next_cursor)
 
 @router.post("/", response_model=CandidateModel)
 async def create_candidate(
     candidate: CandidateCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создать нового кандидата"""
-    db_candidate = Candidate(**candidate.dict())
+    candidate_data = candidate.dict()
+    candidate_data["telegram_id"] = normalize_telegram_id(candidate_data["telegram_id"])
+    db_candidate = Candidate(**candidate_data)
     db.add(db_candidate)
-    db.commit()
-    db.refresh(db_candidate)
-    
-    # Интеграция с Notion
-    notion_service = NotionService()
-    notion_id = await notion_service.create_candidate(db_candidate)
-    db_candidate.notion_id = notion_id
-    db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Кандидат с таким telegram_id уже существует")
+    await db.refresh(db_candidate)
     
+    # Страницу в Notion создаст воркер синхронизации (services/notion_sync.py)
     return db_candidate
 
 @router.get("/{candidate_id}", response_model=CandidateModel)
 async def get_candidate(
     candidate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить кандидата по ID"""
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = await db.get(Candidate, candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     return candidate
@@ -88,113 +179,166 @@ async def get_candidate(
 async def update_candidate(
     candidate_id: int,
     candidate_update: CandidateUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновить кандидата"""
-    db_candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    db_candidate = await db.get(Candidate, candidate_id)
     if not db_candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     
     update_data = candidate_update.dict(exclude_unset=True)
+    if "telegram_id" in update_data:
+        update_data["telegram_id"] = normalize_telegram_id(update_data["telegram_id"])
     for field, value in update_data.items():
         setattr(db_candidate, field, value)
     
     db_candidate.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_candidate)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Кандидат с таким telegram_id уже существует")
+    await db.refresh(db_candidate)
     
     return db_candidate
 
 @router.delete("/{candidate_id}")
 async def delete_candidate(
     candidate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Удалить кандидата"""
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    # Связанные записи подгружаем заранее: ленивая загрузка в AsyncSession недоступна
+    candidate = await db.scalar(
+        select(Candidate).where(Candidate.id == candidate_id).options(
+            selectinload(Candidate.interview_logs),
+            selectinload(Candidate.comments)
+        )
+    )
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     
-    db.delete(candidate)
-    db.commit()
+    await db.delete(candidate)
+    await db.commit()
     return {"message": "Кандидат удален"}
 
 # Интервью логи
 @router.get("/{candidate_id}/interview-logs", response_model=List[InterviewLogModel])
 async def get_interview_logs(
     candidate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить логи интервью кандидата"""
-    logs = db.query(InterviewLog).filter(InterviewLog.candidate_id == candidate_id).all()
+    logs = (await db.scalars(
+        select(InterviewLog).where(InterviewLog.candidate_id == candidate_id)
+    )).all()
     return logs
 
 @router.post("/{candidate_id}/interview-logs", response_model=InterviewLogModel)
 async def create_interview_log(
     candidate_id: int,
     log: InterviewLogCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создать лог интервью"""
     # Получаем кандидата
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = await db.get(Candidate, candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     
     # Создаем лог интервью
     db_log = InterviewLog(**log.dict())
     db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    await db.flush()
     
-    # Отправляем уведомление администраторам
-    telegram_service = TelegramService()
-    await telegram_service.send_interview_notification_to_admins(candidate, db_log, db)
+    # Уведомление администраторам уходит через outbox в той же транзакции
+    enqueue_notification(db, "interview_log", candidate_id=candidate_id, log_id=db_log.id)
     
-    # Проверяем, завершено ли интервью (например, если это последний вопрос)
-    # Здесь можно добавить логику определения завершения интервью
-    interview_logs_count = db.query(InterviewLog).filter(InterviewLog.candidate_id == candidate_id).count()
+    # Проверяем, завершено ли интервью (например, если это последний вопрос).
+    # Счётчики кандидата обновлены в том же flush (services/metrics_rollup.py), строка
+    # агрегатов заблокирована до commit, поэтому параллельные логи не теряются
+    stats = await db.get(CandidateScoreStat, candidate_id, populate_existing=True)
+    interview_logs_count = stats.log_count if stats else 0
     
     # Если это 5-й вопрос или больше, считаем интервью завершенным
     if interview_logs_count >= 5:
-        # Вычисляем среднюю оценку
-        avg_score = db.query(func.avg(InterviewLog.score)).filter(
-            InterviewLog.candidate_id == candidate_id,
-            InterviewLog.score.isnot(None)
-        ).scalar() or 0.0
-        
-        # Отправляем уведомление о завершении
-        await telegram_service.send_interview_completion_notification(candidate, interview_logs_count, avg_score, db)
+        # Средняя оценка по оценённым ответам
+        avg_score = stats.score_sum / stats.score_count if stats.score_count else 0.0
         
         # Обновляем статус кандидата
         candidate.status = "прошёл" if avg_score >= 7.0 else "ожидает"
         candidate.last_action_type = "interview_completed"
         candidate.last_action_date = datetime.utcnow()
-        db.commit()
+        
+        # Уведомление о завершении
+        enqueue_notification(
+            db, "interview_completed",
+            candidate_id=candidate_id, total_questions=interview_logs_count, avg_score=float(avg_score)
+        )
+    await db.commit()
+    await db.refresh(db_log)
     
     return db_log
 
+@router.get("/{candidate_id}/score-stats", response_model=CandidateScoreStats)
+async def get_candidate_score_stats(
+    candidate_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Количество логов, сумма и средняя оценка кандидата, в том числе по категориям"""
+    if not await db.get(Candidate, candidate_id):
+        raise HTTPException(status_code=404, detail="Кандидат не найден")
+    
+    stats = await db.get(CandidateScoreStat, candidate_id)
+    categories = (await db.scalars(
+        select(CandidateCategoryStat).where(
+            CandidateCategoryStat.candidate_id == candidate_id,
+            CandidateCategoryStat.score_count > 0
+        ).order_by(CandidateCategoryStat.category)
+    )).all()
+    
+    score_sum = stats.score_sum if stats else 0
+    score_count = stats.score_count if stats else 0
+    return {
+        "candidate_id": candidate_id,
+        "log_count": stats.log_count if stats else 0,
+        "score_sum": score_sum,
+        "score_count": score_count,
+        "avg_score": round(score_sum / score_count, 2) if score_count else 0.0,
+        "categories": [
+            {
+                "category": category.category,
+                "score_sum": category.score_sum,
+                "score_count": category.score_count,
+                "avg_score": round(category.score_sum / category.score_count, 2)
+            }
+            for category in categories
+        ]
+    }
+
 # Комментарии HR
 @router.get("/{candidate_id}/comments", response_model=List[CommentModel])
 async def get_comments(
     candidate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить комментарии HR для кандидата"""
-    comments = db.query(Comment).filter(Comment.candidate_id == candidate_id).all()
+    comments = (await db.scalars(
+        select(Comment).where(Comment.candidate_id == candidate_id)
+    )).all()
     return comments
 
 @router.post("/{candidate_id}/comments", response_model=CommentModel)
 async def create_comment(
     candidate_id: int,
     comment: CommentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создать комментарий HR"""
     db_comment = Comment(**comment.dict())
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
     return db_comment
 
 # Быстрые действия
@@ -202,30 +346,29 @@ async def create_comment(
 async def perform_quick_action(
     candidate_id: int,
     action: QuickAction,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
 ):
     """Выполнить быстрое действие с кандидатом"""
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = await db.get(Candidate, candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     
-    telegram_service = TelegramService()
-    notion_service = NotionService()
-    
+    # Сообщения в Telegram ставятся в outbox и уходят после commit
     if action.action_type == "invite_test":
         # Отправить приглашение на тест
-        await telegram_service.send_test_invitation(candidate)
-        await notion_service.create_task(candidate, "Пригласить на тест")
+        enqueue_notification(db, "test_invitation", candidate_id=candidate_id)
+        background_tasks.add_task(create_notion_task, candidate_id, "Пригласить на тест")
         
     elif action.action_type == "telegram_message":
         # Отправить сообщение в Telegram
         message = action.data.get("message", "")
-        await telegram_service.send_message(candidate, message)
+        enqueue_notification(db, "candidate_message", candidate_id=candidate_id, message=message)
         
     elif action.action_type == "send_feedback":
         # Отправить фидбэк
         feedback = action.data.get("feedback", "")
-        await telegram_service.send_feedback(candidate, feedback)
+        enqueue_notification(db, "feedback", candidate_id=candidate_id, feedback=feedback)
         
     elif action.action_type == "copy_data":
         # Скопировать данные кандидата
@@ -239,7 +382,7 @@ async def perform_quick_action(
     # Обновить последнее действие
     candidate.last_action_date = datetime.utcnow()
     candidate.last_action_type = action.action_type
-    db.commit()
+    await db.commit()
     
     return {"message": f"Действие {action.action_type} выполнено"} 
 
@@ -247,12 +390,12 @@ async def perform_quick_action(
 async def send_candidate_data(
     candidate_id: int,
     format: str = Body(..., embed=True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    telegram_service: TelegramService = Depends(get_telegram_service)
 ):
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = await db.get(Candidate, candidate_id)
     if not candidate or not candidate.telegram_username:
         raise HTTPException(status_code=404, detail="Кандидат не найден или нет Telegram")
-    telegram_service = TelegramService()
     ok = await telegram_service.send_candidate_data_formatted(candidate, format)
     if ok:
         return {"message": "Данные отправлены кандидату в Telegram"}
@@ -262,15 +405,14 @@ async def send_candidate_data(
 @router.post("/{candidate_id}/test-notification")
 async def test_notification(
     candidate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    telegram_service: TelegramService = Depends(get_telegram_service)
 ):
     """Тестирование уведомлений для администраторов"""
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = await db.get(Candidate, candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     
-    telegram_service = TelegramService()
-    
     # Создаем тестовый лог интервью
     test_log = InterviewLog(
         candidate_id=candidate_id,
@@ -291,72 +433,62 @@ async def test_notification(
 @router.post("/results")
 async def submit_interview_results(
     results: dict,
-    db: Session = Depends(get_db)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить результаты интервью от внешнего сайта"""
     try:
-        # Извлекаем данные из результатов
-        full_name = results.get("full_name", "Неизвестный кандидат")
-        telegram_username = results.get("telegram_username")
-        telegram_id = results.get("telegram_id")
-        interview_results = results.get("results", "")
+        # Повтор запроса с тем же ключом возвращает сохранённый ответ
+        if idempotency_key:
+            fingerprint = request_fingerprint(json.dumps(results, sort_keys=True).encode())
+            replay = await claim_idempotency_key(db, "candidates.results", idempotency_key, fingerprint)
+            if replay is not None:
+                await db.rollback()
+                response.headers["Idempotent-Replayed"] = "true"
+                return replay
         
-        # Анализируем результаты и определяем статус
-        def analyze_interview_results(results_text: str) -> str:
-            if not results_text:
-                return "ожидает"
-            
-            lower_results = results_text.lower()
-            if "не берем" in lower_results:
-                return "не берем"
-            else:
-                return "берем"
-        
-        # Определяем статус на основе результатов
-        status = analyze_interview_results(interview_results)
+        # Извлекаем данные из результатов и определяем статус
+        candidate_data = candidate_data_from_results(results)
         
-        # Создаем нового кандидата
-        candidate_data = {
-            "full_name": full_name,
-            "telegram_username": telegram_username,
-            "telegram_id": telegram_id,
-            "results": interview_results,
-            "status": status
-        }
+        # Новый кандидат или повторные результаты существующего (по telegram_id)
+        db_candidate, outcome = await upsert_candidate(db, candidate_data)
         
-        db_candidate = Candidate(**candidate_data)
-        db.add(db_candidate)
-        db.commit()
-        db.refresh(db_candidate)
+        # Уведомление администраторам уходит через outbox в той же транзакции
+        if outcome != UNCHANGED:
+            enqueue_notification(
+                db, "interview_completed",
+                candidate_id=db_candidate.id, total_questions=1, avg_score=0.0
+            )
         
-        # Интеграция с Notion
-        notion_service = NotionService()
-        notion_id = await notion_service.create_candidate(db_candidate)
-        db_candidate.notion_id = notion_id
-        db.commit()
+        # Страницу в Notion создаст воркер синхронизации (services/notion_sync.py)
         
-        # Отправляем уведомление администраторам
-        telegram_service = TelegramService()
-        await telegram_service.send_interview_completion_notification(db_candidate, 1, 0.0, db)
-        
-        return {
+        result = {
             "success": True,
-            "message": "Результаты интервью успешно сохранены",
+            "message": RESULT_MESSAGES[outcome],
             "candidate_id": db_candidate.id,
-            "status": status
+            "status": db_candidate.status,
+            "outcome": outcome
         }
+        if idempotency_key:
+            await store_idempotent_response(db, "candidates.results", idempotency_key, result)
+        await db.commit()
+        return result
         
+    except IdempotencyConflict as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка сохранения результатов: {str(e)}")
 
 @router.get("/results/{candidate_id}")
 async def get_interview_results(
     candidate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить результаты интервью кандидата"""
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = await db.get(Candidate, candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     
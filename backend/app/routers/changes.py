@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import asyncio
+import json
+
+from backend.app.database import get_db
+from backend.app.models import ChangeFeed
+from backend.app.services.change_stream import change_broker, matches_filters, CHANGE_STREAM_HEARTBEAT
+from backend.app.services.change_log import (
+    read_changes, decode_cursor, START, CHANGES_PAGE_SIZE, CHANGES_MAX_PAGE_SIZE
+)
+
+router = APIRouter()
+
+@router.get("", response_model=ChangeFeed)
+async def get_changes(
+    since: Optional[str] = Query(None, description="next_cursor прошлого ответа; без него - с начала журнала"),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=CHANGES_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """Изменения кандидатов, логов интервью и комментариев после курсора, включая удаления"""
+    try:
+        position = decode_cursor(since) if since else START
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await read_changes(db, position, limit)
+
+async def sse_events(types, candidate_id):
+    """События изменений в формате Server-Sent Events"""
+    subscription = change_broker.subscribe()
+    try:
+        # EventSource переподключится через retry мс, если соединение оборвётся
+        yield f"retry: 3000\n: подписка {len(change_broker.subscribers)}\n\n"
+        while True:
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), timeout=CHANGE_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Комментарий не даёт прокси закрыть простаивающее соединение
+                yield ": ping\n\n"
+                continue
+            if change is None:
+                # Часть событий пропущена: клиенту нужно перечитать данные
+                yield 'event: resync\ndata: {"type": "resync"}\n\n'
+                return
+            if matches_filters(change, types, candidate_id):
+                yield f"event: {change['type']}\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+    finally:
+        change_broker.unsubscribe(subscription)
+
+@router.get("/stream")
+async def stream_changes(
+    types: Optional[str] = Query(
+        None,
+        description="Типы событий или их префиксы через запятую: candidate, candidate.status_changed, interview_log"
+    ),
+    candidate_id: Optional[int] = Query(None, description="Только события этого кандидата")
+):
+    """Поток изменений кандидатов и логов интервью (Server-Sent Events)"""
+    type_filter = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    return StreamingResponse(
+        sse_events(type_filter, candidate_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
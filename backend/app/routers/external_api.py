@@ -1,25 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Optional
 from datetime import datetime
+import codecs
 import json
+import os
 
 from backend.app.database import get_db, Candidate
-from backend.app.services.telegram_service import TelegramService
-from backend.app.services.notion_service import NotionService
+from backend.app.services.telegram_outbox import enqueue_notification
+from backend.app.services.candidate_upsert import (
+    candidate_data_from_results, upsert_candidate, upsert_candidate_batch,
+    CREATED, UPDATED, UNCHANGED, RESULT_MESSAGES
+)
+from backend.app.services.idempotency import (
+    claim_idempotency_key, store_idempotent_response, verify_fingerprint, request_fingerprint, fingerprint_digest,
+    IdempotencyConflict
+)
 
 router = APIRouter()
 
+# Пакетная загрузка: кандидаты вставляются многострочными INSERT по EXTERNAL_BULK_BATCH_SIZE строк
+EXTERNAL_BULK_BATCH_SIZE = int(os.getenv("EXTERNAL_BULK_BATCH_SIZE", "500"))
+EXTERNAL_BULK_MAX_ITEMS = int(os.getenv("EXTERNAL_BULK_MAX_ITEMS", "10000"))
+
 @router.post("/submit-results")
 async def submit_interview_results(
     request: Request,
-    db: Session = Depends(get_db)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить результаты интервью от внешнего сайта"""
     try:
         # Получаем данные из запроса
         body = await request.body()
         
+        # Повтор запроса с тем же ключом возвращает сохранённый ответ
+        fingerprint = request_fingerprint(body)
+        if idempotency_key:
+            replay = await claim_idempotency_key(db, "external.submit-results", idempotency_key, fingerprint)
+            if replay is not None:
+                await db.rollback()
+                response.headers["Idempotent-Replayed"] = "true"
+                return replay
+        
         # Пытаемся парсить как JSON
         try:
             results = json.loads(body)
@@ -28,81 +52,234 @@ async def submit_interview_results(
             form_data = await request.form()
             results = dict(form_data)
         
-        # Извлекаем данные из результатов
-        full_name = results.get("full_name", "Неизвестный кандидат")
-        telegram_username = results.get("telegram_username")
-        telegram_id = results.get("telegram_id")
-        interview_results = results.get("results", "")
+        # Извлекаем данные из результатов и определяем статус
+        candidate_data = candidate_data_from_results(results)
         
         # Валидация обязательных полей
-        if not full_name:
+        if not candidate_data["full_name"]:
             raise HTTPException(status_code=400, detail="full_name обязателен")
         
-        # Анализируем результаты и определяем статус
-        def analyze_interview_results(results_text: str) -> str:
-            if not results_text:
-                return "ожидает"
-            
-            lower_results = results_text.lower()
-            if "не берем" in lower_results:
-                return "не берем"
-            else:
-                return "берем"
+        # Новый кандидат или повторные результаты существующего (по telegram_id)
+        db_candidate, outcome = await upsert_candidate(db, candidate_data)
+        
+        # Уведомление администраторам уходит через outbox в той же транзакции
+        if outcome != UNCHANGED:
+            enqueue_notification(
+                db, "interview_completed",
+                candidate_id=db_candidate.id, total_questions=1, avg_score=0.0
+            )
         
-        # Определяем статус на основе результатов
-        status = analyze_interview_results(interview_results)
+        # Страницу в Notion создаст воркер синхронизации (services/notion_sync.py)
         
-        # Создаем нового кандидата
-        candidate_data = {
-            "full_name": full_name,
-            "telegram_username": telegram_username,
-            "telegram_id": telegram_id,
-            "results": interview_results,
-            "status": status
+        result = {
+            "success": True,
+            "message": RESULT_MESSAGES[outcome],
+            "candidate_id": db_candidate.id,
+            "status": db_candidate.status,
+            "outcome": outcome,
+            "timestamp": datetime.utcnow().isoformat()
         }
+        if idempotency_key:
+            await store_idempotent_response(db, "external.submit-results", idempotency_key, result)
+        await db.commit()
+        return result
         
-        db_candidate = Candidate(**candidate_data)
-        db.add(db_candidate)
-        db.commit()
-        db.refresh(db_candidate)
+    except HTTPException:
+        await db.rollback()
+        raise
+    except IdempotencyConflict as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Ошибка сохранения результатов: {str(e)}")
+
+_json_decoder = json.JSONDecoder()
+
+class JsonArrayParser:
+    """Потоковый разбор JSON-массива: feed() возвращает элементы, полученные целиком"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.state = "start"  # start -> first -> separator <-> value -> end
+
+    def feed(self, text: str, final: bool = False) -> list:
+        buffer = self.buffer + text
+        items = []
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if self.state == "start":
+                if buffer[pos] != "[":
+                    raise ValueError("ожидался JSON-массив или NDJSON")
+                self.state = "first"
+                pos += 1
+            elif self.state == "separator":
+                if buffer[pos] not in ",]":
+                    raise ValueError(f"ожидалась запятая после элемента {len(items)}")
+                self.state = "value" if buffer[pos] == "," else "end"
+                pos += 1
+            elif self.state == "first" and buffer[pos] == "]":
+                self.state = "end"
+                pos += 1
+            elif self.state in ("first", "value"):
+                try:
+                    item, end = _json_decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break  # элемент ещё не дочитан
+                if end == len(buffer) and not final:
+                    break  # число могло оборваться на границе чанка
+                items.append(item)
+                self.state = "separator"
+                pos = end
+            else:
+                raise ValueError("лишние данные после JSON-массива")
+        self.buffer = buffer[pos:]
+        if final and self.state != "end":
+            raise ValueError("JSON-массив не закрыт")
+        return items
+
+def is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "")
+    return "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type
+
+async def iter_body(request: Request, digest):
+    """Куски тела запроса с обновлением его отпечатка"""
+    async for chunk in request.stream():
+        digest.update(chunk)
+        yield chunk
+
+async def iter_bulk_items(request: Request, digest):
+    """(номер, элемент, ошибка) из JSON-массива или NDJSON по мере чтения тела запроса"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    index = 0
+    if is_ndjson(request):
+        # Каждая строка - отдельный элемент, ошибка в строке не мешает остальным
+        pending = ""
+        async for chunk in iter_body(request, digest):
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield index, json.loads(line), None
+                    except json.JSONDecodeError as e:
+                        yield index, None, f"Некорректный JSON: {e}"
+                    index += 1
+        pending += decoder.decode(b"", final=True)
+        if pending.strip():
+            try:
+                yield index, json.loads(pending), None
+            except json.JSONDecodeError as e:
+                yield index, None, f"Некорректный JSON: {e}"
+        return
+
+    # JSON-массив синтаксически целый: ошибка разбора отклоняет весь запрос
+    parser = JsonArrayParser()
+    async for chunk in iter_body(request, digest):
+        for item in parser.feed(decoder.decode(chunk)):
+            yield index, item, None
+            index += 1
+    for item in parser.feed(decoder.decode(b"", final=True), final=True):
+        yield index, item, None
+        index += 1
+
+@router.post("/submit-results/bulk")
+async def submit_interview_results_bulk(
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Пакетная загрузка результатов интервью: JSON-массив или NDJSON (application/x-ndjson)"""
+    items = []
+    batch = []
+    digest = fingerprint_digest()
+    try:
+        # Ключ занимается до чтения тела; отпечаток тела считается по ходу чтения и сохраняется с ответом
+        if idempotency_key:
+            replay = await claim_idempotency_key(db, "external.submit-results.bulk", idempotency_key)
+            if replay is not None:
+                async for _ in iter_body(request, digest):
+                    pass
+                await verify_fingerprint(db, "external.submit-results.bulk", idempotency_key, digest.hexdigest())
+                await db.rollback()
+                response.headers["Idempotent-Replayed"] = "true"
+                return replay
         
-        # Интеграция с Notion
-        try:
-            notion_service = NotionService()
-            notion_id = await notion_service.create_candidate(db_candidate)
-            db_candidate.notion_id = notion_id
-            db.commit()
-        except Exception as e:
-            print(f"Ошибка интеграции с Notion: {e}")
+        async for index, results, error in iter_bulk_items(request, digest):
+            if index >= EXTERNAL_BULK_MAX_ITEMS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Не больше {EXTERNAL_BULK_MAX_ITEMS} результатов в одном запросе"
+                )
+            entry = {"index": index}
+            items.append(entry)
+            if error is None and not isinstance(results, dict):
+                error = "Ожидался JSON-объект"
+            if error is not None:
+                entry["error"] = error
+                continue
+            candidate_data = candidate_data_from_results(results)
+            if not candidate_data["full_name"]:
+                entry["error"] = "full_name обязателен"
+                continue
+            batch.append((entry, candidate_data))
+            if len(batch) >= EXTERNAL_BULK_BATCH_SIZE:
+                await upsert_candidate_batch(db, batch)
+                batch = []
+        if batch:
+            await upsert_candidate_batch(db, batch)
         
-        # Отправляем уведомление администраторам
-        try:
-            telegram_service = TelegramService()
-            await telegram_service.send_interview_completion_notification(db_candidate, 1, 0.0, db)
-        except Exception as e:
-            print(f"Ошибка отправки уведомления: {e}")
+        # Одно сводное уведомление администраторам на весь пакет вместо уведомления на кандидата
+        candidate_ids = list(dict.fromkeys(
+            entry["candidate_id"] for entry in items if entry.get("outcome") in (CREATED, UPDATED)
+        ))
+        if candidate_ids:
+            enqueue_notification(db, "interview_completed_batch", candidate_ids=candidate_ids)
         
-        return {
+        outcomes = [entry.get("outcome") for entry in items]
+        result = {
             "success": True,
-            "message": "Результаты интервью успешно сохранены",
-            "candidate_id": db_candidate.id,
-            "status": status,
+            "received": len(items),
+            "created": outcomes.count(CREATED),
+            "updated": outcomes.count(UPDATED),
+            "unchanged": outcomes.count(UNCHANGED),
+            "failed": outcomes.count(None),
+            "items": items,
             "timestamp": datetime.utcnow().isoformat()
         }
-        
+        if idempotency_key:
+            await store_idempotent_response(
+                db, "external.submit-results.bulk", idempotency_key, result, digest.hexdigest()
+            )
+        await db.commit()
+        return result
+    except IdempotencyConflict as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except HTTPException:
+        await db.rollback()
         raise
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Некорректное тело запроса: {e}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка сохранения результатов: {str(e)}")
 
 @router.get("/results/{candidate_id}")
 async def get_interview_results(
     candidate_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получить результаты интервью кандидата"""
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = await db.get(Candidate, candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Кандидат не найден")
     
@@ -120,6 +297,11 @@ async def options_submit_results():
     """Обработчик OPTIONS для submit-results"""
     return {"message": "OK"}
 
+@router.options("/submit-results/bulk")
+async def options_submit_results_bulk():
+    """Обработчик OPTIONS для submit-results/bulk"""
+    return {"message": "OK"}
+
 @router.options("/results/{candidate_id}")
 async def options_get_results(candidate_id: int):
     """Обработчик OPTIONS для get-results"""
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 
-from backend.app.database import get_db, Candidate, InterviewLog
-from backend.app.models import Metrics
+from backend.app.database import (
+    get_db, Candidate,
+    CandidateDailyStat, CandidateActivityDaily, InterviewCategoryDaily, CandidateScoreStat
+)
+from backend.app.models import Metrics, DashboardMetrics
+from backend.app.services.metrics_cache import cached_metrics
 
 router = APIRouter()
 
@@ -27,37 +31,35 @@ def get_date_range(period: str, scope: str):
     
     return start_date, end_date
 
-@router.get("/overview", response_model=Metrics)
-async def get_metrics_overview(
-    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
-    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
-    db: Session = Depends(get_db)
-):
-    """Получить общие метрики с фильтрацией по периоду"""
+# Все эндпоинты читают агрегаты по дням (services/metrics_rollup.py), а не исходные таблицы
+
+def get_day_range(period: Optional[str], scope: Optional[str]):
+    """Диапазон дней для фильтрации агрегатов или None без фильтра"""
+    if not (period and scope):
+        return None
+    start_date, end_date = get_date_range(period, scope)
+    return start_date.date(), end_date.date()
+
+async def fetch_status_counts(db: AsyncSession, days):
+    """Количество кандидатов по статусам - общая основа для overview и распределения"""
+    query = select(
+        CandidateDailyStat.status,
+        func.sum(CandidateDailyStat.count).label('count')
+    ).group_by(
+        CandidateDailyStat.status
+    ).having(
+        func.sum(CandidateDailyStat.count) > 0
+    )
+    if days:
+        query = query.where(CandidateDailyStat.day.between(*days))
+    return (await db.execute(query)).all()
+
+def build_overview(status_counts) -> Metrics:
+    total_candidates = sum(count for _, count in status_counts)
+    passed_candidates = sum(count for status, count in status_counts if status == "берем")
     
-    if period and scope:
-        start_date, end_date = get_date_range(period, scope)
-        
-        # Общее количество кандидатов за период
-        total_candidates = db.query(Candidate).filter(
-            Candidate.created_at >= start_date,
-            Candidate.created_at <= end_date
-        ).count()
-        
-        # Прошедшие кандидаты за период
-        passed_candidates = db.query(Candidate).filter(
-            Candidate.status == "берем",
-            Candidate.created_at >= start_date,
-            Candidate.created_at <= end_date
-        ).count()
-        
-        # Процент прохождения теста
-        test_pass_rate = (passed_candidates / total_candidates * 100) if total_candidates > 0 else 0
-    else:
-        # Без фильтрации - все данные
-        total_candidates = db.query(Candidate).count()
-        passed_candidates = db.query(Candidate).filter(Candidate.status == "берем").count()
-        test_pass_rate = (passed_candidates / total_candidates * 100) if total_candidates > 0 else 0
+    # Процент прохождения теста
+    test_pass_rate = (passed_candidates / total_candidates * 100) if total_candidates > 0 else 0
     
     return Metrics(
         total_candidates=total_candidates,
@@ -65,80 +67,29 @@ async def get_metrics_overview(
         test_pass_rate=round(test_pass_rate, 2),
     )
 
-@router.get("/status-distribution")
-async def get_status_distribution(
-    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
-    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
-    db: Session = Depends(get_db)
-):
-    """Получить распределение по статусам с фильтрацией по периоду"""
-    
-    if period and scope:
-        start_date, end_date = get_date_range(period, scope)
-        
-        status_counts = db.query(
-            Candidate.status,
-            func.count(Candidate.id).label('count')
-        ).filter(
-            Candidate.created_at >= start_date,
-            Candidate.created_at <= end_date
-        ).group_by(
-            Candidate.status
-        ).all()
-    else:
-        # Без фильтрации - все данные
-        status_counts = db.query(
-            Candidate.status,
-            func.count(Candidate.id).label('count')
-        ).group_by(
-            Candidate.status
-        ).all()
-    
+def build_status_distribution(status_counts) -> dict:
     return {
         "distribution": [
-            {"status": status, "count": count}
+            {"status": status or None, "count": count}
             for status, count in status_counts
         ]
     }
 
-@router.get("/activity-timeline")
-async def get_activity_timeline(
-    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
-    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
-    db: Session = Depends(get_db)
-):
-    """Получить активность по дням с фильтрацией по периоду"""
-    
-    if period and scope:
-        start_date, end_date = get_date_range(period, scope)
-        
-        # Активность по дням за выбранный период
-        activity = db.query(
-            func.date(Candidate.last_action_date).label('date'),
-            func.count(Candidate.id).label('count')
-        ).filter(
-            Candidate.last_action_date >= start_date,
-            Candidate.last_action_date <= end_date
-        ).group_by(
-            func.date(Candidate.last_action_date)
-        ).order_by(
-            func.date(Candidate.last_action_date)
-        ).all()
-    else:
+async def fetch_activity_timeline(db: AsyncSession, days) -> dict:
+    if not days:
         # Без фильтрации - последние 30 дней
         end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=30)
-        
-        activity = db.query(
-            func.date(Candidate.last_action_date).label('date'),
-            func.count(Candidate.id).label('count')
-        ).filter(
-            Candidate.last_action_date >= start_date
-        ).group_by(
-            func.date(Candidate.last_action_date)
-        ).order_by(
-            func.date(Candidate.last_action_date)
-        ).all()
+        days = ((end_date - timedelta(days=30)).date(), end_date.date())
+    
+    activity = (await db.execute(select(
+        CandidateActivityDaily.day,
+        CandidateActivityDaily.count
+    ).where(
+        CandidateActivityDaily.day.between(*days),
+        CandidateActivityDaily.count > 0
+    ).order_by(
+        CandidateActivityDaily.day
+    ))).all()
     
     return {
         "timeline": [
@@ -147,89 +98,54 @@ async def get_activity_timeline(
         ]
     }
 
-@router.get("/interview-stats")
-async def get_interview_stats(
-    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
-    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
-    db: Session = Depends(get_db)
-):
-    """Получить статистику интервью с фильтрацией по периоду"""
+async def fetch_interview_stats(db: AsyncSession, days) -> dict:
+    query = select(
+        InterviewCategoryDaily.category,
+        func.sum(InterviewCategoryDaily.score_sum).label('score_sum'),
+        func.sum(InterviewCategoryDaily.score_count).label('count')
+    ).group_by(
+        InterviewCategoryDaily.category
+    ).having(
+        func.sum(InterviewCategoryDaily.score_count) > 0
+    )
+    if days:
+        query = query.where(InterviewCategoryDaily.day.between(*days))
     
-    if period and scope:
-        start_date, end_date = get_date_range(period, scope)
-        
-        # Статистика интервью за период
-        category_stats = db.query(
-            InterviewLog.category,
-            func.avg(InterviewLog.score).label('avg_score'),
-            func.count(InterviewLog.id).label('count')
-        ).join(
-            Candidate, InterviewLog.candidate_id == Candidate.id
-        ).filter(
-            InterviewLog.score.isnot(None),
-            InterviewLog.category.isnot(None),
-            Candidate.created_at >= start_date,
-            Candidate.created_at <= end_date
-        ).group_by(
-            InterviewLog.category
-        ).all()
-    else:
-        # Без фильтрации - все данные
-        category_stats = db.query(
-            InterviewLog.category,
-            func.avg(InterviewLog.score).label('avg_score'),
-            func.count(InterviewLog.id).label('count')
-        ).filter(
-            InterviewLog.score.isnot(None),
-            InterviewLog.category.isnot(None)
-        ).group_by(
-            InterviewLog.category
-        ).all()
+    category_stats = (await db.execute(query)).all()
     
     return {
         "category_stats": [
             {
                 "category": stat.category,
-                "avg_score": round(float(stat.avg_score), 2),
+                "avg_score": round(stat.score_sum / stat.count, 2),
                 "count": stat.count
             }
             for stat in category_stats
         ]
     }
 
-@router.get("/top-candidates")
-async def get_top_candidates(
-    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
-    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
-    limit: int = Query(10, description="Количество кандидатов"),
-    db: Session = Depends(get_db)
-):
-    """Получить топ кандидатов по среднему баллу с фильтрацией по периоду"""
-    
-    query = db.query(
+async def fetch_top_candidates(db: AsyncSession, days, limit: int) -> dict:
+    avg_score = (CandidateScoreStat.score_sum * 1.0 / CandidateScoreStat.score_count).label('avg_score')
+    query = select(
         Candidate.full_name,
-        func.avg(InterviewLog.score).label('avg_score'),
-        func.count(InterviewLog.id).label('questions_count')
+        avg_score,
+        CandidateScoreStat.score_count.label('questions_count')
     ).join(
-        InterviewLog, Candidate.id == InterviewLog.candidate_id
-    ).filter(
-        InterviewLog.score.isnot(None)
+        Candidate, Candidate.id == CandidateScoreStat.candidate_id
+    ).where(
+        CandidateScoreStat.score_count >= 3  # Минимум 3 вопроса
     )
-    
-    if period and scope:
-        start_date, end_date = get_date_range(period, scope)
-        query = query.filter(
-            Candidate.created_at >= start_date,
-            Candidate.created_at <= end_date
+    if days:
+        start_day, end_day = days
+        query = query.where(
+            Candidate.created_at >= datetime.combine(start_day, time.min),
+            # Последний день периода целиком, как day.between(...) в запросах к агрегатам
+            Candidate.created_at < datetime.combine(end_day + timedelta(days=1), time.min)
         )
     
-    top_candidates = query.group_by(
-        Candidate.id, Candidate.full_name
-    ).having(
-        func.count(InterviewLog.id) >= 3  # Минимум 3 вопроса
-    ).order_by(
-        desc(func.avg(InterviewLog.score))
-    ).limit(limit).all()
+    top_candidates = (await db.execute(
+        query.order_by(desc(avg_score)).limit(limit)
+    )).all()
     
     return {
         "top_candidates": [
@@ -240,4 +156,75 @@ async def get_top_candidates(
             }
             for candidate in top_candidates
         ]
-    } 
\ No newline at end of file
+    }
+
+@router.get("/dashboard", response_model=DashboardMetrics)
+@cached_metrics("dashboard")
+async def get_dashboard(
+    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
+    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
+    limit: int = Query(10, description="Количество кандидатов в топе"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Все метрики дашборда одним запросом"""
+    days = get_day_range(period, scope)
+    status_counts = await fetch_status_counts(db, days)
+    
+    return DashboardMetrics(
+        overview=build_overview(status_counts),
+        **build_status_distribution(status_counts),
+        **(await fetch_activity_timeline(db, days)),
+        **(await fetch_interview_stats(db, days)),
+        **(await fetch_top_candidates(db, days, limit)),
+    )
+
+@router.get("/overview", response_model=Metrics)
+@cached_metrics("overview")
+async def get_metrics_overview(
+    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
+    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить общие метрики с фильтрацией по периоду"""
+    return build_overview(await fetch_status_counts(db, get_day_range(period, scope)))
+
+@router.get("/status-distribution")
+@cached_metrics("status-distribution")
+async def get_status_distribution(
+    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
+    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить распределение по статусам с фильтрацией по периоду"""
+    return build_status_distribution(await fetch_status_counts(db, get_day_range(period, scope)))
+
+@router.get("/activity-timeline")
+@cached_metrics("activity-timeline")
+async def get_activity_timeline(
+    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
+    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить активность по дням с фильтрацией по периоду"""
+    return await fetch_activity_timeline(db, get_day_range(period, scope))
+
+@router.get("/interview-stats")
+@cached_metrics("interview-stats")
+async def get_interview_stats(
+    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
+    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить статистику интервью с фильтрацией по периоду"""
+    return await fetch_interview_stats(db, get_day_range(period, scope))
+
+@router.get("/top-candidates")
+@cached_metrics("top-candidates")
+async def get_top_candidates(
+    period: Optional[str] = Query(None, description="Период в формате YYYY-MM для месяца или YYYY для года"),
+    scope: Optional[str] = Query(None, description="Тип периода: month или year"),
+    limit: int = Query(10, description="Количество кандидатов"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить топ кандидатов по среднему баллу с фильтрацией по периоду"""
+    return await fetch_top_candidates(db, get_day_range(period, scope), limit)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from backend.app.database import get_db, User
 from backend.app.models import UserProfile, UserProfileUpdate
 from typing import Optional
@@ -8,6 +9,7 @@ import os
 from pydantic import BaseModel
 import bcrypt
 import logging
+from backend.app.services.auth_cache import load_token_user, InvalidToken
 
 router = APIRouter()
 
@@ -15,24 +17,21 @@ SECRET_KEY = os.getenv("SECRET_KEY", "mysecret")
 ALGORITHM = "HS256"
 
 # Получить пользователя по токену из заголовка Authorization
-def get_current_user_from_token(
-    db: Session = Depends(get_db),
+async def get_current_user_from_token(
+    db: AsyncSession = Depends(get_db),
     authorization: Optional[str] = Header(None)
 ):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Требуется авторизация")
     token = authorization.split(" ", 1)[1]
+    # Повторные запросы с тем же токеном обслуживаются из кэша без обращения к БД
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Неверный токен")
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="Пользователь не найден")
-        return user
-    except jwt.PyJWTError:
+        user = await load_token_user(db, token)
+    except InvalidToken:
         raise HTTPException(status_code=401, detail="Неверный токен")
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    return user
 
 @router.get("/profile", response_model=UserProfile)
 async def get_profile(user: User = Depends(get_current_user_from_token)):
@@ -45,9 +44,11 @@ async def get_profile(user: User = Depends(get_current_user_from_token)):
 @router.put("/profile", response_model=UserProfile)
 async def update_profile(
     profile_update: UserProfileUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_from_token)
 ):
+    # Пользователь из кэша авторизации не привязан к сессии: изменяем свежую строку
+    user = await db.get(User, user.id)
     if profile_update.name:
         user.name = profile_update.name
     if profile_update.email:
@@ -57,8 +58,8 @@ async def update_profile(
         if not profile_update.current_password or not bcrypt.checkpw(profile_update.current_password.encode(), user.password.encode()):
             raise HTTPException(status_code=400, detail="Неверный текущий пароль")
         user.password = bcrypt.hashpw(profile_update.new_password.encode(), bcrypt.gensalt()).decode()
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return UserProfile(
         id=user.id,
         name=user.name,
@@ -70,8 +71,8 @@ class LoginRequest(BaseModel):
     password: str
 
 @router.post("/login")
-async def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.email == data.email))
     logging.warning(f"LOGIN ATTEMPT: email={data.email}, password={data.password}, user_in_db={user.password if user else None}")
     if not user or not bcrypt.checkpw(data.password.encode(), user.password.encode()):
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
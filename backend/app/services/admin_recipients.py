@@ -0,0 +1,78 @@
+import os
+import time
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import User
+
+# Получатели уведомлений администраторам: пары (telegram_id, name) читаются одним лёгким запросом
+# и переиспользуются всеми рассылками TelegramService, а не загружаются заново на каждый лог интервью.
+# Любое изменение пользователей (admins.py, telegram_auth.py) сбрасывает список после коммита;
+# другие воркеры gunicorn перечитают его не позже чем через ADMIN_RECIPIENTS_TTL.
+ADMIN_RECIPIENTS_TTL = float(os.getenv("ADMIN_RECIPIENTS_TTL", "60"))
+
+class AdminRecipientRegistry:
+    """Кэш списка администраторов для рассылок внутри воркера"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._recipients = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self.loads = 0
+        self.hits = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        self._generation += 1
+        self._recipients = None
+        self.invalidations += 1
+
+    async def get(self, db: AsyncSession) -> list:
+        """[(telegram_id, name), ...] всех администраторов, включая тех, у кого нет telegram_id"""
+        if self._recipients is not None and self._expires_at > time.monotonic():
+            self.hits += 1
+            return self._recipients
+
+        generation = self._generation
+        rows = await db.execute(select(User.telegram_id, User.name).where(User.is_admin == True).order_by(User.id))
+        recipients = [(telegram_id, name) for telegram_id, name in rows]
+        self.loads += 1
+        # Список, прочитанный до коммита изменений администраторов, не кэшируем
+        if self.ttl > 0 and generation == self._generation:
+            self._recipients = recipients
+            self._expires_at = time.monotonic() + self.ttl
+        return recipients
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "ttl": self.ttl,
+            "cached": self._recipients is not None and self._expires_at > time.monotonic(),
+            "recipients": len(self._recipients) if self._recipients is not None else None,
+            "loads": self.loads,
+            "hits": self.hits,
+            "invalidations": self.invalidations,
+        }
+
+admin_recipients = AdminRecipientRegistry(ADMIN_RECIPIENTS_TTL)
+
+def get_admin_recipients_status() -> dict:
+    """Состояние списка получателей текущего воркера"""
+    return admin_recipients.snapshot()
+
+@event.listens_for(Session, "after_flush")
+def _mark_admins_dirty(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            session.info["admin_recipients_dirty"] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_admins_after_commit(session):
+    if session.info.pop("admin_recipients_dirty", False):
+        admin_recipients.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_admins_flag(session):
+    session.info.pop("admin_recipients_dirty", None)
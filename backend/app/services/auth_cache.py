@@ -0,0 +1,136 @@
+import os
+import time
+import jwt
+from collections import OrderedDict
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import User
+
+# Кэш проверенных JWT и строк пользователей внутри воркера: повторный запрос с тем же токеном
+# не проверяет подпись и не ходит в users. Запись живёт до exp токена, но не дольше AUTH_CACHE_TTL.
+# Изменения пользователей (назначение и снятие админа, профиль) сбрасывают их записи после коммита;
+# другие воркеры gunicorn увидят изменения не позже чем через AUTH_CACHE_TTL.
+SECRET_KEY = os.getenv("SECRET_KEY", "mysecret")
+ALGORITHM = "HS256"
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+
+USER_COLUMNS = [attr.key for attr in sa_inspect(User).column_attrs]
+
+class InvalidToken(Exception):
+    """Подпись, срок или содержимое JWT не прошли проверку"""
+
+class AuthCache:
+    """LRU токен -> (срок, значения колонок пользователя) с поколениями, как у кэша метрик"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, token: str):
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return values
+
+    def put(self, token: str, generation: int, exp, user: User):
+        # Пользователь мог измениться, пока шёл запрос к БД: такой результат не кэшируем
+        if not self.enabled or generation != self.generation:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        values = {name: getattr(user, name) for name in USER_COLUMNS}
+        self._entries[token] = (expires_at, values)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_users(self, user_ids):
+        self.generation += 1
+        self.invalidations += 1
+        for token, (_, values) in list(self._entries.items()):
+            if values["id"] in user_ids:
+                del self._entries[token]
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "pid": os.getpid(),
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+auth_cache = AuthCache(AUTH_CACHE_TTL, AUTH_CACHE_MAX_ENTRIES)
+
+def get_auth_cache_status() -> dict:
+    """Счётчики кэша авторизации текущего воркера"""
+    return auth_cache.snapshot()
+
+def _detached_user(values: dict) -> User:
+    """Отдельный экземпляр User из закэшированных значений (без сессии)"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+async def load_token_user(db: AsyncSession, token: str):
+    """Пользователь по JWT или None, если его нет; InvalidToken для негодного токена.
+
+    Из кэша возвращается экземпляр без сессии - для изменений пользователя его нужно
+    перечитать через db.get.
+    """
+    values = auth_cache.get(token)
+    if values is not None:
+        auth_cache.hits += 1
+        return _detached_user(values)
+
+    auth_cache.misses += 1
+    generation = auth_cache.generation
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        raise InvalidToken()
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise InvalidToken()
+    user = await db.get(User, user_id)
+    if user is not None:
+        auth_cache.put(token, generation, payload.get("exp"), user)
+    return user
+
+@event.listens_for(Session, "after_flush")
+def _mark_users_dirty(session, flush_context):
+    user_ids = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    if user_ids:
+        session.info.setdefault("auth_dirty_users", set()).update(user_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users_after_commit(session):
+    user_ids = session.info.pop("auth_dirty_users", None)
+    if user_ids:
+        auth_cache.invalidate_users(user_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_users(session):
+    session.info.pop("auth_dirty_users", None)
@@ -0,0 +1,182 @@
+import os
+import io
+import csv
+import json
+from datetime import datetime
+from sqlalchemy import select
+from backend.app.database import AsyncSessionLocal, Candidate, InterviewLog, Comment
+
+# Выгрузка всей (отфильтрованной) воронки кандидатов вместе с логами интервью и комментариями.
+# Кандидаты читаются серверным курсором партиями по EXPORT_BATCH_SIZE (yield_per), логи и
+# комментарии догружаются на каждую партию, а каждая партия сразу сериализуется и отдаётся
+# клиенту - в памяти никогда не больше одной партии, сколько бы строк ни было в выгрузке.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+CANDIDATE_COLUMNS = (
+    Candidate.id, Candidate.full_name, Candidate.name, Candidate.telegram_username, Candidate.telegram_id,
+    Candidate.results, Candidate.status, Candidate.last_action_date, Candidate.last_action_type,
+    Candidate.notion_id, Candidate.created_at, Candidate.updated_at,
+)
+LOG_COLUMNS = (
+    InterviewLog.id, InterviewLog.question, InterviewLog.answer,
+    InterviewLog.score, InterviewLog.category, InterviewLog.created_at,
+)
+COMMENT_COLUMNS = (Comment.id, Comment.hr_comment, Comment.created_at)
+
+CANDIDATE_FIELDS = [column.key for column in CANDIDATE_COLUMNS]
+
+def export_query():
+    """Запрос кандидатов для выгрузки; фильтры накладываются как в списке кандидатов"""
+    return select(*CANDIDATE_COLUMNS)
+
+async def _related(db, columns, candidate_column, candidate_ids):
+    """Связанные строки партии, сгруппированные по candidate_id"""
+    grouped = {}
+    rows = await db.execute(
+        select(candidate_column, *columns)
+        .where(candidate_column.in_(candidate_ids))
+        .order_by(candidate_column, columns[0])
+    )
+    for row in rows:
+        data = row._asdict()
+        grouped.setdefault(data.pop("candidate_id"), []).append(data)
+    return grouped
+
+async def iter_export_batches(query):
+    """Партии кандидатов [{...поля, interview_logs: [...], comments: [...]}] в порядке id"""
+    # Своя сессия: ответ стримится уже после того, как сессия запроса закрыта
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.order_by(Candidate.id).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            candidate_ids = [row.id for row in rows]
+            logs = await _related(db, LOG_COLUMNS, InterviewLog.candidate_id, candidate_ids)
+            comments = await _related(db, COMMENT_COLUMNS, Comment.candidate_id, candidate_ids)
+            yield [
+                {
+                    **row._asdict(),
+                    "interview_logs": logs.get(row.id, []),
+                    "comments": comments.get(row.id, []),
+                }
+                for row in rows
+            ]
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+async def stream_ndjson(batches):
+    """Одна строка JSON на кандидата, логи и комментарии - вложенными массивами"""
+    async for batch in batches:
+        yield "".join(_dumps(record) + "\n" for record in batch).encode("utf-8")
+
+async def stream_csv(batches):
+    """Одна строка CSV на кандидата; логи и комментарии - JSON-массивами в своих колонках"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, чтобы Excel открыл кириллицу без мастера импорта
+    buffer.write("\ufeff")
+    writer.writerow(CANDIDATE_FIELDS + ["interview_logs", "comments"])
+    async for batch in batches:
+        for record in batch:
+            writer.writerow(
+                [record[field].isoformat() if isinstance(record[field], datetime) else record[field]
+                 for field in CANDIDATE_FIELDS]
+                + [_dumps(record["interview_logs"]), _dumps(record["comments"])]
+            )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Файл для ParquetWriter, который копит записанное до следующей выдачи клиенту"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us")
+    return pa.schema([
+        ("id", pa.int64()),
+        ("full_name", pa.string()),
+        ("name", pa.string()),
+        ("telegram_username", pa.string()),
+        ("telegram_id", pa.string()),
+        ("results", pa.string()),
+        ("status", pa.string()),
+        ("last_action_date", timestamp),
+        ("last_action_type", pa.string()),
+        ("notion_id", pa.string()),
+        ("created_at", timestamp),
+        ("updated_at", timestamp),
+        ("interview_logs", pa.list_(pa.struct([
+            ("id", pa.int64()),
+            ("question", pa.string()),
+            ("answer", pa.string()),
+            ("score", pa.int32()),
+            ("category", pa.string()),
+            ("created_at", timestamp),
+        ]))),
+        ("comments", pa.list_(pa.struct([
+            ("id", pa.int64()),
+            ("hr_comment", pa.string()),
+            ("created_at", timestamp),
+        ]))),
+    ])
+
+async def stream_parquet(batches):
+    """Parquet с вложенными списками логов и комментариев; одна row group на партию"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.take()
+    finally:
+        # Футер с метаданными row groups пишется при закрытии
+        writer.close()
+    yield sink.take()
+
+EXPORT_WRITERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "parquet": stream_parquet,
+}
+
+def stream_export(query, format: str):
+    """Поток байтов выгрузки в формате format"""
+    return EXPORT_WRITERS[format](iter_export_batches(query))
@@ -0,0 +1,138 @@
+from datetime import datetime
+from typing import Dict, Any, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import Candidate
+
+# Кандидат однозначно определяется telegram_id (уникальный частичный индекс uq_candidates_telegram_id):
+# повторное прохождение теста или повтор вебхука обновляет существующую запись, а не плодит дубликаты.
+# Изменения идут через ORM, поэтому агрегаты метрик, сброс кэша и синхронизация с Notion
+# видят их так же, как любые другие правки кандидата.
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+RESULT_MESSAGES = {
+    CREATED: "Результаты интервью успешно сохранены",
+    UPDATED: "Результаты интервью обновлены",
+    UNCHANGED: "Результаты интервью уже сохранены",
+}
+
+# Поля, которые новые результаты перезаписывают у существующего кандидата
+UPSERT_FIELDS = ("full_name", "telegram_username", "results", "status")
+
+def analyze_interview_results(results_text: str) -> str:
+    """Определить статус кандидата по тексту результатов"""
+    if not results_text:
+        return "ожидает"
+
+    lower_results = results_text.lower()
+    if "не берем" in lower_results:
+        return "не берем"
+    else:
+        return "берем"
+
+def normalize_telegram_id(telegram_id) -> Optional[str]:
+    """telegram_id строкой без пробелов; пустой id - то же, что его отсутствие (NULL)"""
+    # Колонка строковая, а внешний сайт может прислать число
+    telegram_id = str(telegram_id).strip() if telegram_id is not None else None
+    return telegram_id or None
+
+def candidate_data_from_results(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Поля кандидата из результатов внешнего сайта"""
+    interview_results = results.get("results", "")
+    return {
+        "full_name": results.get("full_name", "Неизвестный кандидат"),
+        "telegram_username": results.get("telegram_username"),
+        "telegram_id": normalize_telegram_id(results.get("telegram_id")),
+        "results": interview_results,
+        "status": analyze_interview_results(interview_results)
+    }
+
+def apply_results(candidate: Candidate, data: Dict[str, Any]) -> bool:
+    """Перенести новые результаты в кандидата; True, если что-то изменилось"""
+    changed = False
+    for field in UPSERT_FIELDS:
+        value = data.get(field)
+        if field == "telegram_username" and value is None:
+            # Известный username не затираем, если сайт его не прислал
+            continue
+        if getattr(candidate, field) != value:
+            setattr(candidate, field, value)
+            changed = True
+    if changed:
+        now = datetime.utcnow()
+        candidate.updated_at = now
+        candidate.last_action_date = now
+    return changed
+
+async def find_by_telegram_id(db: AsyncSession, telegram_ids) -> Dict[str, Candidate]:
+    """Кандидаты по telegram_id с блокировкой строк до конца транзакции"""
+    if not telegram_ids:
+        return {}
+    candidates = (await db.scalars(
+        select(Candidate).where(Candidate.telegram_id.in_(telegram_ids)).with_for_update()
+    )).all()
+    return {candidate.telegram_id: candidate for candidate in candidates}
+
+async def upsert_candidate(db: AsyncSession, data: Dict[str, Any]):
+    """Создать кандидата или обновить найденного по telegram_id: (кандидат, created/updated/unchanged)"""
+    telegram_id = data.get("telegram_id")
+    for attempt in range(2):
+        candidate = (await find_by_telegram_id(db, [telegram_id])).get(telegram_id) if telegram_id else None
+        try:
+            async with db.begin_nested():
+                if candidate is None:
+                    candidate = Candidate(**data)
+                    db.add(candidate)
+                    outcome = CREATED
+                else:
+                    outcome = UPDATED if apply_results(candidate, data) else UNCHANGED
+        except IntegrityError:
+            if attempt or not telegram_id:
+                raise
+            # Параллельный запрос успел создать кандидата с тем же telegram_id - обновляем его
+            continue
+        return candidate, outcome
+
+async def upsert_candidate_batch(db: AsyncSession, batch: list):
+    """Upsert пачки [(entry, data)] многострочным INSERT ... RETURNING в точке сохранения.
+
+    entry дополняется candidate_id, status и outcome. Если пачка не записалась,
+    строки повторяются по одной, чтобы ошибка досталась только своему элементу.
+    """
+    await db.flush()
+    existing = await find_by_telegram_id(db, {data["telegram_id"] for _, data in batch if data["telegram_id"]})
+    results = []
+    try:
+        async with db.begin_nested():
+            fresh = {}
+            for entry, data in batch:
+                telegram_id = data["telegram_id"]
+                candidate = existing.get(telegram_id) or fresh.get(telegram_id)
+                if candidate is None:
+                    candidate = Candidate(**data)
+                    db.add(candidate)
+                    if telegram_id:
+                        fresh[telegram_id] = candidate
+                    outcome = CREATED
+                else:
+                    # Повтор telegram_id в пачке: побеждает последний результат
+                    changed = apply_results(candidate, data)
+                    if telegram_id in fresh:
+                        outcome = CREATED
+                    else:
+                        outcome = UPDATED if changed else UNCHANGED
+                results.append((entry, candidate, outcome))
+    except DBAPIError:
+        for entry, data in batch:
+            try:
+                candidate, outcome = await upsert_candidate(db, data)
+            except DBAPIError as e:
+                entry["error"] = f"Ошибка сохранения: {e.orig}"
+                continue
+            entry.update(candidate_id=candidate.id, status=candidate.status, outcome=outcome)
+        return
+    for entry, candidate, outcome in results:
+        entry.update(candidate_id=candidate.id, status=candidate.status, outcome=outcome)
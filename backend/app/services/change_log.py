@@ -0,0 +1,140 @@
+import os
+import json
+import base64
+import binascii
+from sqlalchemy import event, func, insert, literal, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import advisory_xact_lock, Candidate, InterviewLog, Comment, ChangeLogEntry
+
+# Журнал изменений для инкрементальной синхронизации клиентов (BI, Telegram WebApp, кэш фронтенда):
+# каждая вставка, правка и удаление кандидата, лога интервью или комментария через ORM пишет строку
+# в change_log в той же транзакции (after_flush), а /api/changes?since=<курсор> отдаёт изменения
+# после курсора, схлопывая повторные правки одной записи в одну дельту с её текущим состоянием.
+#
+# Курсор - пара (txid, seq). В PostgreSQL seq выдаётся при вставке, а транзакции коммитятся в другом
+# порядке, поэтому читать "seq > N" нельзя: запись с меньшим seq может появиться позже и потеряться.
+# Вместо этого каждая строка помнит txid_current() своей транзакции, а лента отдаёт только строки
+# транзакций старше txid_snapshot_xmin - все они уже завершены, и новые строки с меньшей позицией
+# появиться не могут. В SQLite записи сериализуются блокировкой БД, txid всегда 0 и порядок задаёт seq.
+CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "500"))
+CHANGES_MAX_PAGE_SIZE = 5000
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+ENTITIES = {Candidate: "candidate", InterviewLog: "interview_log", Comment: "comment"}
+MODELS = {name: model for model, name in ENTITIES.items()}
+
+def _entry(obj, op: str) -> dict:
+    candidate_id = obj.id if isinstance(obj, Candidate) else obj.candidate_id
+    return {"entity": ENTITIES[type(obj)], "entity_id": obj.id, "candidate_id": candidate_id, "op": op}
+
+def collect_entries(session) -> list:
+    """Строки журнала за один flush: одна на запись, удаление важнее правки"""
+    entries = {}
+    for obj in session.new:
+        if type(obj) in ENTITIES:
+            entries[(type(obj), obj.id)] = _entry(obj, UPSERT)
+    for obj in session.dirty:
+        if type(obj) in ENTITIES and session.is_modified(obj, include_collections=False):
+            entries[(type(obj), obj.id)] = _entry(obj, UPSERT)
+    for obj in session.deleted:
+        if type(obj) in ENTITIES:
+            entries[(type(obj), obj.id)] = _entry(obj, DELETE)
+    return list(entries.values())
+
+def _txid(connection):
+    """txid текущей транзакции для строк журнала (только PostgreSQL)"""
+    return func.txid_current() if connection.dialect.name == "postgresql" else literal(0)
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    entries = collect_entries(session)
+    if entries:
+        connection = session.connection()
+        connection.execute(insert(ChangeLogEntry).values(txid=_txid(connection)), entries)
+
+def encode_cursor(position) -> str:
+    """Упаковать позицию (txid, seq) в непрозрачный курсор"""
+    raw = json.dumps({"t": position[0], "s": position[1]})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Распаковать курсор в (txid, seq); ValueError для чужого или испорченного курсора"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["t"]), int(data["s"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Неверный курсор")
+
+START = (0, 0)
+
+async def _current_states(db: AsyncSession, entity: str, ids) -> dict:
+    """Текущие строки записей по id"""
+    model = MODELS[entity]
+    rows = await db.execute(select(*model.__table__.c).where(model.id.in_(ids)))
+    return {row.id: row._asdict() for row in rows}
+
+async def committed_after(db: AsyncSession, query, since):
+    """Ограничить запрос к журналу строками после позиции since из уже завершённых транзакций"""
+    query = query.where(tuple_(ChangeLogEntry.txid, ChangeLogEntry.seq) > tuple_(*since))
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        # У незавершённых транзакций строки с меньшей позицией могут ещё появиться
+        query = query.where(ChangeLogEntry.txid < func.txid_snapshot_xmin(func.txid_current_snapshot()))
+    return query
+
+async def read_changes(db: AsyncSession, since=START, limit: int = CHANGES_PAGE_SIZE) -> dict:
+    """Изменения после позиции since: {changes, next_cursor, has_more}"""
+    query = await committed_after(db, select(ChangeLogEntry), since)
+    rows = (await db.scalars(
+        query.order_by(ChangeLogEntry.txid, ChangeLogEntry.seq).limit(limit + 1)
+    )).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Последняя операция по каждой записи, в порядке её последнего изменения
+    latest = {}
+    for row in rows:
+        key = (row.entity, row.entity_id)
+        latest.pop(key, None)
+        latest[key] = row
+
+    upserts = {}
+    for (entity, entity_id), row in latest.items():
+        if row.op == UPSERT:
+            upserts.setdefault(entity, []).append(entity_id)
+    states = {entity: await _current_states(db, entity, ids) for entity, ids in upserts.items()}
+
+    changes = []
+    for (entity, entity_id), row in latest.items():
+        data = states.get(entity, {}).get(entity_id) if row.op == UPSERT else None
+        changes.append({
+            "seq": row.seq,
+            "entity": entity,
+            "id": entity_id,
+            "candidate_id": row.candidate_id,
+            # Запись удалена позже этой страницы - удаление придёт следующей строкой журнала
+            "op": row.op if row.op == DELETE or data is not None else DELETE,
+            "data": data,
+        })
+
+    position = (rows[-1].txid, rows[-1].seq) if rows else since
+    return {"changes": changes, "next_cursor": encode_cursor(position), "has_more": has_more}
+
+def install_change_log(connection):
+    """Заполнить журнал текущими записями при первом запуске, чтобы лента с начала давала полную копию"""
+    # Воркеры gunicorn стартуют одновременно: проверка и заполнение - под одной блокировкой
+    advisory_xact_lock(connection, "install_change_log")
+    has_entries = connection.execute(select(ChangeLogEntry.seq).limit(1)).first()
+    has_candidates = connection.execute(select(Candidate.id).limit(1)).first()
+    if has_entries or not has_candidates:
+        return
+    for model, entity in ENTITIES.items():
+        candidate_id = model.id if model is Candidate else model.candidate_id
+        connection.execute(insert(ChangeLogEntry).from_select(
+            ["txid", "entity", "entity_id", "candidate_id", "op"],
+            select(_txid(connection), literal(entity), model.id, candidate_id, literal(UPSERT)).order_by(model.id)
+        ))
@@ -0,0 +1,282 @@
+import os
+import json
+import asyncio
+from datetime import datetime
+from sqlalchemy import event, func, select, inspect as sa_inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from backend.app.database import ASYNC_DATABASE_URL, Candidate, InterviewLog
+
+# Поток изменений кандидатов для админки (SSE /api/changes/stream) вместо опроса списков и метрик.
+# События собираются в after_flush из любых записей через ORM - candidates.py, external_api.py,
+# быстрых действий и служебных скриптов. В PostgreSQL они отправляются NOTIFY в той же транзакции:
+# доставляются только после коммита, откат их отменяет, а каждый воркер gunicorn получает их
+# через своё LISTEN-соединение. На других БД (SQLite при разработке, один процесс) события
+# рассылаются подписчикам своего процесса после коммита.
+CHANGE_STREAM_CHANNEL = os.getenv("CHANGE_STREAM_CHANNEL", "hr_admin_changes")
+CHANGE_STREAM_QUEUE_SIZE = int(os.getenv("CHANGE_STREAM_QUEUE_SIZE", "256"))
+CHANGE_STREAM_HEARTBEAT = float(os.getenv("CHANGE_STREAM_HEARTBEAT", "15"))
+CHANGE_STREAM_RECONNECT_DELAY = 5.0
+# NOTIFY принимает не больше 8000 байт полезной нагрузки
+NOTIFY_PAYLOAD_LIMIT = 7500
+
+USES_NOTIFY = ASYNC_DATABASE_URL.startswith("postgresql+asyncpg://")
+
+CANDIDATE_COLUMNS = [attr.key for attr in sa_inspect(Candidate).column_attrs]
+# Служебные поля не считаются изменением, о котором стоит сообщать
+IGNORED_FIELDS = {"updated_at"}
+
+class Subscription:
+    """Очередь событий одного клиента потока"""
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize)
+
+    def push(self, events) -> bool:
+        """Положить события; False, если клиент не успевает их забирать"""
+        for change in events:
+            try:
+                self.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                return False
+        return True
+
+    def resync(self):
+        """Сбросить очередь и попросить клиента перечитать данные целиком"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+class ChangeBroker:
+    """Pub/sub событий изменений внутри воркера + LISTEN на канал PostgreSQL между воркерами"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self._task = None
+        self._engine = None
+        self._lost = None
+        self.listening = False
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.reconnects = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(CHANGE_STREAM_QUEUE_SIZE)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def dispatch(self, events):
+        """Разослать события подписчикам этого воркера"""
+        self.published += len(events)
+        for subscription in list(self.subscribers):
+            if subscription.push(events):
+                self.delivered += len(events)
+            else:
+                # Медленный клиент не должен копить события бесконечно: он перечитает данные
+                self.overflows += 1
+                self.unsubscribe(subscription)
+                subscription.resync()
+
+    def _resync_all(self):
+        for subscription in list(self.subscribers):
+            self.unsubscribe(subscription)
+            subscription.resync()
+
+    def start(self):
+        if self.running or not USES_NOTIFY:
+            return
+        self._engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+        self._resync_all()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.dispatch(json.loads(payload))
+
+    def _on_termination(self, connection):
+        self._lost.set()
+
+    async def run(self):
+        """Держать отдельное LISTEN-соединение, переподключаясь при обрыве"""
+        while True:
+            try:
+                async with self._engine.connect() as connection:
+                    raw = (await connection.get_raw_connection()).driver_connection
+                    self._lost = asyncio.Event()
+                    raw.add_termination_listener(self._on_termination)
+                    await raw.add_listener(CHANGE_STREAM_CHANNEL, self._on_notify)
+                    self.listening = True
+                    try:
+                        await self._lost.wait()
+                    finally:
+                        self.listening = False
+                        if not raw.is_closed():
+                            await raw.remove_listener(CHANGE_STREAM_CHANNEL, self._on_notify)
+                print("Соединение потока изменений потеряно, переподключение")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ошибка подписки на поток изменений: {e}")
+            # Пока соединения не было, события могли потеряться
+            self.reconnects += 1
+            self._resync_all()
+            await asyncio.sleep(CHANGE_STREAM_RECONNECT_DELAY)
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "transport": "postgresql-notify" if USES_NOTIFY else "in-process",
+            "channel": CHANGE_STREAM_CHANNEL if USES_NOTIFY else None,
+            "listening": self.listening,
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "reconnects": self.reconnects,
+        }
+
+change_broker = ChangeBroker()
+
+def get_change_stream_status() -> dict:
+    """Состояние потока изменений текущего воркера"""
+    return change_broker.snapshot()
+
+def matches_filters(change: dict, types, candidate_id) -> bool:
+    """Подходит ли событие под фильтр клиента (types - типы или их префиксы: candidate, interview_log)"""
+    if candidate_id is not None and change.get("candidate_id") != candidate_id:
+        return False
+    if types:
+        kind = change["type"]
+        return any(kind == t or kind.startswith(t + ".") for t in types)
+    return True
+
+def _log_event(kind: str, log: InterviewLog, at: str) -> dict:
+    return {
+        "type": kind, "at": at, "candidate_id": log.candidate_id, "log_id": log.id,
+        "score": log.score, "category": log.category,
+    }
+
+def collect_events(session) -> list:
+    """События изменений кандидатов и логов интервью за один flush"""
+    at = datetime.utcnow().isoformat()
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Candidate):
+            events.append({
+                "type": "candidate.created", "at": at, "candidate_id": obj.id,
+                "full_name": obj.full_name, "status": obj.status,
+            })
+        elif isinstance(obj, InterviewLog):
+            events.append(_log_event("interview_log.created", obj, at))
+
+    for obj in session.dirty:
+        if isinstance(obj, Candidate) and session.is_modified(obj, include_collections=False):
+            state = sa_inspect(obj)
+            fields = [
+                name for name in CANDIDATE_COLUMNS
+                if name not in IGNORED_FIELDS and state.attrs[name].history.has_changes()
+            ]
+            if not fields:
+                continue
+            events.append({
+                "type": "candidate.updated", "at": at, "candidate_id": obj.id,
+                "fields": fields, "status": obj.status,
+            })
+            if "status" in fields:
+                history = state.attrs.status.history
+                events.append({
+                    "type": "candidate.status_changed", "at": at, "candidate_id": obj.id,
+                    "old_status": history.deleted[0] if history.deleted else None, "status": obj.status,
+                })
+        elif isinstance(obj, InterviewLog) and session.is_modified(obj, include_collections=False):
+            events.append(_log_event("interview_log.updated", obj, at))
+
+    for obj in session.deleted:
+        if isinstance(obj, Candidate):
+            events.append({"type": "candidate.deleted", "at": at, "candidate_id": obj.id})
+        elif isinstance(obj, InterviewLog):
+            events.append(_log_event("interview_log.deleted", obj, at))
+    return events
+
+def notify_payloads(events) -> list:
+    """Разбить события на JSON-массивы, каждый не длиннее NOTIFY_PAYLOAD_LIMIT байт"""
+    payloads = []
+    chunk = []
+    size = 2
+    for change in events:
+        encoded = json.dumps(change, ensure_ascii=False)
+        length = len(encoded.encode("utf-8")) + 1
+        if chunk and size + length > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append("[" + ",".join(chunk) + "]")
+            chunk = []
+            size = 2
+        chunk.append(encoded)
+        size += length
+    if chunk:
+        payloads.append("[" + ",".join(chunk) + "]")
+    return payloads
+
+@event.listens_for(Session, "after_flush")
+def _collect_change_events(session, flush_context):
+    events = collect_events(session)
+    if not events:
+        return
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        # Транзакционный NOTIFY: придёт всем воркерам (и этому) только после коммита
+        for payload in notify_payloads(events):
+            connection.execute(select(func.pg_notify(CHANGE_STREAM_CHANNEL, payload)))
+    else:
+        # Запоминаем точку сохранения, в которой был flush: её откат отменяет и эти события
+        session.info.setdefault("change_events", []).append((session.get_nested_transaction(), events))
+
+def _within(transaction, savepoint) -> bool:
+    while transaction is not None:
+        if transaction is savepoint:
+            return True
+        transaction = transaction.parent
+    return False
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_savepoint_events(session, previous_transaction):
+    if previous_transaction.nested and session.info.get("change_events"):
+        session.info["change_events"] = [
+            (transaction, events) for transaction, events in session.info["change_events"]
+            if not _within(transaction, previous_transaction)
+        ]
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    # after_commit приходит и на RELEASE SAVEPOINT: публикуем только после коммита всей транзакции
+    if session.in_nested_transaction():
+        return
+    collected = session.info.pop("change_events", None)
+    if collected:
+        change_broker.dispatch([change for _, events in collected for change in events])
+
+@event.listens_for(Session, "after_rollback")
+def _discard_change_events(session):
+    # after_rollback приходит и на откат точки сохранения: там события отбрасывает
+    # _discard_savepoint_events, а события внешней транзакции остаются
+    if not session.in_nested_transaction():
+        session.info.pop("change_events", None)
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import IdempotencyKey
+
+# Повтор запроса с тем же Idempotency-Key возвращает сохранённый ответ, ничего не меняя.
+# Ключ занимается INSERT ... ON CONFLICT DO NOTHING в той же транзакции, что и сами изменения:
+# параллельный повтор ждёт её коммита, а при откате ключ освобождается для новой попытки.
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_PURGE_INTERVAL = 60.0
+
+class IdempotencyConflict(Exception):
+    """Ключ уже использован для другого запроса или такой запрос ещё выполняется"""
+
+def request_fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+def fingerprint_digest():
+    """Отпечаток тела, которое читается потоком: update() на каждый кусок, затем hexdigest()"""
+    return hashlib.sha256()
+
+_last_purge = 0.0
+
+async def _purge_expired(db: AsyncSession):
+    """Удалить просроченные ключи, не чаще раза в IDEMPOTENCY_PURGE_INTERVAL секунд на воркер"""
+    global _last_purge
+    if time.monotonic() - _last_purge < IDEMPOTENCY_PURGE_INTERVAL:
+        return
+    _last_purge = time.monotonic()
+    await db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.created_at < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+    ))
+
+async def claim_idempotency_key(db: AsyncSession, scope: str, key: str, fingerprint: str = None):
+    """Занять ключ в текущей транзакции; вернуть сохранённый ответ, если запрос уже выполнен"""
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise IdempotencyConflict(f"Idempotency-Key длиннее {IDEMPOTENCY_KEY_MAX_LENGTH} символов")
+    await _purge_expired(db)
+    connection = await db.connection()
+    dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    claimed = await db.execute(
+        dialect_insert(IdempotencyKey)
+        .values(scope=scope, key=key, fingerprint=fingerprint, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=["scope", "key"])
+        .returning(IdempotencyKey.key)
+    )
+    if claimed.first() is not None:
+        return None
+
+    record = (await db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+    if fingerprint and record.fingerprint and record.fingerprint != fingerprint:
+        raise IdempotencyConflict("Idempotency-Key уже использован для другого запроса")
+    if record.response is None:
+        raise IdempotencyConflict("Запрос с этим Idempotency-Key ещё выполняется")
+    return json.loads(record.response)
+
+async def verify_fingerprint(db: AsyncSession, scope: str, key: str, fingerprint: str):
+    """Сверить отпечаток тела, прочитанного уже после claim_idempotency_key, с сохранённым"""
+    stored = await db.scalar(select(IdempotencyKey.fingerprint).where(
+        IdempotencyKey.scope == scope, IdempotencyKey.key == key
+    ))
+    if stored and stored != fingerprint:
+        raise IdempotencyConflict("Idempotency-Key уже использован для другого запроса")
+
+async def store_idempotent_response(db: AsyncSession, scope: str, key: str, response: dict, fingerprint: str = None):
+    """Сохранить ответ под ключом; commit делает вызывающий вместе с изменениями"""
+    values = {"response": json.dumps(response, ensure_ascii=False)}
+    if fingerprint:
+        values["fingerprint"] = fingerprint
+    await db.execute(update(IdempotencyKey).where(
+        IdempotencyKey.scope == scope, IdempotencyKey.key == key
+    ).values(**values))
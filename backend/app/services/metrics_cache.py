@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+import functools
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from backend.app.database import Candidate, InterviewLog
+
+# Кэш ответов /api/metrics/* внутри воркера. Записи кандидатов и логов интервью сбрасывают
+# кэш после коммита; другие воркеры gunicorn увидят изменения не позже чем через TTL.
+METRICS_CACHE_TTL = float(os.getenv("METRICS_CACHE_TTL", "30"))
+METRICS_CACHE_MAX_ENTRIES = int(os.getenv("METRICS_CACHE_MAX_ENTRIES", "256"))
+
+INVALIDATING_MODELS = (Candidate, InterviewLog)
+
+class MetricsCache:
+    """TTL + LRU кэш с объединением одновременных промахов по одному ключу"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def invalidate(self):
+        # Смена поколения не даёт запросам, начатым до записи, положить в кэш старый результат
+        self._generation += 1
+        self._entries.clear()
+        self._inflight.clear()
+        self.invalidations += 1
+
+    async def get_or_compute(self, key, compute):
+        if not self.enabled:
+            return await compute()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        future = self._inflight.get(key)
+        while future is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # Отменён сам ожидающий запрос
+                    raise
+            # Ведущий запрос отменён (например, клиент отключился): считаем сами или ждём нового ведущего
+            future = self._inflight.get(key)
+
+        self.misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже получит вызывающий, ожидающих может не быть
+            future.exception()
+            raise
+        except BaseException:
+            # Отмена ведущего - не ошибка вычисления: ожидающие не получат его CancelledError
+            future.cancel()
+            raise
+        else:
+            future.set_result(value)
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "pid": os.getpid(),
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0,
+        }
+
+metrics_cache = MetricsCache(METRICS_CACHE_TTL, METRICS_CACHE_MAX_ENTRIES)
+
+def cached_metrics(name: str):
+    """Кэшировать ответ эндпоинта метрик по имени и параметрам запроса (кроме db)"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key = (name,) + tuple(sorted((k, v) for k, v in kwargs.items() if k != "db"))
+            return await metrics_cache.get_or_compute(key, lambda: func(**kwargs))
+        return wrapper
+    return decorator
+
+def get_metrics_cache_status() -> dict:
+    """Счётчики кэша метрик текущего воркера"""
+    return metrics_cache.snapshot()
+
+@event.listens_for(Session, "after_flush")
+def _mark_metrics_dirty(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, INVALIDATING_MODELS):
+            session.info["metrics_dirty"] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("metrics_dirty", False):
+        metrics_cache.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("metrics_dirty", None)
@@ -0,0 +1,304 @@
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import event, delete, func, insert, select, inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from backend.app.database import (
+    advisory_xact_lock, Candidate, InterviewLog,
+    CandidateDailyStat, CandidateActivityDaily, InterviewCategoryDaily, CandidateScoreStat, CandidateCategoryStat
+)
+
+# Агрегаты метрик пересчитываются в том же flush, что и изменения кандидатов и логов,
+# поэтому они всегда согласованы с основными таблицами в рамках транзакции.
+# Прежние значения изменяемых и удаляемых строк берутся не из истории ORM (объект мог быть
+# загружен до чужого коммита), а из БД через SELECT ... FOR UPDATE перед flush: параллельный
+# запрос, меняющий того же кандидата, ждёт коммита и видит уже новые значения.
+ROLLUP_TABLES = [
+    CandidateDailyStat, CandidateActivityDaily, InterviewCategoryDaily, CandidateScoreStat, CandidateCategoryStat
+]
+
+# NULL не может быть частью первичного ключа, поэтому пустой статус храним как ""
+EMPTY_STATUS = ""
+# У старых кандидатов created_at может быть пустым: они учитываются в отдельном дне, который
+# не попадает ни в один период и входит только в метрики без фильтра по периоду
+UNDATED_DAY = date.min
+
+def _day(value):
+    return value.date() if value is not None else None
+
+def _created_day(value):
+    return value.date() if value is not None else UNDATED_DAY
+
+# Колонки, от которых зависят агрегаты
+TRACKED_COLUMNS = {
+    Candidate: ("created_at", "status", "last_action_date"),
+    InterviewLog: ("candidate_id", "category", "score"),
+}
+
+def _old_and_new(obj, attribute, row=None):
+    """Значение атрибута до и после flush; row - строка из БД, заблокированная перед flush"""
+    history = sa_inspect(obj).attrs[attribute].history
+    new = getattr(obj, attribute)
+    if row is not None:
+        old = row[attribute]
+        # Колонку этот flush не пишет: в БД остаётся её текущее значение, а не загруженное в объект
+        return old, new if history.has_changes() else old
+    old = history.deleted[0] if history.deleted else new
+    return old, new
+
+def lock_current_rows(session) -> dict:
+    """Текущие значения отслеживаемых колонок изменяемых и удаляемых строк, с блокировкой до коммита"""
+    ids = defaultdict(set)
+    for obj in list(session.dirty) + list(session.deleted):
+        model = type(obj)
+        if model in TRACKED_COLUMNS and obj.id is not None and (
+            obj in session.deleted or session.is_modified(obj, include_collections=False)
+        ):
+            ids[model].add(obj.id)
+    rows = {}
+    for model, model_ids in ids.items():
+        columns = [model.__table__.c[name] for name in TRACKED_COLUMNS[model]]
+        for row in session.connection().execute(
+            select(model.id, *columns).where(model.id.in_(model_ids)).order_by(model.id).with_for_update()
+        ):
+            rows[(model, row.id)] = row._mapping
+    return rows
+
+class RollupDelta:
+    """Накопленные изменения агрегатов за один flush"""
+
+    def __init__(self):
+        self.status = defaultdict(int)
+        self.activity = defaultdict(int)
+        self.category = defaultdict(lambda: [0, 0])
+        self.logs = defaultdict(int)
+        self.scores = defaultdict(lambda: [0, 0])
+        self.candidate_category = defaultdict(lambda: [0, 0])
+        self.deleted_candidates = set()
+
+    def candidate(self, created_day, status, activity_day, sign: int):
+        self.status[(created_day, status or EMPTY_STATUS)] += sign
+        if activity_day is not None:
+            self.activity[activity_day] += sign
+
+    def log(self, candidate_id, created_day, category, score, sign: int):
+        if candidate_id is None:
+            return
+        self.logs[candidate_id] += sign
+        if score is None:
+            return
+        self.scores[candidate_id][0] += sign * score
+        self.scores[candidate_id][1] += sign
+        if category is not None:
+            self.candidate_category[(candidate_id, category)][0] += sign * score
+            self.candidate_category[(candidate_id, category)][1] += sign
+            if created_day is not None:
+                self.category[(created_day, category)][0] += sign * score
+                self.category[(created_day, category)][1] += sign
+
+def _upsert_add(connection, model, rows: list, keys: list, counters: list):
+    """INSERT ... ON CONFLICT DO UPDATE с прибавлением счётчиков"""
+    if not rows:
+        return
+    table = model.__table__
+    dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: table.c[name] + statement.excluded[name] for name in counters}
+    )
+    connection.execute(statement, rows)
+
+def apply_delta(connection, delta: RollupDelta):
+    _upsert_add(connection, CandidateDailyStat, [
+        {"day": day, "status": status, "count": count}
+        for (day, status), count in delta.status.items() if count
+    ], ["day", "status"], ["count"])
+    _upsert_add(connection, CandidateActivityDaily, [
+        {"day": day, "count": count}
+        for day, count in delta.activity.items() if count
+    ], ["day"], ["count"])
+    _upsert_add(connection, InterviewCategoryDaily, [
+        {"day": day, "category": category, "score_sum": score_sum, "score_count": score_count}
+        for (day, category), (score_sum, score_count) in delta.category.items() if score_sum or score_count
+    ], ["day", "category"], ["score_sum", "score_count"])
+    score_rows = []
+    for candidate_id in delta.logs.keys() | delta.scores.keys():
+        log_count = delta.logs.get(candidate_id, 0)
+        score_sum, score_count = delta.scores.get(candidate_id, (0, 0))
+        if (log_count or score_sum or score_count) and candidate_id not in delta.deleted_candidates:
+            score_rows.append({
+                "candidate_id": candidate_id,
+                "log_count": log_count,
+                "score_sum": score_sum,
+                "score_count": score_count
+            })
+    _upsert_add(connection, CandidateScoreStat, score_rows, ["candidate_id"], ["log_count", "score_sum", "score_count"])
+    _upsert_add(connection, CandidateCategoryStat, [
+        {"candidate_id": candidate_id, "category": category, "score_sum": score_sum, "score_count": score_count}
+        for (candidate_id, category), (score_sum, score_count) in delta.candidate_category.items()
+        if (score_sum or score_count) and candidate_id not in delta.deleted_candidates
+    ], ["candidate_id", "category"], ["score_sum", "score_count"])
+    if delta.deleted_candidates:
+        for model in (CandidateScoreStat, CandidateCategoryStat):
+            connection.execute(delete(model).where(model.candidate_id.in_(delta.deleted_candidates)))
+
+def _created_days(session, connection, candidate_ids: set) -> dict:
+    """День создания кандидатов: сначала из сессии (в т.ч. удалённых), затем из БД"""
+    days = {}
+    for obj in list(session.identity_map.values()) + list(session.new) + list(session.deleted):
+        if isinstance(obj, Candidate) and obj.id in candidate_ids:
+            days[obj.id] = _created_day(obj.created_at)
+    missing = candidate_ids - days.keys()
+    if missing:
+        for candidate_id, created_at in connection.execute(
+            select(Candidate.id, Candidate.created_at).where(Candidate.id.in_(missing))
+        ):
+            days[candidate_id] = _created_day(created_at)
+    return days
+
+def collect_delta(session, current: dict = None) -> RollupDelta:
+    """Изменения агрегатов за flush; current - строки из lock_current_rows"""
+    current = current or {}
+    delta = RollupDelta()
+    logs = []
+    moved = {}
+
+    for obj in session.new:
+        if isinstance(obj, Candidate):
+            delta.candidate(_created_day(obj.created_at), obj.status, _day(obj.last_action_date), +1)
+        elif isinstance(obj, InterviewLog):
+            logs.append((None, (obj.candidate_id, obj.category, obj.score)))
+
+    for obj in session.dirty:
+        if isinstance(obj, Candidate) and session.is_modified(obj, include_collections=False):
+            row = current.get((Candidate, obj.id))
+            old_created, new_created = _old_and_new(obj, "created_at", row)
+            old_status, new_status = _old_and_new(obj, "status", row)
+            old_activity, new_activity = _old_and_new(obj, "last_action_date", row)
+            if (old_created, old_status, old_activity) != (new_created, new_status, new_activity):
+                delta.candidate(_created_day(old_created), old_status, _day(old_activity), -1)
+                delta.candidate(_created_day(new_created), new_status, _day(new_activity), +1)
+            if _created_day(old_created) != _created_day(new_created):
+                moved[obj.id] = (_created_day(old_created), _created_day(new_created))
+        elif isinstance(obj, InterviewLog) and session.is_modified(obj, include_collections=False):
+            row = current.get((InterviewLog, obj.id))
+            old, new = zip(*(_old_and_new(obj, name, row) for name in TRACKED_COLUMNS[InterviewLog]))
+            if old != new:
+                logs.append((old, new))
+
+    for obj in session.deleted:
+        if isinstance(obj, Candidate):
+            row = current.get((Candidate, obj.id))
+            old_created, _ = _old_and_new(obj, "created_at", row)
+            old_status, _ = _old_and_new(obj, "status", row)
+            old_activity, _ = _old_and_new(obj, "last_action_date", row)
+            delta.candidate(_created_day(old_created), old_status, _day(old_activity), -1)
+            delta.deleted_candidates.add(obj.id)
+        elif isinstance(obj, InterviewLog):
+            row = current.get((InterviewLog, obj.id))
+            old = tuple(_old_and_new(obj, name, row)[0] for name in TRACKED_COLUMNS[InterviewLog])
+            logs.append((old, None))
+
+    if moved:
+        # Оценки кандидата учтены в дне его создания: при смене дня переносим их целиком.
+        # CandidateCategoryStat ещё без изменений этого flush - его логи посчитаны ниже уже по новому дню
+        for candidate_id, category, score_sum, score_count in session.connection().execute(
+            select(
+                CandidateCategoryStat.candidate_id, CandidateCategoryStat.category,
+                CandidateCategoryStat.score_sum, CandidateCategoryStat.score_count
+            ).where(CandidateCategoryStat.candidate_id.in_(moved))
+        ):
+            old_day, new_day = moved[candidate_id]
+            delta.category[(old_day, category)][0] -= score_sum
+            delta.category[(old_day, category)][1] -= score_count
+            delta.category[(new_day, category)][0] += score_sum
+            delta.category[(new_day, category)][1] += score_count
+
+    if logs:
+        candidate_ids = {log[0] for pair in logs for log in pair if log and log[0] is not None}
+        days = _created_days(session, session.connection(), candidate_ids)
+        for old, new in logs:
+            if old:
+                delta.log(old[0], days.get(old[0]), old[1], old[2], -1)
+            if new:
+                delta.log(new[0], days.get(new[0]), new[1], new[2], +1)
+    return delta
+
+@event.listens_for(Session, "before_flush")
+def _lock_rollup_rows(session, flush_context, instances):
+    session.info["rollup_rows"] = lock_current_rows(session)
+
+@event.listens_for(Session, "after_flush")
+def _update_rollups(session, flush_context):
+    delta = collect_delta(session, session.info.pop("rollup_rows", None))
+    apply_delta(session.connection(), delta)
+
+def rebuild_rollups(connection):
+    """Пересчитать все агрегаты с нуля (синхронное соединение)"""
+    for model in ROLLUP_TABLES:
+        connection.execute(delete(model))
+
+    created_day = func.coalesce(func.date(Candidate.created_at), UNDATED_DAY)
+    activity_day = func.date(Candidate.last_action_date)
+    connection.execute(insert(CandidateDailyStat).from_select(
+        ["day", "status", "count"],
+        select(created_day, func.coalesce(Candidate.status, EMPTY_STATUS), func.count(Candidate.id))
+        .group_by(created_day, func.coalesce(Candidate.status, EMPTY_STATUS))
+    ))
+    connection.execute(insert(CandidateActivityDaily).from_select(
+        ["day", "count"],
+        select(activity_day, func.count(Candidate.id))
+        .where(Candidate.last_action_date.isnot(None))
+        .group_by(activity_day)
+    ))
+    connection.execute(insert(InterviewCategoryDaily).from_select(
+        ["day", "category", "score_sum", "score_count"],
+        select(created_day, InterviewLog.category, func.sum(InterviewLog.score), func.count(InterviewLog.id))
+        .join(Candidate, InterviewLog.candidate_id == Candidate.id)
+        .where(InterviewLog.score.isnot(None), InterviewLog.category.isnot(None))
+        .group_by(created_day, InterviewLog.category)
+    ))
+    connection.execute(insert(CandidateScoreStat).from_select(
+        ["candidate_id", "log_count", "score_sum", "score_count"],
+        select(
+            InterviewLog.candidate_id,
+            func.count(InterviewLog.id),
+            func.coalesce(func.sum(InterviewLog.score), 0),
+            func.count(InterviewLog.score)
+        )
+        .join(Candidate, InterviewLog.candidate_id == Candidate.id)
+        .group_by(InterviewLog.candidate_id)
+    ))
+    connection.execute(insert(CandidateCategoryStat).from_select(
+        ["candidate_id", "category", "score_sum", "score_count"],
+        select(InterviewLog.candidate_id, InterviewLog.category, func.sum(InterviewLog.score), func.count(InterviewLog.id))
+        .join(Candidate, InterviewLog.candidate_id == Candidate.id)
+        .where(InterviewLog.score.isnot(None), InterviewLog.category.isnot(None))
+        .group_by(InterviewLog.candidate_id, InterviewLog.category)
+    ))
+
+def install_rollups(connection):
+    """Заполнить агрегаты при первом запуске, если они пусты, а кандидаты уже есть"""
+    # Воркеры gunicorn стартуют одновременно: проверка и пересчёт - под одной блокировкой
+    advisory_xact_lock(connection, "install_rollups")
+    has_rollups = connection.execute(select(CandidateDailyStat.day).limit(1)).first()
+    has_candidates = connection.execute(select(Candidate.id).limit(1)).first()
+    if has_candidates and not has_rollups:
+        rebuild_rollups(connection)
+
+if __name__ == "__main__":
+    import argparse
+    from backend.app.database import engine, Base
+
+    parser = argparse.ArgumentParser(description="Агрегаты метрик дашборда")
+    parser.add_argument("--rebuild", action="store_true", help="пересчитать агрегаты с нуля")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            rebuild_rollups(connection)
+        print("Агрегаты метрик пересчитаны")
+    else:
+        parser.print_help()
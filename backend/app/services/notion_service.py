@@ -1,17 +1,101 @@
 import os
-from notion_client import Client
-from notion_client.errors import APIResponseError
+import httpx
+from notion_client import AsyncClient
+from notion_client.errors import APIResponseError, HTTPResponseError, RequestTimeoutError
 from dotenv import load_dotenv
-from backend.app.database import Candidate
+from backend.app.database import AsyncSessionLocal, Candidate
+from backend.app.services.resilience import get_breaker, IntegrationUnavailable, NOTION_CALL_TIMEOUT
 from datetime import datetime
 
 load_dotenv()
 
+# Свой адрес API (прокси или локальная заглушка), по умолчанию api.notion.com
+NOTION_API_URL = os.getenv("NOTION_API_URL", "https://api.notion.com")
+
+def _notion_failure(error: Exception) -> bool:
+    # Сбой сервиса - сеть, таймауты и 5xx; 4xx означают ошибку в запросе
+    if isinstance(error, (RequestTimeoutError, httpx.TransportError)):
+        return True
+    return isinstance(error, HTTPResponseError) and error.status >= 500
+
+notion_breaker = get_breaker("notion", NOTION_CALL_TIMEOUT, is_failure=_notion_failure)
+
 class NotionService:
     def __init__(self):
         self.notion_token = os.getenv("NOTION_TOKEN")
         self.database_id = os.getenv("NOTION_DATABASE_ID")
-        self.client = Client(auth=self.notion_token) if self.notion_token else None
+        # Асинхронный клиент: запросы к Notion не блокируют event loop
+        # Таймаут клиента не длиннее бюджета вызова, чтобы запрос не висел дольше выключателя
+        self.client = AsyncClient(
+            auth=self.notion_token,
+            base_url=NOTION_API_URL,
+            timeout_ms=int(NOTION_CALL_TIMEOUT * 1000)
+        ) if self.notion_token else None
+    
+    async def close(self):
+        """Закрыть HTTP-клиент Notion"""
+        if self.client:
+            await self.client.aclose()
+    
+    async def create_page(self, **kwargs) -> dict:
+        """Создать страницу с бюджетом времени через выключатель Notion"""
+        return await notion_breaker.call(self.client.pages.create, **kwargs)
+    
+    async def update_page(self, **kwargs) -> dict:
+        """Обновить страницу с бюджетом времени через выключатель Notion"""
+        return await notion_breaker.call(self.client.pages.update, **kwargs)
+    
+    @staticmethod
+    def date_property(value) -> dict:
+        """Свойство-дата; у старых записей даты может не быть - тогда поле в Notion очищается"""
+        return {"date": {"start": value.isoformat()} if value else None}
+    
+    def candidate_properties(self, candidate: Candidate) -> dict:
+        """Свойства страницы кандидата в базе Notion"""
+        # Определяем статус для Notion
+        status_map = {
+            "ожидает": "Ожидает",
+            "прошёл": "Прошёл",
+            "приглашён": "Приглашён",
+            "отклонён": "Отклонён"
+        }
+        
+        properties = {
+            "Имя": {
+                "title": [
+                    {
+                        "text": {
+                            "content": candidate.full_name
+                        }
+                    }
+                ]
+            },
+            "Telegram": {
+                "url": f"https://t.me/{candidate.telegram_username}" if candidate.telegram_username else None
+            },
+            # "Email": {
+            #     "email": candidate.email
+            # },
+            # "Телефон": {
+            #     "phone_number": candidate.phone
+            # },
+            "Статус": {
+                "select": {
+                    "name": status_map.get(candidate.status, "Ожидает")
+                }
+            },
+            "Дата добавления": self.date_property(candidate.created_at),
+            "Последнее действие": {
+                "rich_text": [
+                    {
+                        "text": {
+                            "content": candidate.last_action_type or "Нет"
+                        }
+                    }
+                ]
+            }
+        }
+        return properties
     
     async def create_candidate(self, candidate: Candidate) -> str:
         """Создать кандидата в Notion"""
@@ -19,62 +103,16 @@ class NotionService:
             return None
         
         try:
-            # Определяем статус для Notion
-            status_map = {
-                "ожидает": "Ожидает",
-                "прошёл": "Прошёл",
-                "приглашён": "Приглашён",
-                "отклонён": "Отклонён"
-            }
+            properties = self.candidate_properties(candidate)
             
-            properties = {
-                "Имя": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": candidate.full_name
-                            }
-                        }
-                    ]
-                },
-                "Telegram": {
-                    "url": f"https://t.me/{candidate.telegram_username}" if candidate.telegram_username else None
-                },
-                # "Email": {
-                #     "email": candidate.email
-                # },
-                # "Телефон": {
-                #     "phone_number": candidate.phone
-                # },
-                "Статус": {
-                    "select": {
-                        "name": status_map.get(candidate.status, "Ожидает")
-                    }
-                },
-                "Дата добавления": {
-                    "date": {
-                        "start": candidate.created_at.isoformat()
-                    }
-                },
-                "Последнее действие": {
-                    "rich_text": [
-                        {
-                            "text": {
-                                "content": candidate.last_action_type or "Нет"
-                            }
-                        }
-                    ]
-                }
-            }
-            
-            response = self.client.pages.create(
+            response = await self.create_page(
                 parent={"database_id": self.database_id},
                 properties=properties
             )
             
             return response["id"]
             
-        except APIResponseError as e:
+        except (APIResponseError, IntegrationUnavailable) as e:
             print(f"Ошибка создания кандидата в Notion: {e}")
             return None
     
@@ -106,21 +144,17 @@ class NotionService:
                         }
                     ]
                 },
-                "Дата обновления": {
-                    "date": {
-                        "start": candidate.updated_at.isoformat()
-                    }
-                }
+                "Дата обновления": self.date_property(candidate.updated_at)
             }
             
-            self.client.pages.update(
+            await self.update_page(
                 page_id=candidate.notion_id,
                 properties=properties
             )
             
             return True
             
-        except APIResponseError as e:
+        except (APIResponseError, IntegrationUnavailable) as e:
             print(f"Ошибка обновления кандидата в Notion: {e}")
             return False
     
@@ -173,14 +207,14 @@ class NotionService:
                 }
             }
             
-            self.client.pages.create(
+            await self.create_page(
                 parent={"database_id": task_database_id},
                 properties=properties
             )
             
             return True
             
-        except APIResponseError as e:
+        except (APIResponseError, IntegrationUnavailable) as e:
             print(f"Ошибка создания задачи в Notion: {e}")
             return False
     
@@ -232,13 +266,30 @@ class NotionService:
                 }
             }
             
-            self.client.pages.create(
+            await self.create_page(
                 parent={"database_id": task_database_id},
                 properties=properties
             )
             
             return True
             
-        except APIResponseError as e:
+        except (APIResponseError, IntegrationUnavailable) as e:
             print(f"Ошибка создания тестовой задачи в Notion: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+# Фоновая задача: выполняется после коммита и отправки ответа (BackgroundTasks),
+# поэтому HTTP-запрос не ждёт Notion. Страницы кандидатов синхронизирует services/notion_sync.py
+async def create_notion_task(candidate_id: int, task_type: str):
+    """Создать задачу по кандидату в Notion"""
+    notion_service = NotionService()
+    if not notion_service.client:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            candidate = await db.get(Candidate, candidate_id)
+            if candidate:
+                await notion_service.create_task(candidate, task_type)
+    except Exception as e:
+        print(f"Ошибка создания задачи в Notion: {e}")
+    finally:
+        await notion_service.close()
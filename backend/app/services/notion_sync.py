@@ -0,0 +1,334 @@
+import os
+import json
+import socket
+import logging
+import asyncio
+from datetime import datetime, timedelta
+from notion_client.errors import APIResponseError
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import AsyncSessionLocal, Candidate, ChangeLogEntry, NotionSyncState, NotionCandidateSnapshot
+from backend.app.services.change_log import committed_after, START, UPSERT
+from backend.app.services.notion_service import NotionService
+from backend.app.services.rate_limit import TokenBucket
+from backend.app.services.resilience import IntegrationUnavailable
+
+# Кандидаты синхронизируются с Notion по журналу изменений (services/change_log.py): воркер читает
+# строки кандидатов после своей позиции (txid, seq) - только из завершённых транзакций, поэтому
+# длинная транзакция (bulk-загрузка результатов) не проскочит мимо, когда бы она ни закоммитилась.
+# Отправляются только отличающиеся от прошлой отправки свойства, несколько правок одного кандидата
+# в пачке схлопываются в один запрос. Позиция хранится в БД: после рестарта продолжаем с того же места.
+NOTION_SYNC = os.getenv("NOTION_SYNC", "inline")  # inline - в процессе веб-воркера, off - отдельным процессом
+NOTION_SYNC_INTERVAL = float(os.getenv("NOTION_SYNC_INTERVAL", "10"))
+NOTION_SYNC_BATCH_SIZE = int(os.getenv("NOTION_SYNC_BATCH_SIZE", "50"))
+NOTION_RATE = float(os.getenv("NOTION_RATE", "3"))  # запросов в секунду, средний лимит Notion API
+NOTION_SYNC_LEASE = float(os.getenv("NOTION_SYNC_LEASE", "60"))
+
+SYNC_NAME = "candidates"
+
+logger = logging.getLogger(__name__)
+
+class NotionSyncWorker:
+    """Фоновая пакетная синхронизация изменённых кандидатов с Notion"""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.bucket = TokenBucket(NOTION_RATE)
+        self.notion_service = None
+        self._task = None
+        self._wakeup = None
+        self._stopping = False
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(os.getenv("NOTION_TOKEN") and os.getenv("NOTION_DATABASE_ID"))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running or not self.configured:
+            return
+        self.notion_service = NotionService()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._stopping = True
+        self.wake()
+        try:
+            await asyncio.wait_for(self._task, timeout=NOTION_SYNC_INTERVAL + 10)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+        await self._release()
+        await self.notion_service.close()
+
+    def wake(self):
+        """Разбудить воркер после коммита изменений кандидатов"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                processed = await self.sync_once()
+            except Exception as e:
+                print(f"Ошибка синхронизации с Notion: {e}")
+                processed = 0
+            if processed >= NOTION_SYNC_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=NOTION_SYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim(self, db: AsyncSession) -> bool:
+        """Взять аренду: синхронизацию ведёт только один воркер"""
+        if await db.get(NotionSyncState, SYNC_NAME) is None:
+            # Первый запуск: начинаем с конца журнала, полная синхронизация - через --full
+            query = await committed_after(db, select(ChangeLogEntry.txid, ChangeLogEntry.seq), START)
+            last = (await db.execute(
+                query.order_by(ChangeLogEntry.txid.desc(), ChangeLogEntry.seq.desc()).limit(1)
+            )).first() or START
+            db.add(NotionSyncState(name=SYNC_NAME, cursor_txid=last[0], cursor_seq=last[1]))
+            try:
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+        now = datetime.utcnow()
+        claimed = await db.execute(update(NotionSyncState).where(
+            NotionSyncState.name == SYNC_NAME,
+            or_(
+                NotionSyncState.locked_until.is_(None),
+                NotionSyncState.locked_until < now,
+                NotionSyncState.locked_by == self.owner
+            )
+        ).values(
+            locked_by=self.owner,
+            locked_until=now + timedelta(seconds=NOTION_SYNC_LEASE)
+        ))
+        await db.commit()
+        return claimed.rowcount == 1
+
+    async def _release(self):
+        async with self.session_factory() as db:
+            await db.execute(update(NotionSyncState).where(
+                NotionSyncState.name == SYNC_NAME,
+                NotionSyncState.locked_by == self.owner
+            ).values(locked_by=None, locked_until=None))
+            await db.commit()
+
+    async def sync_once(self) -> int:
+        """Отправить в Notion одну пачку изменённых кандидатов"""
+        async with self.session_factory() as db:
+            if not await self._claim(db):
+                return 0
+            state = (await db.execute(
+                select(NotionSyncState).where(NotionSyncState.name == SYNC_NAME)
+                .execution_options(populate_existing=True)
+            )).scalar_one()
+
+            query = await committed_after(
+                db,
+                select(ChangeLogEntry.txid, ChangeLogEntry.seq, ChangeLogEntry.entity_id).where(
+                    ChangeLogEntry.entity == "candidate", ChangeLogEntry.op == UPSERT
+                ),
+                (state.cursor_txid, state.cursor_seq)
+            )
+            rows = (await db.execute(
+                query.order_by(ChangeLogEntry.txid, ChangeLogEntry.seq).limit(NOTION_SYNC_BATCH_SIZE)
+            )).all()
+            if not rows:
+                return 0
+
+            # Кандидат отправляется один раз в порядке своей последней строки в пачке. После него
+            # позицию можно сдвинуть на эту строку: у кандидатов, чьи более ранние строки ещё не
+            # обработаны, в пачке есть строка дальше, и они будут отправлены позже.
+            positions = {}
+            for txid, seq, candidate_id in rows:
+                positions.pop(candidate_id, None)
+                positions[candidate_id] = (txid, seq)
+            found = {
+                candidate.id: candidate
+                for candidate in (await db.scalars(
+                    select(Candidate).where(Candidate.id.in_(list(positions)))
+                )).all()
+            }
+
+            snapshots = {
+                snapshot.candidate_id: json.loads(snapshot.properties)
+                for snapshot in (await db.scalars(
+                    select(NotionCandidateSnapshot).where(
+                        NotionCandidateSnapshot.candidate_id.in_(list(found))
+                    )
+                )).all()
+            }
+
+            processed = 0
+            for candidate_id, position in positions.items():
+                if self._stopping:
+                    break
+                candidate = found.get(candidate_id)
+                try:
+                    # Кандидат удалён после изменения - отправлять нечего. Точка сохранения отменяет
+                    # только записи этого кандидата, остальные объекты пачки остаются загруженными
+                    if candidate is not None:
+                        async with db.begin_nested():
+                            await self.push(db, candidate, snapshots.get(candidate_id))
+                except IntegrationUnavailable as e:
+                    # Выключатель разомкнут или нет ответа: позицию не двигаем
+                    print(f"Notion недоступен, синхронизация отложена: {e}")
+                    await db.rollback()
+                    break
+                except APIResponseError as e:
+                    if e.status == 429 or e.status >= 500:
+                        # Notion перегружен: позицию не двигаем, повторим в следующем проходе
+                        self.bucket.pause(NOTION_SYNC_INTERVAL)
+                        print(f"Notion временно недоступен ({e.status}), синхронизация отложена: {e}")
+                        await db.rollback()
+                        break
+                    # Ошибка данных (например, нет свойства в базе) - повтор не поможет, пропускаем
+                    self.failed += 1
+                    logger.warning(f"Ошибка синхронизации кандидата {candidate_id} с Notion: {e}")
+                except Exception:
+                    # Ошибка в данных кандидата повторится на каждом проходе: пропускаем его, чтобы
+                    # не остановить синхронизацию всех следующих
+                    self.failed += 1
+                    logger.exception(f"Ошибка синхронизации кандидата {candidate_id} с Notion")
+
+                await db.execute(update(NotionSyncState).where(NotionSyncState.name == SYNC_NAME).values(
+                    cursor_txid=position[0],
+                    cursor_seq=position[1],
+                    locked_until=datetime.utcnow() + timedelta(seconds=NOTION_SYNC_LEASE)
+                ))
+                await db.commit()
+                processed += 1
+            # Пачка строк журнала обработана целиком - за ней, вероятно, есть ещё
+            return len(rows) if processed == len(positions) else processed
+
+    def sync_properties(self, candidate: Candidate) -> dict:
+        properties = self.notion_service.candidate_properties(candidate)
+        properties["Дата обновления"] = self.notion_service.date_property(candidate.updated_at)
+        return properties
+
+    async def push(self, db: AsyncSession, candidate: Candidate, snapshot: dict):
+        """Создать страницу или отправить только изменившиеся свойства"""
+        if not candidate.notion_id:
+            properties = self.notion_service.candidate_properties(candidate)
+            await self.bucket.acquire()
+            response = await self.notion_service.create_page(
+                parent={"database_id": self.notion_service.database_id},
+                properties=properties
+            )
+            # Запрос в обход ORM: в журнал изменений он не попадает и кандидат не вернётся в очередь
+            await db.execute(update(Candidate).where(Candidate.id == candidate.id).values(
+                notion_id=response["id"],
+                updated_at=Candidate.updated_at
+            ))
+            self.created += 1
+        else:
+            properties = self.sync_properties(candidate)
+            changed = {
+                name: value for name, value in properties.items()
+                if (snapshot or {}).get(name) != value
+            }
+            if not changed:
+                self.unchanged += 1
+                return
+            await self.bucket.acquire()
+            await self.notion_service.update_page(page_id=candidate.notion_id, properties=changed)
+            self.updated += 1
+
+        await db.merge(NotionCandidateSnapshot(
+            candidate_id=candidate.id,
+            properties=json.dumps(properties, ensure_ascii=False),
+            synced_at=datetime.utcnow()
+        ))
+
+notion_sync_worker = NotionSyncWorker()
+
+async def get_notion_sync_status() -> dict:
+    """Позиция в журнале, отставание и счётчики синхронизации с Notion"""
+    async with AsyncSessionLocal() as db:
+        state = await db.get(NotionSyncState, SYNC_NAME)
+        pending = 0
+        if state is not None:
+            pending = await db.scalar(await committed_after(
+                db,
+                select(func.count(func.distinct(ChangeLogEntry.entity_id))).where(
+                    ChangeLogEntry.entity == "candidate", ChangeLogEntry.op == UPSERT
+                ),
+                (state.cursor_txid, state.cursor_seq)
+            ))
+    return {
+        "pid": os.getpid(),
+        "mode": NOTION_SYNC,
+        "configured": notion_sync_worker.configured,
+        "running": notion_sync_worker.running,
+        "cursor": [state.cursor_txid, state.cursor_seq] if state is not None else None,
+        "locked_by": state.locked_by if state is not None else None,
+        "pending": pending,
+        "created": notion_sync_worker.created,
+        "updated": notion_sync_worker.updated,
+        "unchanged": notion_sync_worker.unchanged,
+        "failed": notion_sync_worker.failed,
+    }
+
+@event.listens_for(Session, "after_flush")
+def _mark_notion_dirty(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Candidate):
+            session.info["notion_dirty"] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _wake_notion_sync(session):
+    if session.info.pop("notion_dirty", False):
+        notion_sync_worker.wake()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_notion_flag(session):
+    session.info.pop("notion_dirty", None)
+
+async def reset_cursor():
+    """Вернуться в начало журнала: следующие проходы синхронизируют всех кандидатов"""
+    async with AsyncSessionLocal() as db:
+        state = await db.get(NotionSyncState, SYNC_NAME)
+        if state is None:
+            db.add(NotionSyncState(name=SYNC_NAME, cursor_txid=START[0], cursor_seq=START[1]))
+        else:
+            state.cursor_txid, state.cursor_seq = START
+        await db.commit()
+
+async def run_forever(full: bool = False):
+    if full:
+        await reset_cursor()
+    notion_sync_worker.start()
+    if not notion_sync_worker.running:
+        print("NOTION_TOKEN или NOTION_DATABASE_ID не заданы")
+        return
+    try:
+        await notion_sync_worker._task
+    finally:
+        await notion_sync_worker.stop()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Синхронизация кандидатов с Notion (запуск вместе с NOTION_SYNC=off у веб-воркеров)")
+    parser.add_argument("--full", action="store_true", help="начать с начала журнала, а не с сохранённой позиции")
+    args = parser.parse_args()
+    asyncio.run(run_forever(args.full))
@@ -0,0 +1,135 @@
+import os
+import time
+import asyncio
+
+# Общий слой устойчивости для внешних интеграций (Telegram, Notion): у каждого вызова есть
+# бюджет времени, а после серии сбоев выключатель размыкается и вызовы сразу отклоняются,
+# не занимая воркер до таймаута gunicorn. Через recovery_timeout пропускается пробный вызов.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RECOVERY_TIMEOUT = float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30"))
+TELEGRAM_CALL_TIMEOUT = float(os.getenv("TELEGRAM_CALL_TIMEOUT", "8"))
+NOTION_CALL_TIMEOUT = float(os.getenv("NOTION_CALL_TIMEOUT", "10"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class IntegrationUnavailable(Exception):
+    """Внешний сервис недоступен: выключатель разомкнут или истёк бюджет времени"""
+
+class CircuitOpenError(IntegrationUnavailable):
+    pass
+
+class CallTimeoutError(IntegrationUnavailable):
+    pass
+
+class CircuitBreaker:
+    """Выключатель: closed -> open после failure_threshold сбоев подряд -> half_open -> closed"""
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout: float = BREAKER_RECOVERY_TIMEOUT,
+        is_failure=None
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        # Ошибки клиента (неверный запрос, нет доступа) не говорят о сбое сервиса
+        self.is_failure = is_failure or (lambda error: True)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_failures = 0
+
+    def _allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            # Пока идёт пробный вызов, остальные отклоняются
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def _on_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != CLOSED:
+            print(f"Выключатель {self.name}: сервис восстановлен")
+        self.state = CLOSED
+
+    def _on_failure(self):
+        self.failures += 1
+        self.total_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f"Выключатель {self.name} разомкнут после {self.failures} сбоев подряд")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    async def call(self, func, *args, **kwargs):
+        """Вызвать корутину func с бюджетом времени через выключатель"""
+        if not self._allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name}: сервис недоступен, повторите позже")
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._on_failure()
+            raise CallTimeoutError(f"{self.name}: нет ответа за {self.timeout:g} с")
+        except asyncio.CancelledError:
+            self._probe_in_flight = False
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self._on_failure()
+            else:
+                self._on_success()
+            raise
+        self._on_success()
+        return result
+
+    def snapshot(self) -> dict:
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(self.recovery_timeout - (time.monotonic() - self.opened_at), 0.0)
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "timeout": self.timeout,
+            "retry_in": round(retry_in, 3),
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "total_failures": self.total_failures,
+        }
+
+breakers = {}
+
+def get_breaker(name: str, timeout: float, is_failure=None) -> CircuitBreaker:
+    """Выключатель процесса для интеграции name (создаётся при первом обращении)"""
+    breaker = breakers.get(name)
+    if breaker is None:
+        breaker = breakers[name] = CircuitBreaker(name, timeout, is_failure=is_failure)
+    return breaker
+
+def get_breakers_status() -> dict:
+    """Состояние выключателей текущего воркера"""
+    return {
+        "pid": os.getpid(),
+        "breakers": {name: breaker.snapshot() for name, breaker in breakers.items()},
+    }
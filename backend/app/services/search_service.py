@@ -0,0 +1,306 @@
+import re
+from sqlalchemy import Float, Integer, inspect, literal, or_, select, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import Candidate
+
+# Поисковый индекс хранится отдельно от моделей: в SQLite это виртуальная таблица FTS5,
+# в PostgreSQL - таблица с tsvector и триграммным индексом. Обе поддерживаются триггерами,
+# поэтому любые записи в candidates и interview_logs попадают в индекс автоматически.
+SEARCH_TABLE = "candidate_search"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TOKENS = 8
+MAX_FUZZY_EXPANSIONS = 10
+
+def _fold(expression: str) -> str:
+    """SQL-выражение, заменяющее ё на е (unicode61 их не отождествляет)"""
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+_SQLITE_ANSWERS = _fold("coalesce((SELECT group_concat(answer, ' ') FROM interview_logs WHERE candidate_id = {cid}), '')")
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        full_name, name, telegram_username, results, answers,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE}_vocab USING fts5vocab({SEARCH_TABLE}, 'row')",
+    f"""CREATE TRIGGER IF NOT EXISTS candidates_search_insert AFTER INSERT ON candidates BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, full_name, name, telegram_username, results, answers)
+        VALUES (new.id, {_fold('new.full_name')}, {_fold('new.name')}, new.telegram_username, {_fold('new.results')}, '');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS candidates_search_update
+    AFTER UPDATE OF full_name, name, telegram_username, results ON candidates BEGIN
+        UPDATE {SEARCH_TABLE} SET full_name = {_fold('new.full_name')}, name = {_fold('new.name')},
+            telegram_username = new.telegram_username, results = {_fold('new.results')}
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS candidates_search_delete AFTER DELETE ON candidates BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS interview_logs_search_insert AFTER INSERT ON interview_logs BEGIN
+        UPDATE {SEARCH_TABLE} SET answers = {_SQLITE_ANSWERS.format(cid='new.candidate_id')}
+        WHERE rowid = new.candidate_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS interview_logs_search_update
+    AFTER UPDATE OF answer, candidate_id ON interview_logs BEGIN
+        UPDATE {SEARCH_TABLE} SET answers = {_SQLITE_ANSWERS.format(cid='old.candidate_id')}
+        WHERE rowid = old.candidate_id;
+        UPDATE {SEARCH_TABLE} SET answers = {_SQLITE_ANSWERS.format(cid='new.candidate_id')}
+        WHERE rowid = new.candidate_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS interview_logs_search_delete AFTER DELETE ON interview_logs BEGIN
+        UPDATE {SEARCH_TABLE} SET answers = {_SQLITE_ANSWERS.format(cid='old.candidate_id')}
+        WHERE rowid = old.candidate_id;
+    END""",
+]
+
+SQLITE_BACKFILL = f"""
+    INSERT INTO {SEARCH_TABLE}(rowid, full_name, name, telegram_username, results, answers)
+    SELECT c.id, {_fold('c.full_name')}, {_fold('c.name')}, c.telegram_username, {_fold('c.results')},
+           {_SQLITE_ANSWERS.format(cid='c.id')}
+    FROM candidates c
+"""
+
+# Документ и tsvector кандидата: имя и username важнее результатов, результаты важнее ответов
+_POSTGRES_DOCUMENT = f"""
+    INSERT INTO {SEARCH_TABLE} (candidate_id, document, search_vector)
+    SELECT c.id,
+           translate(lower(concat_ws(' ', c.full_name, c.name, c.telegram_username, c.results, a.answers)), 'ё', 'е'),
+           setweight(to_tsvector('simple', translate(concat_ws(' ', c.full_name, c.name, c.telegram_username), 'ёЁ', 'еЕ')), 'A') ||
+           setweight(to_tsvector('simple', translate(coalesce(c.results, ''), 'ёЁ', 'еЕ')), 'B') ||
+           setweight(to_tsvector('simple', translate(coalesce(a.answers, ''), 'ёЁ', 'еЕ')), 'C')
+    FROM candidates c
+    LEFT JOIN LATERAL (
+        SELECT string_agg(answer, ' ') AS answers FROM interview_logs WHERE candidate_id = c.id
+    ) a ON true
+    {{where}}
+    ON CONFLICT (candidate_id) DO UPDATE
+        SET document = EXCLUDED.document, search_vector = EXCLUDED.search_vector
+"""
+
+POSTGRES_SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+        candidate_id INTEGER PRIMARY KEY REFERENCES candidates(id) ON DELETE CASCADE,
+        document TEXT NOT NULL DEFAULT '',
+        search_vector TSVECTOR NOT NULL
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_vector ON {SEARCH_TABLE} USING GIN (search_vector)",
+    f"""CREATE OR REPLACE FUNCTION refresh_candidate_search(cid INTEGER) RETURNS void AS $$
+    BEGIN
+        {_POSTGRES_DOCUMENT.format(where='WHERE c.id = cid')};
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION candidates_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM refresh_candidate_search(NEW.id);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION interview_logs_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM refresh_candidate_search(OLD.candidate_id);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM refresh_candidate_search(NEW.candidate_id);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS candidates_search ON candidates",
+    """CREATE TRIGGER candidates_search
+    AFTER INSERT OR UPDATE OF full_name, name, telegram_username, results ON candidates
+    FOR EACH ROW EXECUTE FUNCTION candidates_search_trigger()""",
+    "DROP TRIGGER IF EXISTS interview_logs_search ON interview_logs",
+    """CREATE TRIGGER interview_logs_search
+    AFTER INSERT OR DELETE OR UPDATE OF answer, candidate_id ON interview_logs
+    FOR EACH ROW EXECUTE FUNCTION interview_logs_search_trigger()""",
+]
+
+POSTGRES_TRIGRAM_SCHEMA = [
+    f"""CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document_trgm
+    ON {SEARCH_TABLE} USING GIN (document gin_trgm_ops)""",
+]
+
+# Доступный движок поиска по диалекту: "fts5", "tsvector", "tsvector+trgm" или None
+_backends = {}
+
+def _postgres_has_trigram(connection) -> bool:
+    return bool(connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar())
+
+def _enable_trigram(connection) -> bool:
+    """Попробовать включить pg_trgm; без прав на расширение работаем только с tsvector"""
+    if _postgres_has_trigram(connection):
+        return True
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        return True
+    except DBAPIError as e:
+        print(f"pg_trgm недоступен, нечёткий поиск отключен: {e}")
+        return False
+
+def install_search_index(connection, rebuild: bool = False):
+    """Создать поисковый индекс и триггеры, если их ещё нет (синхронное соединение)"""
+    dialect = connection.dialect.name
+    exists = inspect(connection).has_table(SEARCH_TABLE)
+
+    try:
+        if dialect == "sqlite":
+            if rebuild and exists:
+                connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+            for statement in SQLITE_SCHEMA:
+                connection.execute(text(statement))
+            if rebuild or not exists:
+                connection.execute(text(SQLITE_BACKFILL))
+            _backends[dialect] = "fts5"
+        elif dialect == "postgresql":
+            trigram = _enable_trigram(connection)
+            if rebuild or not exists:
+                for statement in POSTGRES_SCHEMA:
+                    connection.execute(text(statement))
+                connection.execute(text(_POSTGRES_DOCUMENT.format(where="")))
+            if trigram:
+                for statement in POSTGRES_TRIGRAM_SCHEMA:
+                    connection.execute(text(statement))
+            _backends[dialect] = "tsvector+trgm" if trigram else "tsvector"
+    except OperationalError as e:
+        # Например, SQLite собран без FTS5 - остаёмся на простом поиске по ILIKE
+        print(f"Не удалось создать поисковый индекс: {e}")
+        _backends[dialect] = None
+
+def _detect_backend(connection):
+    dialect = connection.dialect.name
+    if dialect not in _backends:
+        if not inspect(connection).has_table(SEARCH_TABLE):
+            _backends[dialect] = None
+        elif dialect == "sqlite":
+            _backends[dialect] = "fts5"
+        elif dialect == "postgresql":
+            _backends[dialect] = "tsvector+trgm" if _postgres_has_trigram(connection) else "tsvector"
+        else:
+            _backends[dialect] = None
+    return _backends[dialect]
+
+def tokenize(term: str) -> list:
+    return [token.lower().replace("ё", "е") for token in TOKEN_RE.findall(term)][:MAX_TOKENS]
+
+def _prefix_distance(token: str, term: str, limit: int) -> int:
+    """Расстояние Левенштейна от token до ближайшего префикса term (с отсечкой по limit)"""
+    previous = list(range(len(token) + 1))
+    best = previous[-1]
+    for i, char in enumerate(term, 1):
+        current = [i]
+        for j, token_char in enumerate(token, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != token_char)
+            ))
+        best = min(best, current[-1])
+        if min(current) > limit:
+            break
+        previous = current
+    return best
+
+def _allowed_typos(token: str) -> int:
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 7 else 2
+
+class SearchService:
+    """Ранжированный полнотекстовый и нечёткий поиск кандидатов"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def backend(self):
+        connection = await self.db.connection()
+        return await connection.run_sync(_detect_backend)
+
+    async def ranked_subquery(self, term: str):
+        """Подзапрос (candidate_id, rank) с найденными кандидатами; больший rank - лучше"""
+        tokens = tokenize(term)
+        if not tokens:
+            return None
+
+        backend = await self.backend()
+        if backend == "fts5":
+            statement = await self._fts5_statement(tokens)
+        elif backend in ("tsvector", "tsvector+trgm"):
+            statement = self._postgres_statement(term, tokens, trigram=backend == "tsvector+trgm")
+        else:
+            statement = self._fallback_statement(term)
+        return statement.subquery("search_matches")
+
+    async def _fts5_statement(self, tokens: list):
+        exact = " AND ".join(f'"{token}"*' for token in tokens)
+        groups = []
+        fuzzy = False
+        for token in tokens:
+            variants = [f'"{token}"*']
+            variants += [f'"{term}"' for term in await self._fuzzy_terms(token)]
+            fuzzy = fuzzy or len(variants) > 1
+            groups.append("(" + " OR ".join(variants) + ")")
+
+        # bm25 в FTS5 отрицательный: чем меньше, тем релевантнее
+        rank = f"-bm25({SEARCH_TABLE}, 10.0, 10.0, 8.0, 2.0, 1.0)"
+        params = {"match": " AND ".join(groups)}
+        if fuzzy:
+            # Совпадения без исправления опечаток всегда выше исправленных
+            rank += f" + CASE WHEN rowid IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :exact) THEN 1000 ELSE 0 END"
+            params["exact"] = exact
+
+        return text(f"""
+            SELECT rowid AS candidate_id, {rank} AS rank
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH :match
+        """).bindparams(**params).columns(candidate_id=Integer, rank=Float)
+
+    async def _fuzzy_terms(self, token: str) -> list:
+        """Термины словаря FTS5, отличающиеся от префикса token не более чем на 1-2 правки"""
+        limit = _allowed_typos(token)
+        if not limit:
+            return []
+
+        # Первые две буквы считаем верными - так перебор словаря остаётся дешёвым
+        low = token[:2]
+        high = low[:-1] + chr(ord(low[-1]) + 1)
+        terms = (await self.db.execute(
+            text(f"SELECT term FROM {SEARCH_TABLE}_vocab WHERE term >= :low AND term < :high"),
+            {"low": low, "high": high}
+        )).scalars().all()
+
+        scored = []
+        for term in terms:
+            if term.startswith(token) or len(term) < len(token) - limit:
+                continue
+            distance = _prefix_distance(token, term, limit)
+            if distance <= limit:
+                scored.append((distance, term))
+        scored.sort()
+        return [term for _, term in scored[:MAX_FUZZY_EXPANSIONS]]
+
+    def _postgres_statement(self, term: str, tokens: list, trigram: bool):
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        if trigram:
+            return text(f"""
+                SELECT candidate_id,
+                       ts_rank(search_vector, query) + word_similarity(:term, document) AS rank
+                FROM {SEARCH_TABLE}, to_tsquery('simple', :tsquery) AS query
+                WHERE search_vector @@ query OR :term <% document
+            """).bindparams(term=term.lower().replace("ё", "е"), tsquery=tsquery).columns(candidate_id=Integer, rank=Float)
+        return text(f"""
+            SELECT candidate_id, ts_rank(search_vector, query) AS rank
+            FROM {SEARCH_TABLE}, to_tsquery('simple', :tsquery) AS query
+            WHERE search_vector @@ query
+        """).bindparams(tsquery=tsquery).columns(candidate_id=Integer, rank=Float)
+
+    def _fallback_statement(self, term: str):
+        pattern = f"%{term}%"
+        return select(
+            Candidate.id.label("candidate_id"),
+            literal(1.0, Float).label("rank")
+        ).where(or_(
+            Candidate.full_name.ilike(pattern),
+            Candidate.name.ilike(pattern),
+            Candidate.telegram_username.ilike(pattern)
+        ))
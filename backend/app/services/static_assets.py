@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import gzip
+import hashlib
+import mimetypes
+from email.utils import formatdate
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+# Раздача собранного фронтенда (CRA). Файлы с хэшем содержимого в имени (main.bffd94f9.js, его .map
+# и LICENSE.txt) не меняются никогда: они отдаются с Cache-Control immutable на год. Остальные файлы
+# (index.html, manifest.json) браузер перепроверяет каждый раз по ETag и получает 304, пока сборка
+# не изменилась. ETag - sha256 содержимого, а не mtime: после повторной сборки на Render он тот же.
+# Сжатые варианты .br/.gz создаются при сборке (python -m backend.app.services.static_assets) и
+# выбираются по Accept-Encoding; манифест с хэшами пишется туда же и читается при старте.
+STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "static"))
+STATIC_IMMUTABLE_MAX_AGE = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", "31536000"))
+
+MANIFEST_NAME = "static-manifest.json"
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]  # в порядке предпочтения
+COMPRESSIBLE_EXTENSIONS = {".js", ".css", ".html", ".json", ".map", ".svg", ".txt", ".ico", ".xml", ".webmanifest"}
+COMPRESS_MIN_SIZE = 1024
+
+def is_hashed_name(path: str) -> bool:
+    """В имени файла есть хэш содержимого, который ставит сборщик"""
+    return HASHED_NAME.search(os.path.basename(path)) is not None
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def accepted_encodings(header: str) -> set:
+    """Кодировки из Accept-Encoding с ненулевым q"""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Слабое сравнение If-None-Match, как требует RFC 9110"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def _walk(directory: str):
+    """Относительные пути исходных файлов сборки (без сжатых вариантов, манифеста и скрытых файлов)"""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith(".") or name == MANIFEST_NAME or name.endswith((".br", ".gz")):
+                continue
+            yield os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+
+def build_manifest(directory: str, previous: dict = None) -> dict:
+    """path -> {size, mtime, sha256, hashed, encodings}; хэш пересчитывается только у изменившихся файлов"""
+    previous = previous or {}
+    manifest = {}
+    for path in _walk(directory):
+        full_path = os.path.join(directory, path)
+        stat = os.stat(full_path)
+        entry = previous.get(path)
+        if not entry or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_digest(full_path)}
+        entry = dict(entry, hashed=is_hashed_name(path), encodings=[])
+        for encoding, suffix in ENCODINGS:
+            variant = full_path + suffix
+            # Устаревший вариант от прошлой сборки (старше исходника) не отдаём
+            if os.path.isfile(variant) and os.stat(variant).st_mtime >= stat.st_mtime:
+                entry["encodings"].append(encoding)
+        manifest[path] = entry
+    return manifest
+
+def precompress(directory: str) -> dict:
+    """Создаёт .gz и .br (если установлен Brotli) рядом с текстовыми файлами и пишет манифест"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("Brotli не установлен, создаются только .gz")
+
+    for path in _walk(directory):
+        full_path = os.path.join(directory, path)
+        if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        with open(full_path, "rb") as f:
+            data = f.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            continue
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            # Сжатие, которое почти ничего не даёт, не стоит лишнего файла
+            if len(compressed) < len(data) * 0.9:
+                with open(full_path + suffix, "wb") as f:
+                    f.write(compressed)
+            elif os.path.exists(full_path + suffix):
+                os.remove(full_path + suffix)
+
+    manifest = build_manifest(directory)
+    with open(os.path.join(directory, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+class StaticAssets:
+    """ASGI-приложение для /static и ответы для index.html по манифесту сборки"""
+
+    def __init__(self, directory: str, immutable_max_age: int = STATIC_IMMUTABLE_MAX_AGE):
+        self.directory = os.path.abspath(directory)
+        self.immutable_max_age = immutable_max_age
+        self._manifest = None
+        self.responses = 0
+        self.not_modified = 0
+        self.encoded = {encoding: 0 for encoding, _ in ENCODINGS}
+
+    def load(self):
+        """Читает манифест сборки и сверяет его с файлами на диске"""
+        previous = {}
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME)) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            pass
+        try:
+            self._manifest = build_manifest(self.directory, previous)
+        except OSError as e:
+            print(f"Статические файлы не найдены в {self.directory}: {e}")
+            self._manifest = {}
+        return self._manifest
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            self.load()
+        return self._manifest
+
+    def response(self, request_headers, path: str) -> Response:
+        """Ответ на файл сборки: 200 с нужным вариантом или 304; FileNotFoundError, если файла нет в сборке"""
+        entry = self.manifest.get(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+
+        encoding = None
+        if entry["encodings"]:
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            encoding = next((e for e in entry["encodings"] if e in accepted), None)
+
+        etag = f'"{entry["sha256"][:32]}-{encoding}"' if encoding else f'"{entry["sha256"][:32]}"'
+        if entry["hashed"]:
+            cache_control = f"public, max-age={self.immutable_max_age}, immutable"
+        else:
+            cache_control = "no-cache"
+        headers = {"cache-control": cache_control, "etag": etag, "last-modified": formatdate(entry["mtime"], usegmt=True)}
+        if entry["encodings"]:
+            headers["vary"] = "Accept-Encoding"
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        self.responses += 1
+        full_path = os.path.join(self.directory, path)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if encoding:
+            self.encoded[encoding] += 1
+            headers["content-encoding"] = encoding
+            full_path += dict(ENCODINGS)[encoding]
+        return FileResponse(full_path, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            response = Response(status_code=405, headers={"allow": "GET, HEAD"})
+        else:
+            # Mount оставляет полный путь в path и кладёт префикс в root_path
+            path, root_path = scope["path"], scope.get("root_path", "")
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            try:
+                response = self.response(Headers(scope=scope), path.lstrip("/"))
+            except FileNotFoundError:
+                response = Response("Not Found", status_code=404, media_type="text/plain")
+        await response(scope, receive, send)
+
+    def snapshot(self) -> dict:
+        manifest = self.manifest
+        return {
+            "pid": os.getpid(),
+            "directory": self.directory,
+            "files": len(manifest),
+            "hashed": sum(1 for entry in manifest.values() if entry["hashed"]),
+            "precompressed": {encoding: sum(1 for entry in manifest.values() if encoding in entry["encodings"]) for encoding, _ in ENCODINGS},
+            "immutable_max_age": self.immutable_max_age,
+            "responses": self.responses,
+            "not_modified": self.not_modified,
+            "encoded": dict(self.encoded),
+        }
+
+static_assets = StaticAssets(STATIC_DIR)
+
+def get_static_assets_status() -> dict:
+    """Манифест сборки и счётчики раздачи статики текущего воркера"""
+    return static_assets.snapshot()
+
+if __name__ == "__main__":
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR
+    manifest = precompress(directory)
+    print(f"Манифест {MANIFEST_NAME}: {len(manifest)} файлов, с хэшем в имени: {sum(1 for e in manifest.values() if e['hashed'])}")
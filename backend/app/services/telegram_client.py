@@ -0,0 +1,113 @@
+import os
+import httpx
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError
+from telegram.request import HTTPXRequest
+from dotenv import load_dotenv
+from backend.app.services.resilience import get_breaker, TELEGRAM_CALL_TIMEOUT
+
+load_dotenv()
+
+# Один Bot и один HTTP-клиент на воркер: соединения к api.telegram.org переиспользуются
+# между запросами вместо нового TLS-рукопожатия на каждое уведомление.
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "32"))
+TELEGRAM_KEEPALIVE_CONNECTIONS = int(os.getenv("TELEGRAM_KEEPALIVE_CONNECTIONS", "16"))
+TELEGRAM_KEEPALIVE_EXPIRY = float(os.getenv("TELEGRAM_KEEPALIVE_EXPIRY", "60"))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "5"))
+TELEGRAM_READ_TIMEOUT = float(os.getenv("TELEGRAM_READ_TIMEOUT", "10"))
+TELEGRAM_POOL_TIMEOUT = float(os.getenv("TELEGRAM_POOL_TIMEOUT", "5"))
+# Свой сервер Bot API (telegram-bot-api), по умолчанию api.telegram.org
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
+
+def _telegram_failure(error: Exception) -> bool:
+    # Сбой сервиса - сеть, таймауты и 5xx; BadRequest в PTB тоже NetworkError, но это ошибка запроса
+    return isinstance(error, NetworkError) and not isinstance(error, BadRequest)
+
+# Все отправки в Bot API идут через выключатель: при деградации Telegram запросы отклоняются сразу
+telegram_breaker = get_breaker("telegram", TELEGRAM_CALL_TIMEOUT, is_failure=_telegram_failure)
+
+class ConnectionStats:
+    """Счётчики HTTP-запросов и новых соединений клиента Telegram"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+
+    async def on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    async def trace(self, event_name: str, info: dict):
+        # httpcore сообщает об установке TCP-соединения только для новых соединений
+        if event_name == "connection.connect_tcp.complete":
+            self.connections += 1
+
+    def snapshot(self) -> dict:
+        reused = max(self.requests - self.connections, 0)
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+class TelegramClient:
+    """Долгоживущий Bot с общим пулом соединений; закрывается в lifespan приложения"""
+
+    def __init__(self):
+        self.stats = ConnectionStats()
+        self.bot = None
+        self._request = None
+
+    def _build_request(self) -> HTTPXRequest:
+        return HTTPXRequest(
+            connection_pool_size=TELEGRAM_POOL_SIZE,
+            connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+            read_timeout=TELEGRAM_READ_TIMEOUT,
+            pool_timeout=TELEGRAM_POOL_TIMEOUT,
+            httpx_kwargs={
+                "limits": httpx.Limits(
+                    max_connections=TELEGRAM_POOL_SIZE,
+                    max_keepalive_connections=TELEGRAM_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=TELEGRAM_KEEPALIVE_EXPIRY,
+                ),
+                "event_hooks": {"request": [self.stats.on_request]},
+            },
+        )
+
+    def get_bot(self):
+        """Общий Bot воркера или None, если токен не задан"""
+        if self.bot is None:
+            token = os.getenv("TELEGRAM_BOT_TOKEN")
+            if not token:
+                return None
+            self._request = self._build_request()
+            # get_updates в веб-приложении не используется, отдельный пул ему не нужен
+            self.bot = Bot(
+                token=token,
+                base_url=TELEGRAM_API_URL,
+                request=self._request,
+                get_updates_request=self._request
+            )
+        return self.bot
+
+    async def close(self):
+        if self._request is not None:
+            await self._request.shutdown()
+        self.bot = None
+        self._request = None
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "configured": self.bot is not None,
+            "pool_size": TELEGRAM_POOL_SIZE,
+            "keepalive_connections": TELEGRAM_KEEPALIVE_CONNECTIONS,
+            "keepalive_expiry": TELEGRAM_KEEPALIVE_EXPIRY,
+            **self.stats.snapshot(),
+        }
+
+telegram_client = TelegramClient()
+
+def get_telegram_client_status() -> dict:
+    """Переиспользование соединений клиента Telegram текущего воркера"""
+    return telegram_client.snapshot()
@@ -0,0 +1,145 @@
+import os
+import asyncio
+from collections import OrderedDict
+from datetime import timedelta
+from telegram.error import RetryAfter, NetworkError, TelegramError
+from backend.app.services.rate_limit import TokenBucket
+from backend.app.services.resilience import CircuitBreaker, CircuitOpenError, CallTimeoutError
+from backend.app.services.telegram_client import telegram_breaker
+
+# Лимиты Bot API: около 30 сообщений в секунду на бота и 1 сообщение в секунду в один чат.
+# Лимитер общий для процесса, поэтому параллельные рассылки делят один бюджет.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_PER_CHAT_RATE = float(os.getenv("TELEGRAM_PER_CHAT_RATE", "1"))
+TELEGRAM_FANOUT_CONCURRENCY = int(os.getenv("TELEGRAM_FANOUT_CONCURRENCY", "20"))
+TELEGRAM_SEND_RETRIES = int(os.getenv("TELEGRAM_SEND_RETRIES", "3"))
+
+def _seconds(value) -> float:
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+class TelegramRateLimiter:
+    """Глобальный и поканальный лимиты отправки сообщений"""
+
+    def __init__(self, global_rate: float, per_chat_rate: float, max_chats: int = 10000):
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.max_chats = max_chats
+        self._chats = OrderedDict()
+
+    def chat(self, chat_id) -> TokenBucket:
+        chat_id = str(chat_id)
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate)
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def acquire(self, chat_id):
+        # Сначала лимит чата, чтобы не занимать глобальный токен во время ожидания
+        await self.chat(chat_id).acquire()
+        await self.global_bucket.acquire()
+
+    def retry_after(self, chat_id, seconds: float):
+        self.chat(chat_id).pause(seconds)
+        self.global_bucket.pause(seconds)
+
+telegram_rate_limiter = TelegramRateLimiter(TELEGRAM_GLOBAL_RATE, TELEGRAM_PER_CHAT_RATE)
+
+class RecipientOutcome:
+    """Результат отправки одному получателю"""
+
+    def __init__(self, chat_id, name: str = None):
+        self.chat_id = chat_id
+        self.name = name
+        self.ok = False
+        self.attempts = 0
+        self.error = None
+        # Ошибка временная (сеть, флуд-контроль, выключатель) - отправку стоит повторить позже
+        self.retryable = False
+
+    def as_dict(self) -> dict:
+        return {
+            "chat_id": self.chat_id,
+            "name": self.name,
+            "ok": self.ok,
+            "attempts": self.attempts,
+            "error": self.error,
+            "retryable": self.retryable,
+        }
+
+class FanoutResult:
+    """Итог рассылки; истинен, если доставлено хотя бы одному получателю"""
+
+    def __init__(self, outcomes: list):
+        self.outcomes = outcomes
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for outcome in self.outcomes if outcome.ok)
+
+    @property
+    def failed(self) -> list:
+        return [outcome for outcome in self.outcomes if not outcome.ok]
+
+    @property
+    def retryable(self) -> list:
+        return [outcome for outcome in self.outcomes if not outcome.ok and outcome.retryable]
+
+    def __bool__(self) -> bool:
+        return self.sent > 0
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": len(self.failed),
+            "outcomes": [outcome.as_dict() for outcome in self.outcomes],
+        }
+
+async def fan_out(
+    bot,
+    recipients: list,
+    limiter: TelegramRateLimiter = telegram_rate_limiter,
+    concurrency: int = TELEGRAM_FANOUT_CONCURRENCY,
+    retries: int = TELEGRAM_SEND_RETRIES,
+    breaker: CircuitBreaker = telegram_breaker,
+    **send_kwargs
+) -> FanoutResult:
+    """Параллельно отправить сообщение получателям [(chat_id, name), ...] с учётом лимитов"""
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = [RecipientOutcome(chat_id, name) for chat_id, name in recipients]
+
+    async def deliver(outcome: RecipientOutcome):
+        async with semaphore:
+            while outcome.attempts <= retries:
+                await limiter.acquire(outcome.chat_id)
+                outcome.attempts += 1
+                try:
+                    await breaker.call(bot.send_message, chat_id=outcome.chat_id, **send_kwargs)
+                    outcome.ok = True
+                    outcome.error = None
+                    return
+                except RetryAfter as e:
+                    # Флуд-контроль: пауза для чата и всего бота, затем повтор
+                    outcome.error = str(e)
+                    outcome.retryable = True
+                    limiter.retry_after(outcome.chat_id, _seconds(e.retry_after))
+                except CircuitOpenError as e:
+                    # Telegram недоступен: не ждём, уведомление повторит outbox
+                    outcome.error = str(e)
+                    outcome.retryable = True
+                    return
+                except (NetworkError, CallTimeoutError) as e:
+                    outcome.error = str(e)
+                    outcome.retryable = True
+                    await asyncio.sleep(min(0.5 * 2 ** (outcome.attempts - 1), 10))
+                except TelegramError as e:
+                    # Заблокированный бот, неверный chat_id и т.п. - повтор не поможет
+                    outcome.error = str(e)
+                    outcome.retryable = False
+                    return
+
+    await asyncio.gather(*(deliver(outcome) for outcome in outcomes))
+    return FanoutResult(outcomes)
@@ -0,0 +1,129 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import functools
+import urllib.parse
+from collections import OrderedDict
+
+# Проверка initData из Telegram Mini Apps (https://core.telegram.org/bots/webapps#validating-data-received-via-the-mini-app).
+# Секрет HMAC зависит только от токена бота и считается один раз на токен. Mini App авторизуется
+# при каждом открытии с одной и той же initData, поэтому успешно проверенные строки запоминаются
+# в LRU по их hash до истечения auth_date + TELEGRAM_INIT_DATA_MAX_AGE.
+TELEGRAM_INIT_DATA_MAX_AGE = float(os.getenv("TELEGRAM_INIT_DATA_MAX_AGE", "86400"))  # 0 - без срока
+TELEGRAM_INIT_DATA_CACHE_SIZE = int(os.getenv("TELEGRAM_INIT_DATA_CACHE_SIZE", "1024"))
+
+class InitDataError(ValueError):
+    """initData пустая, повреждена, подделана или устарела"""
+
+@functools.lru_cache(maxsize=8)
+def webapp_secret(bot_token: str) -> bytes:
+    """Секретный ключ HMAC-SHA256("WebAppData", bot_token)"""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+def parse_init_data(init_data: str) -> list:
+    """Пары (ключ, значение) initData с раскодированными значениями"""
+    try:
+        return urllib.parse.parse_qsl(init_data, keep_blank_values=True, strict_parsing=True)
+    except ValueError:
+        raise InitDataError("Неверный формат init_data")
+
+def build_data_check_string(pairs) -> str:
+    """Все поля, кроме hash, в алфавитном порядке ключей в виде key=value через перевод строки"""
+    return "\n".join(f"{key}={value}" for key, value in sorted(pairs) if key != "hash")
+
+def sign_init_data(pairs, bot_token: str) -> str:
+    """Подпись пар initData (hex); так же подписывает Telegram"""
+    return hmac.new(webapp_secret(bot_token), build_data_check_string(pairs).encode(), hashlib.sha256).hexdigest()
+
+def extract_user_data(pairs) -> dict:
+    """Поля initData без hash; поля объекта user поднимаются на верхний уровень"""
+    user_data = {key: value for key, value in pairs if key != "hash"}
+    if user_data.get("user"):
+        try:
+            user = json.loads(user_data["user"])
+        except json.JSONDecodeError:
+            raise InitDataError("Неверный формат поля user в init_data")
+        if isinstance(user, dict):
+            user_data.update(user)
+    return user_data
+
+class InitDataValidator:
+    """Проверка подписи и срока initData с LRU уже проверенных строк"""
+
+    def __init__(self, max_age: float = TELEGRAM_INIT_DATA_MAX_AGE, cache_size: int = TELEGRAM_INIT_DATA_CACHE_SIZE):
+        self.max_age = max_age
+        self.cache_size = cache_size
+        # hash -> (init_data, auth_date, user_data)
+        self._verified = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def _check_age(self, auth_date: int):
+        if self.max_age > 0 and time.time() - auth_date > self.max_age:
+            self.rejected += 1
+            raise InitDataError("init_data устарели, откройте приложение заново")
+
+    def validate(self, init_data: str, bot_token: str) -> dict:
+        """Данные пользователя из initData; InitDataError, если подпись или срок не сходятся"""
+        if not init_data or not init_data.strip():
+            raise InitDataError("Пустые данные init_data")
+
+        pairs = None
+        data_hash = None
+        if bot_token:
+            # hash стоит в конце строки, полный разбор для поиска в кэше не нужен
+            _, _, tail = init_data.rpartition("hash=")
+            data_hash = tail.split("&", 1)[0]
+            cached = self._verified.get(data_hash)
+            # compare_digest сравнивает str только из ASCII, поэтому сравниваем байты
+            if cached is not None and hmac.compare_digest(cached[0].encode(), init_data.encode()):
+                try:
+                    self._check_age(cached[1])
+                except InitDataError:
+                    del self._verified[data_hash]
+                    raise
+                self._verified.move_to_end(data_hash)
+                self.hits += 1
+                return dict(cached[2])
+
+            self.misses += 1
+            pairs = parse_init_data(init_data)
+            data_hash = dict(pairs).get("hash")
+            if not data_hash or not hmac.compare_digest(sign_init_data(pairs, bot_token).encode(), data_hash.encode()):
+                self.rejected += 1
+                raise InitDataError("Неверная подпись init_data")
+
+        # Без токена бота (локальная разработка) подпись не проверяется и ничего не кэшируется
+        pairs = pairs if pairs is not None else parse_init_data(init_data)
+        user_data = extract_user_data(pairs)
+        if not bot_token:
+            return user_data
+
+        try:
+            auth_date = int(user_data.get("auth_date") or 0)
+        except ValueError:
+            raise InitDataError("Неверный auth_date в init_data")
+        self._check_age(auth_date)
+
+        if self.cache_size > 0:
+            self._verified[data_hash] = (init_data, auth_date, dict(user_data))
+            self._verified.move_to_end(data_hash)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return user_data
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "max_age": self.max_age,
+            "cache_size": self.cache_size,
+            "entries": len(self._verified),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+        }
+
+init_data_validator = InitDataValidator()
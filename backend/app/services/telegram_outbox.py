@@ -0,0 +1,329 @@
+import os
+import json
+import random
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.database import AsyncSessionLocal, Candidate, InterviewLog, TelegramOutbox
+from backend.app.services.telegram_service import TelegramService
+from backend.app.services.telegram_fanout import FanoutResult
+
+# Уведомления пишутся в outbox в той же транзакции, что и изменения данных, а отправляются
+# фоновым диспетчером. Запись захватывается условным UPDATE, поэтому несколько воркеров
+# (или отдельный процесс диспетчера) не отправят одно уведомление дважды. Рассылки администраторам
+# запоминают в payload["delivered"], кому сообщение уже доставлено: если часть получателей
+# не ответила из-за временной ошибки, повтор отправляется только им.
+OUTBOX_DISPATCHER = os.getenv("OUTBOX_DISPATCHER", "inline")  # inline - в процессе веб-воркера, off - отдельным процессом
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "600"))
+# Через сколько секунд запись в статусе processing считается брошенной (воркер упал).
+# Пока обработчик работает, аренда продлевается, поэтому долгая рассылка (паузы RetryAfter,
+# лимиты Telegram) не будет взята вторым диспетчером
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "120"))
+
+PENDING = "pending"
+PROCESSING = "processing"
+SENT = "sent"
+DEAD = "dead"
+
+class OutboxDeliveryError(Exception):
+    """Уведомление не доставлено, попытку нужно повторить"""
+
+    def __init__(self, message: str, payload: dict = None):
+        super().__init__(message)
+        # Обновлённый payload записи (например, с уже доставленными получателями)
+        self.payload = payload
+
+OUTBOX_HANDLERS = {}
+
+def outbox_handler(kind: str):
+    def decorator(func):
+        OUTBOX_HANDLERS[kind] = func
+        return func
+    return decorator
+
+def enqueue_notification(db: AsyncSession, kind: str, **payload):
+    """Добавить уведомление в outbox текущей транзакции (commit делает вызывающий)"""
+    if not os.getenv("TELEGRAM_BOT_TOKEN"):
+        # Бот не настроен - отправлять нечем, как и раньше
+        return None
+    entry = TelegramOutbox(kind=kind, payload=json.dumps(payload, ensure_ascii=False))
+    db.add(entry)
+    db.info["outbox_pending"] = True
+    return entry
+
+async def _deliver_to_admins(payload: dict, send):
+    """Рассылка администраторам, кроме тех, кому уведомление доставлено прошлыми попытками"""
+    delivered = payload.get("delivered", [])
+    result = await send(set(delivered))
+    if not isinstance(result, FanoutResult):
+        # Бот не настроен или нет администраторов - отправлять некому, повтор ничего не изменит
+        return
+    delivered = delivered + [str(outcome.chat_id) for outcome in result.outcomes if outcome.ok]
+    if result.retryable:
+        names = ", ".join(str(outcome.name or outcome.chat_id) for outcome in result.retryable)
+        raise OutboxDeliveryError(
+            f"Уведомление не доставлено администраторам ({names}): {result.retryable[0].error}",
+            payload=dict(payload, delivered=delivered)
+        )
+    if not delivered and result.failed:
+        raise OutboxDeliveryError("Уведомление не доставлено ни одному администратору")
+
+@outbox_handler("interview_log")
+async def _send_interview_log(telegram_service: TelegramService, db: AsyncSession, payload: dict):
+    candidate = await db.get(Candidate, payload["candidate_id"])
+    interview_log = await db.get(InterviewLog, payload["log_id"])
+    if not candidate or not interview_log:
+        return
+    await _deliver_to_admins(payload, lambda exclude: telegram_service.send_interview_notification_to_admins(
+        candidate, interview_log, db, exclude=exclude
+    ))
+
+@outbox_handler("interview_completed")
+async def _send_interview_completed(telegram_service: TelegramService, db: AsyncSession, payload: dict):
+    candidate = await db.get(Candidate, payload["candidate_id"])
+    if not candidate:
+        return
+    await _deliver_to_admins(payload, lambda exclude: telegram_service.send_interview_completion_notification(
+        candidate, payload["total_questions"], payload["avg_score"], db, exclude=exclude
+    ))
+
+@outbox_handler("interview_completed_batch")
+async def _send_interview_completed_batch(telegram_service: TelegramService, db: AsyncSession, payload: dict):
+    candidates = (await db.scalars(
+        select(Candidate).where(Candidate.id.in_(payload["candidate_ids"])).order_by(Candidate.id)
+    )).all()
+    if not candidates:
+        return
+    await _deliver_to_admins(payload, lambda exclude: telegram_service.send_bulk_completion_notification(
+        candidates, db, exclude=exclude
+    ))
+
+async def _send_to_candidate(telegram_service: TelegramService, db: AsyncSession, payload: dict, send):
+    candidate = await db.get(Candidate, payload["candidate_id"])
+    if not telegram_service.bot or not candidate or not candidate.telegram_id:
+        return
+    if not await send(candidate):
+        raise OutboxDeliveryError("Сообщение кандидату не доставлено")
+
+@outbox_handler("test_invitation")
+async def _send_test_invitation(telegram_service: TelegramService, db: AsyncSession, payload: dict):
+    await _send_to_candidate(telegram_service, db, payload, telegram_service.send_test_invitation)
+
+@outbox_handler("candidate_message")
+async def _send_candidate_message(telegram_service: TelegramService, db: AsyncSession, payload: dict):
+    await _send_to_candidate(telegram_service, db, payload, lambda candidate: telegram_service.send_message(candidate, payload["message"]))
+
+@outbox_handler("feedback")
+async def _send_feedback(telegram_service: TelegramService, db: AsyncSession, payload: dict):
+    await _send_to_candidate(telegram_service, db, payload, lambda candidate: telegram_service.send_feedback(candidate, payload["feedback"]))
+
+def backoff_delay(attempts: int) -> float:
+    """Экспоненциальная задержка с джиттером перед следующей попыткой"""
+    delay = min(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+class OutboxDispatcher:
+    """Фоновая отправка уведомлений из outbox с повторами и dead-letter"""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.telegram_service = None
+        self._task = None
+        self._wakeup = None
+        self._stopping = False
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self.telegram_service = TelegramService()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._stopping = True
+        self.wake()
+        try:
+            await asyncio.wait_for(self._task, timeout=OUTBOX_POLL_INTERVAL + 10)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+    def wake(self):
+        """Разбудить диспетчер после коммита новых уведомлений"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                processed = await self.dispatch_once()
+            except Exception as e:
+                print(f"Ошибка диспетчера уведомлений: {e}")
+                processed = 0
+            if processed >= OUTBOX_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_once(self) -> int:
+        """Обработать одну пачку готовых к отправке уведомлений"""
+        async with self.session_factory() as db:
+            outbox_ids = (await db.scalars(
+                select(TelegramOutbox.id).where(
+                    TelegramOutbox.status.in_([PENDING, PROCESSING]),
+                    TelegramOutbox.next_attempt_at <= datetime.utcnow()
+                ).order_by(
+                    TelegramOutbox.next_attempt_at, TelegramOutbox.id
+                ).limit(OUTBOX_BATCH_SIZE)
+            )).all()
+        for outbox_id in outbox_ids:
+            if self._stopping:
+                break
+            await self.process(outbox_id)
+        return len(outbox_ids)
+
+    async def process(self, outbox_id: int):
+        async with self.session_factory() as db:
+            now = datetime.utcnow()
+            claimed = await db.execute(update(TelegramOutbox).where(
+                TelegramOutbox.id == outbox_id,
+                TelegramOutbox.status.in_([PENDING, PROCESSING]),
+                TelegramOutbox.next_attempt_at <= now
+            ).values(
+                status=PROCESSING,
+                attempts=TelegramOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE)
+            ))
+            await db.commit()
+            if claimed.rowcount != 1:
+                # Запись уже забрал другой воркер
+                return
+
+            entry = await db.get(TelegramOutbox, outbox_id)
+            kind, attempts, payload = entry.kind, entry.attempts, entry.payload
+            handler = OUTBOX_HANDLERS.get(kind)
+            renewal = asyncio.create_task(self._renew_lease(outbox_id, attempts))
+            try:
+                if handler is None:
+                    attempts = OUTBOX_MAX_ATTEMPTS
+                    raise OutboxDeliveryError(f"Неизвестный тип уведомления: {kind}")
+                await handler(self.telegram_service, db, json.loads(payload))
+            except Exception as e:
+                await db.rollback()
+                await self._fail(db, outbox_id, attempts, e)
+            else:
+                await db.execute(update(TelegramOutbox).where(TelegramOutbox.id == outbox_id).values(
+                    status=SENT, sent_at=datetime.utcnow(), last_error=None
+                ))
+                self.sent += 1
+            finally:
+                renewal.cancel()
+            await db.commit()
+
+    async def _renew_lease(self, outbox_id: int, attempts: int):
+        """Продлевать аренду записи, пока её обрабатывает этот диспетчер"""
+        while True:
+            await asyncio.sleep(OUTBOX_LEASE / 3)
+            try:
+                async with self.session_factory() as db:
+                    # attempts растёт при каждом захвате: чужую аренду не продлеваем
+                    await db.execute(update(TelegramOutbox).where(
+                        TelegramOutbox.id == outbox_id,
+                        TelegramOutbox.status == PROCESSING,
+                        TelegramOutbox.attempts == attempts
+                    ).values(next_attempt_at=datetime.utcnow() + timedelta(seconds=OUTBOX_LEASE)))
+                    await db.commit()
+            except Exception as e:
+                print(f"Не удалось продлить аренду уведомления {outbox_id}: {e}")
+
+    async def _fail(self, db: AsyncSession, outbox_id: int, attempts: int, error: Exception):
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            values = {"status": DEAD}
+            self.dead += 1
+            print(f"Уведомление {outbox_id} перемещено в dead-letter после {attempts} попыток: {error}")
+        else:
+            values = {
+                "status": PENDING,
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=backoff_delay(attempts)),
+            }
+            self.retried += 1
+        if getattr(error, "payload", None) is not None:
+            # Повтор (и возврат из dead-letter) уйдёт только тем, кому уведомление ещё не доставлено
+            values["payload"] = json.dumps(error.payload, ensure_ascii=False)
+        await db.execute(update(TelegramOutbox).where(TelegramOutbox.id == outbox_id).values(
+            last_error=str(error)[:1000], **values
+        ))
+
+outbox_dispatcher = OutboxDispatcher()
+
+async def get_outbox_status() -> dict:
+    """Размер очереди по статусам и счётчики диспетчера текущего воркера"""
+    async with AsyncSessionLocal() as db:
+        counts = dict((await db.execute(
+            select(TelegramOutbox.status, func.count(TelegramOutbox.id)).group_by(TelegramOutbox.status)
+        )).all())
+    return {
+        "pid": os.getpid(),
+        "dispatcher": OUTBOX_DISPATCHER,
+        "running": outbox_dispatcher.running,
+        "queue": {status: counts.get(status, 0) for status in (PENDING, PROCESSING, SENT, DEAD)},
+        "sent": outbox_dispatcher.sent,
+        "retried": outbox_dispatcher.retried,
+        "dead": outbox_dispatcher.dead,
+    }
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop("outbox_pending", False):
+        outbox_dispatcher.wake()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_outbox_flag(session):
+    session.info.pop("outbox_pending", None)
+
+async def requeue_dead() -> int:
+    """Вернуть уведомления из dead-letter в очередь"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(update(TelegramOutbox).where(TelegramOutbox.status == DEAD).values(
+            status=PENDING, attempts=0, next_attempt_at=datetime.utcnow()
+        ))
+        await db.commit()
+        return result.rowcount
+
+async def run_forever():
+    outbox_dispatcher.start()
+    try:
+        await outbox_dispatcher._task
+    finally:
+        await outbox_dispatcher.stop()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Диспетчер уведомлений Telegram (запуск вместе с OUTBOX_DISPATCHER=off у веб-воркеров)")
+    parser.add_argument("--requeue-dead", action="store_true", help="вернуть dead-letter уведомления в очередь и выйти")
+    args = parser.parse_args()
+
+    if args.requeue_dead:
+        print(f"Возвращено в очередь: {asyncio.run(requeue_dead())}")
+    else:
+        asyncio.run(run_forever())
@@ -4,16 +4,26 @@ import asyncio
 from telegram import Bot
 from telegram.error import TelegramError
 from dotenv import load_dotenv
-from backend.app.database import Candidate, User
-from sqlalchemy.orm import Session
+from backend.app.database import Candidate
+from backend.app.services.telegram_fanout import fan_out, FanoutResult
+from backend.app.services.telegram_client import telegram_client, telegram_breaker
+from backend.app.services.resilience import IntegrationUnavailable
+from backend.app.services.admin_recipients import admin_recipients
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 
 load_dotenv()
 
 class TelegramService:
-    def __init__(self):
+    def __init__(self, bot: Bot = None):
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
-        self.bot = Bot(token=self.bot_token) if self.bot_token else None
+        # По умолчанию общий Bot воркера с пулом соединений (services/telegram_client.py)
+        self.bot = bot if bot is not None else telegram_client.get_bot()
+    
+    async def _send(self, **kwargs):
+        """Отправить сообщение с бюджетом времени через выключатель Telegram"""
+        return await telegram_breaker.call(self.bot.send_message, **kwargs)
     
     async def send_message(self, candidate: Candidate, message: str):
         """Отправить сообщение кандидату в Telegram"""
@@ -22,13 +32,13 @@ class TelegramService:
         
         try:
             chat_id = f"{candidate.telegram_id}"
-            await self.bot.send_message(
+            await self._send(
                 chat_id=chat_id,
                 text=message,
                 parse_mode='HTML'
             )
             return True
-        except TelegramError as e:
+        except (TelegramError, IntegrationUnavailable) as e:
             print(f"Ошибка отправки сообщения в Telegram: {e}")
             return False
     
@@ -62,13 +72,13 @@ class TelegramService:
             message = "🧪 <b>Тестовое уведомление</b>\n\n"
             message += "HR-админ панель работает корректно! ✅"
             
-            await self.bot.send_message(
+            await self._send(
                 chat_id=self.chat_id,
                 text=message,
                 parse_mode='HTML'
             )
             return True
-        except TelegramError as e:
+        except (TelegramError, IntegrationUnavailable) as e:
             print(f"Ошибка отправки тестового сообщения: {e}")
             return False
     
@@ -91,14 +101,14 @@ class TelegramService:
             message += f"Последнее действие: {candidate.last_action_type}\n\n"
             message += f"<a href='{webview_url}'>Открыть карточку</a>"
             
-            await self.bot.send_message(
+            await self._send(
                 chat_id=self.chat_id,
                 text=message,
                 parse_mode='HTML',
                 disable_web_page_preview=True
             )
             return True
-        except TelegramError as e:
+        except (TelegramError, IntegrationUnavailable) as e:
             print(f"Ошибка отправки ссылки на карточку: {e}")
             return False 
     
@@ -129,23 +139,36 @@ class TelegramService:
             text = 'Неверный формат данных.'
         try:
             chat_id = f"{candidate.telegram_id}"
-            await self.bot.send_message(
+            await self._send(
                 chat_id=chat_id,
                 text=text,
                 parse_mode=None if format == 'json' or format == 'csv' else 'Markdown'
             )
             return True
-        except TelegramError as e:
+        except (TelegramError, IntegrationUnavailable) as e:
             print(f"Ошибка отправки данных кандидата: {e}")
             return False
 
-    async def send_interview_notification_to_admins(self, candidate: Candidate, interview_log, db: Session):
+    async def _send_to_admins(self, admins, message: str, summary: str, error: str, exclude=(), **send_kwargs) -> FanoutResult:
+        """Разослать сообщение администраторам [(telegram_id, name), ...] с учётом лимитов Telegram.
+
+        exclude - chat_id, которым сообщение уже доставлено (повтор уведомления из outbox).
+        """
+        recipients = [(telegram_id, name) for telegram_id, name in admins if telegram_id and str(telegram_id) not in exclude]
+        result = await fan_out(self.bot, recipients, text=message, parse_mode='HTML', **send_kwargs)
+        
+        for outcome in result.failed:
+            print(f"{error} {outcome.name}: {outcome.error}")
+        print(f"{summary} {result.sent} из {len(admins)} администраторов")
+        return result
+
+    async def send_interview_notification_to_admins(self, candidate: Candidate, interview_log, db: AsyncSession, exclude=()):
         """Отправить уведомление администраторам о прохождении интервью"""
         if not self.bot:
             return False
         
         # Получаем всех администраторов
-        admins = db.query(User).filter(User.is_admin == True).all()
+        admins = await admin_recipients.get(db)
         
         if not admins:
             print("Нет администраторов для отправки уведомлений")
@@ -169,31 +192,22 @@ class TelegramService:
         webview_url = self.create_webview_url(candidate.id)
         message += f"<a href='{webview_url}'>📋 Открыть карточку кандидата</a>"
         
-        # Отправляем уведомление каждому администратору
-        success_count = 0
-        for admin in admins:
-            if admin.telegram_id:
-                try:
-                    await self.bot.send_message(
-                        chat_id=admin.telegram_id,
-                        text=message,
-                        parse_mode='HTML',
-                        disable_web_page_preview=True
-                    )
-                    success_count += 1
-                except TelegramError as e:
-                    print(f"Ошибка отправки уведомления администратору {admin.name}: {e}")
-        
-        print(f"Уведомления отправлены {success_count} из {len(admins)} администраторов")
-        return success_count > 0
+        # Отправляем уведомление всем администраторам параллельно
+        return await self._send_to_admins(
+            admins, message,
+            summary="Уведомления отправлены",
+            error="Ошибка отправки уведомления администратору",
+            exclude=exclude,
+            disable_web_page_preview=True
+        )
 
-    async def send_interview_completion_notification(self, candidate: Candidate, total_questions: int, avg_score: float, db: Session):
+    async def send_interview_completion_notification(self, candidate: Candidate, total_questions: int, avg_score: float, db: AsyncSession, exclude=()):
         """Отправить уведомление о завершении интервью"""
         if not self.bot:
             return False
         
         # Получаем всех администраторов
-        admins = db.query(User).filter(User.is_admin == True).all()
+        admins = await admin_recipients.get(db)
         
         if not admins:
             print("Нет администраторов для отправки уведомлений")
@@ -214,31 +228,54 @@ class TelegramService:
         webview_url = self.create_webview_url(candidate.id)
         message += f"<a href='{webview_url}'>📋 Открыть карточку кандидата</a>"
         
-        # Отправляем уведомление каждому администратору
-        success_count = 0
-        for admin in admins:
-            if admin.telegram_id:
-                try:
-                    await self.bot.send_message(
-                        chat_id=admin.telegram_id,
-                        text=message,
-                        parse_mode='HTML',
-                        disable_web_page_preview=True
-                    )
-                    success_count += 1
-                except TelegramError as e:
-                    print(f"Ошибка отправки уведомления администратору {admin.name}: {e}")
-        
-        print(f"Уведомления о завершении отправлены {success_count} из {len(admins)} администраторов")
-        return success_count > 0
+        # Отправляем уведомление всем администраторам параллельно
+        return await self._send_to_admins(
+            admins, message,
+            summary="Уведомления о завершении отправлены",
+            error="Ошибка отправки уведомления администратору",
+            exclude=exclude,
+            disable_web_page_preview=True
+        )
 
-    async def send_interview_start_notification(self, candidate: Candidate, db: Session):
+    async def send_bulk_completion_notification(self, candidates: list, db: AsyncSession, preview: int = 10, exclude=()):
+        """Отправить одно сводное уведомление о пакете загруженных результатов"""
+        if not self.bot:
+            return False
+        
+        admins = await admin_recipients.get(db)
+        
+        if not admins:
+            print("Нет администраторов для отправки уведомлений")
+            return False
+        
+        accepted = sum(1 for candidate in candidates if candidate.status == "берем")
+        rejected = sum(1 for candidate in candidates if candidate.status == "не берем")
+        
+        message = f"📥 <b>Загружены результаты интервью: {len(candidates)}</b>\n\n"
+        message += f"✅ <b>Берем:</b> {accepted}\n"
+        message += f"❌ <b>Не берем:</b> {rejected}\n"
+        message += f"⏳ <b>Ожидают:</b> {len(candidates) - accepted - rejected}\n\n"
+        for candidate in candidates[:preview]:
+            webview_url = self.create_webview_url(candidate.id)
+            message += f"• <a href='{webview_url}'>{candidate.full_name}</a> - {candidate.status}\n"
+        if len(candidates) > preview:
+            message += f"…и ещё {len(candidates) - preview}\n"
+        
+        return await self._send_to_admins(
+            admins, message,
+            summary="Сводные уведомления о загрузке отправлены",
+            error="Ошибка отправки уведомления администратору",
+            exclude=exclude,
+            disable_web_page_preview=True
+        )
+
+    async def send_interview_start_notification(self, candidate: Candidate, db: AsyncSession):
         """Отправить уведомление о начале интервью"""
         if not self.bot:
             return False
         
         # Получаем всех администраторов
-        admins = db.query(User).filter(User.is_admin == True).all()
+        admins = await admin_recipients.get(db)
         
         if not admins:
             print("Нет администраторов для отправки уведомлений")
@@ -253,31 +290,21 @@ class TelegramService:
         webview_url = self.create_webview_url(candidate.id)
         message += f"<a href='{webview_url}'>📋 Открыть карточку кандидата</a>"
         
-        # Отправляем уведомление каждому администратору
-        success_count = 0
-        for admin in admins:
-            if admin.telegram_id:
-                try:
-                    await self.bot.send_message(
-                        chat_id=admin.telegram_id,
-                        text=message,
-                        parse_mode='HTML',
-                        disable_web_page_preview=True
-                    )
-                    success_count += 1
-                except TelegramError as e:
-                    print(f"Ошибка отправки уведомления администратору {admin.name}: {e}")
-        
-        print(f"Уведомления о начале интервью отправлены {success_count} из {len(admins)} администраторов")
-        return success_count > 0
+        # Отправляем уведомление всем администраторам параллельно
+        return await self._send_to_admins(
+            admins, message,
+            summary="Уведомления о начале интервью отправлены",
+            error="Ошибка отправки уведомления администратору",
+            disable_web_page_preview=True
+        )
 
-    async def send_status_change_notification(self, candidate: Candidate, new_status: str, db: Session):
+    async def send_status_change_notification(self, candidate: Candidate, new_status: str, db: AsyncSession):
         """Отправить уведомление об изменении статуса кандидата"""
         if not self.bot:
             return False
         
         # Получаем всех администраторов
-        admins = db.query(User).filter(User.is_admin == True).all()
+        admins = await admin_recipients.get(db)
         
         if not admins:
             print("Нет администраторов для отправки уведомлений")
@@ -303,31 +330,21 @@ class TelegramService:
         webview_url = self.create_webview_url(candidate.id)
         message += f"<a href='{webview_url}'>📋 Открыть карточку кандидата</a>"
         
-        # Отправляем уведомление каждому администратору
-        success_count = 0
-        for admin in admins:
-            if admin.telegram_id:
-                try:
-                    await self.bot.send_message(
-                        chat_id=admin.telegram_id,
-                        text=message,
-                        parse_mode='HTML',
-                        disable_web_page_preview=True
-                    )
-                    success_count += 1
-                except TelegramError as e:
-                    print(f"Ошибка отправки уведомления администратору {admin.name}: {e}")
-        
-        print(f"Уведомления об изменении статуса отправлены {success_count} из {len(admins)} администраторов")
-        return success_count > 0
+        # Отправляем уведомление всем администраторам параллельно
+        return await self._send_to_admins(
+            admins, message,
+            summary="Уведомления об изменении статуса отправлены",
+            error="Ошибка отправки уведомления администратору",
+            disable_web_page_preview=True
+        )
 
-    async def send_daily_summary(self, db: Session):
+    async def send_daily_summary(self, db: AsyncSession):
         """Отправить ежедневную сводку администраторам"""
         if not self.bot:
             return False
         
         # Получаем всех администраторов
-        admins = db.query(User).filter(User.is_admin == True).all()
+        admins = await admin_recipients.get(db)
         
         if not admins:
             print("Нет администраторов для отправки уведомлений")
@@ -338,22 +355,22 @@ class TelegramService:
         today = datetime.utcnow().date()
         tomorrow = today + timedelta(days=1)
         
-        total_candidates = db.query(Candidate).filter(
+        total_candidates = await db.scalar(select(func.count(Candidate.id)).where(
             Candidate.created_at >= today,
             Candidate.created_at < tomorrow
-        ).count()
+        ))
         
-        passed_candidates = db.query(Candidate).filter(
+        passed_candidates = await db.scalar(select(func.count(Candidate.id)).where(
             Candidate.status == 'прошёл',
             Candidate.updated_at >= today,
             Candidate.updated_at < tomorrow
-        ).count()
+        ))
         
-        rejected_candidates = db.query(Candidate).filter(
+        rejected_candidates = await db.scalar(select(func.count(Candidate.id)).where(
             Candidate.status == 'отклонён',
             Candidate.updated_at >= today,
             Candidate.updated_at < tomorrow
-        ).count()
+        ))
         
         # Формируем сообщение
         message = f"📊 <b>Ежедневная сводка</b>\n\n"
@@ -368,19 +385,13 @@ class TelegramService:
         
         message += f"\n🎯 <b>Отличная работа!</b>"
         
-        # Отправляем уведомление каждому администратору
-        success_count = 0
-        for admin in admins:
-            if admin.telegram_id:
-                try:
-                    await self.bot.send_message(
-                        chat_id=admin.telegram_id,
-                        text=message,
-                        parse_mode='HTML'
-                    )
-                    success_count += 1
-                except TelegramError as e:
-                    print(f"Ошибка отправки сводки администратору {admin.name}: {e}")
-        
-        print(f"Ежедневные сводки отправлены {success_count} из {len(admins)} администраторов")
-        return success_count > 0 
\ No newline at end of file
+        # Отправляем уведомление всем администраторам параллельно
+        return await self._send_to_admins(
+            admins, message,
+            summary="Ежедневные сводки отправлены",
+            error="Ошибка отправки сводки администратору"
+        )
+
+def get_telegram_service() -> TelegramService:
+    """Зависимость FastAPI: сервис поверх общего Bot воркера"""
+    return TelegramService(bot=telegram_client.get_bot())
@@ -0,0 +1,147 @@
+"""
+Бенчмарк задержки event loop при параллельных запросах к БД.
+
+Пока идут тяжёлые запросы метрик, параллельно опрашивается /api/health и
+измеряется задержка ответа. В режиме blocking запросы метрик выполняются
+через синхронную Session (как было раньше), в режиме async - через роутер
+на AsyncSession.
+
+Запуск из корня проекта:
+    python -m backend.benchmarks.async_db_latency --candidates 20000
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "hr_admin_bench_async.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import httpx
+from sqlalchemy import func, desc, select, insert
+
+from backend.app.database import engine, SessionLocal, Base, Candidate, InterviewLog
+from main import app
+
+STATUSES = ["ожидает", "берем", "не берем", "прошёл", "отклонён"]
+CATEGORIES = ["мотивация", "вовлечённость", "навыки", "честность"]
+
+def seed(candidates: int, logs_per_candidate: int):
+    """Заполнить временную базу тестовыми данными"""
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Candidate), [
+            {
+                "full_name": f"Кандидат {i}",
+                "telegram_id": str(100000 + i),
+                "results": "тест",
+                "status": random.choice(STATUSES),
+                "created_at": now - timedelta(days=random.randint(0, 365)),
+                "last_action_date": now - timedelta(days=random.randint(0, 60)),
+                "updated_at": now,
+            }
+            for i in range(candidates)
+        ])
+        conn.execute(insert(InterviewLog), [
+            {
+                "candidate_id": i + 1,
+                "question": "Вопрос",
+                "answer": "Ответ",
+                "score": random.randint(1, 10),
+                "category": random.choice(CATEGORIES),
+                "created_at": now,
+            }
+            for i in range(candidates)
+            for _ in range(logs_per_candidate)
+        ])
+
+def top_candidates_statement():
+    return select(
+        Candidate.full_name,
+        func.avg(InterviewLog.score).label('avg_score'),
+        func.count(InterviewLog.id).label('questions_count')
+    ).join(
+        InterviewLog, Candidate.id == InterviewLog.candidate_id
+    ).where(
+        InterviewLog.score.isnot(None)
+    ).group_by(
+        Candidate.id, Candidate.full_name
+    ).having(
+        func.count(InterviewLog.id) >= 3
+    ).order_by(
+        desc(func.avg(InterviewLog.score))
+    ).limit(10)
+
+async def blocking_load(client: httpx.AsyncClient):
+    """Тот же запрос через синхронную Session прямо в event loop"""
+    with SessionLocal() as db:
+        db.execute(top_candidates_statement()).all()
+
+async def async_load(client: httpx.AsyncClient):
+    response = await client.get("/api/metrics/top-candidates")
+    response.raise_for_status()
+
+async def run(mode: str, concurrency: int, rounds: int):
+    load = blocking_load if mode == "blocking" else async_load
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+
+        async def probe():
+            while not stop.is_set():
+                started = time.perf_counter()
+                await client.get("/api/health")
+                latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.005)
+
+        async def worker():
+            for _ in range(rounds):
+                await load(client)
+                await asyncio.sleep(0)
+
+        started = time.perf_counter()
+        prober = asyncio.create_task(probe())
+        await asyncio.sleep(0)
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        stop.set()
+        await prober
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+def report(mode: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, math.ceil(len(latencies) * 0.95) - 1)]
+    print(
+        f"{mode:>9}: wall={elapsed:6.2f}s probes={len(latencies):5d} "
+        f"p50={statistics.median(latencies):8.2f}ms "
+        f"p95={p95:8.2f}ms max={latencies[-1]:8.2f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=20000)
+    parser.add_argument("--logs-per-candidate", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Заполняем базу: {args.candidates} кандидатов...")
+    seed(args.candidates, args.logs_per_candidate)
+    print("Задержка /api/health под нагрузкой /api/metrics/top-candidates:")
+    for mode in ("blocking", "async"):
+        report(mode, *asyncio.run(run(mode, args.concurrency, args.rounds)))
+    os.remove(DB_PATH)
+
+if __name__ == "__main__":
+    sys.exit(main())
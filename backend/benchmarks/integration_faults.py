@@ -0,0 +1,175 @@
+"""
+Проверка выключателей интеграций на локальных заглушках Telegram Bot API и Notion API.
+
+Заглушки умеют отвечать нормально, зависать дольше бюджета вызова (slow) и отвечать 500 (error).
+Для каждого сервиса прогоняется сценарий: сервис работает -> деградирует, выключатель
+размыкается и вызовы отклоняются сразу -> пробный вызов в half-open при ещё больном сервисе
+снова размыкает выключатель -> сервис восстановился, пробный вызов замыкает выключатель.
+
+Запуск из корня проекта:
+    python -m backend.benchmarks.integration_faults --timeout 0.5 --threshold 3 --recovery 1
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+class FaultyApi:
+    """Заглушка Bot API (sendMessage) и Notion API (pages) с переключаемым режимом отказа"""
+
+    def __init__(self, hang: float):
+        self.hang = hang
+        self.mode = {"telegram": "ok", "notion": "ok"}
+        self.requests = {"telegram": 0, "notion": 0}
+
+    async def _fault(self, service: str):
+        self.requests[service] += 1
+        mode = self.mode[service]
+        if mode == "slow":
+            await asyncio.sleep(self.hang)
+        elif mode == "error":
+            return JSONResponse(
+                {"ok": False, "error_code": 500, "description": "Internal Server Error",
+                 "object": "error", "status": 500, "code": "internal_server_error", "message": "Internal Server Error"},
+                status_code=500
+            )
+        return None
+
+    async def send_message(self, request: Request):
+        data = dict(await request.form()) if "form" in request.headers.get("content-type", "") else await request.json()
+        failure = await self._fault("telegram")
+        if failure is not None:
+            return failure
+        return JSONResponse({
+            "ok": True,
+            "result": {
+                "message_id": self.requests["telegram"],
+                "date": int(time.time()),
+                "chat": {"id": int(data.get("chat_id")), "type": "private"},
+                "text": data.get("text", ""),
+            },
+        })
+
+    async def page(self, request: Request):
+        failure = await self._fault("notion")
+        if failure is not None:
+            return failure
+        return JSONResponse({"object": "page", "id": request.path_params.get("page_id", "page-1")})
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/bot{token}/sendMessage", self.send_message, methods=["POST"]),
+            Route("/v1/pages", self.page, methods=["POST"]),
+            Route("/v1/pages/{page_id}", self.page, methods=["PATCH"]),
+        ])
+
+async def run(args):
+    # Настройки читаются при импорте модулей приложения, поэтому окружение задаётся до него
+    os.environ.update({
+        "TELEGRAM_CALL_TIMEOUT": str(args.timeout),
+        "NOTION_CALL_TIMEOUT": str(args.timeout),
+        "BREAKER_FAILURE_THRESHOLD": str(args.threshold),
+        "BREAKER_RECOVERY_TIMEOUT": str(args.recovery),
+    })
+    from backend.benchmarks.telegram_fanout import free_port
+
+    fake = FaultyApi(hang=args.timeout * 4)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(fake.app(), host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    os.environ.update({
+        "NOTION_TOKEN": "secret_benchmark",
+        "NOTION_DATABASE_ID": "benchmark",
+        "NOTION_API_URL": f"http://127.0.0.1:{port}",
+    })
+    from telegram import Bot
+    from backend.app.database import Candidate
+    from backend.app.services.notion_service import NotionService
+    from backend.app.services.resilience import breakers
+    from backend.app.services.telegram_service import TelegramService
+
+    candidate = Candidate(
+        id=1, full_name="Тестовый кандидат", telegram_id="1001", notion_id="page-1",
+        status="ожидает", last_action_type="Тест", updated_at=datetime.utcnow()
+    )
+    bot = Bot(token="123456:benchmark", base_url=f"http://127.0.0.1:{port}/bot")
+    telegram_service = TelegramService(bot=bot)
+    notion_service = NotionService()
+    calls = {
+        "telegram": lambda: telegram_service.send_message(candidate, "Проверка"),
+        "notion": lambda: notion_service.update_candidate(candidate),
+    }
+
+    rows = []
+    problems = []
+
+    async def step(service: str, label: str, expect_ok: bool, expect_state: str):
+        requests_before = fake.requests[service]
+        start = time.perf_counter()
+        ok = await calls[service]()
+        elapsed = time.perf_counter() - start
+        state = breakers[service].state
+        reached = fake.requests[service] > requests_before
+        rows.append((service, label, fake.mode[service], ok, reached, elapsed, state))
+        if bool(ok) != expect_ok or state != expect_state:
+            problems.append(f"{service}/{label}: ok={ok}, состояние {state}, ожидалось ok={expect_ok}, {expect_state}")
+
+    try:
+        for service, fault in (("telegram", "slow"), ("notion", "error")):
+            for i in range(2):
+                await step(service, f"норма {i + 1}", True, "closed")
+
+            fake.mode[service] = fault
+            for i in range(args.threshold):
+                await step(service, f"сбой {i + 1}", False, "open" if i + 1 == args.threshold else "closed")
+            for i in range(3):
+                await step(service, f"быстрый отказ {i + 1}", False, "open")
+
+            await asyncio.sleep(args.recovery + 0.1)
+            await step(service, "проба, сервис болен", False, "open")
+            await step(service, "быстрый отказ", False, "open")
+
+            fake.mode[service] = "ok"
+            await asyncio.sleep(args.recovery + 0.1)
+            await step(service, "проба, сервис здоров", True, "closed")
+            await step(service, "норма", True, "closed")
+    finally:
+        await notion_service.close()
+        await bot.shutdown()
+        server.should_exit = True
+        await server_task
+
+    print(f"Бюджет вызова: {args.timeout:g} с, порог: {args.threshold} сбоев, пауза до пробы: {args.recovery:g} с")
+    print(f"{'сервис':<10}{'шаг':<24}{'режим':<7}{'успех':>7}{'запрос':>8}{'время, мс':>11}  выключатель")
+    for service, label, mode, ok, reached, elapsed, state in rows:
+        print(f"{service:<10}{label:<24}{mode:<7}{'да' if ok else 'нет':>7}{'да' if reached else 'нет':>8}"
+              f"{elapsed * 1000:>11.1f}  {state}")
+    for name, breaker in breakers.items():
+        print(name, breaker.snapshot())
+
+    if problems:
+        print("\n".join(problems))
+        sys.exit(1)
+    print("Все сценарии выполнены как ожидалось")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=0.5, help="бюджет одного вызова, с")
+    parser.add_argument("--threshold", type=int, default=3, help="сбоев подряд до размыкания")
+    parser.add_argument("--recovery", type=float, default=1.0, help="пауза до пробного вызова, с")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
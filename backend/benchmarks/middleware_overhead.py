@@ -0,0 +1,223 @@
+"""
+Бенчмарк накладных расходов middleware на запросах к API.
+
+Сравниваются запросы/с на GET /api/health у приложения без middleware, с прежним стеком
+(BaseHTTPMiddleware add_no_cache_headers поверх каждого запроса и CORS со списком из 25 источников
+и "*") и с текущим (CORSMiddleware по CORS_OPTIONS, статика - отдельное ASGI-приложение на /static).
+Запросы вызывают ASGI-приложение напрямую, без сети: в замере остаются только маршрутизация,
+middleware и обработчик. Каждый вариант меряется без заголовка Origin (SPA с того же домена,
+health-check Render) и с Origin, как у Mini App в Telegram.
+
+Запуск из корня проекта:
+    python -m backend.benchmarks.middleware_overhead --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+from backend.app.cors import CORS_OPTIONS, compile_origins
+from backend.app.services.static_assets import StaticAssets
+
+ORIGIN = "https://web.telegram.org"
+
+# Прежние настройки CORS из main.py
+LEGACY_CORS = dict(
+    allow_origins=[
+        "http://localhost:3000",
+        "http://127.0.0.1:3000", 
+        "http://localhost:3001",
+        "http://127.0.0.1:3001",
+        "http://localhost:8000",
+        "http://127.0.0.1:8000",
+        "http://localhost:8001",
+        "http://127.0.0.1:8001",
+        "https://localhost:3000",
+        "https://127.0.0.1:3000",
+        "https://localhost:3001", 
+        "https://127.0.0.1:3001",
+        "https://localhost:8000",
+        "https://127.0.0.1:8000",
+        "https://localhost:8001",
+        "https://127.0.0.1:8001",
+        "http://0.0.0.0:3000",
+        "http://0.0.0.0:3001",
+        "http://0.0.0.0:8000",
+        "http://0.0.0.0:8001",
+        "https://0.0.0.0:3000",
+        "https://0.0.0.0:3001", 
+        "https://0.0.0.0:8000",
+        "https://0.0.0.0:8001",
+        "*"  # Разрешаем все источники
+    ],
+    allow_credentials=True,
+    allow_methods=[
+        "GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"
+    ],
+    allow_headers=[
+        "Accept",
+        "Accept-Language", 
+        "Content-Language",
+        "Content-Type",
+        "Authorization",
+        "X-Requested-With",
+        "Origin",
+        "Access-Control-Request-Method",
+        "Access-Control-Request-Headers",
+        "Cache-Control",
+        "Pragma",
+        "Expires",
+        "X-CSRF-Token",
+        "X-API-Key",
+        "X-Client-Version",
+        "User-Agent",
+        "Referer",
+        "DNT",
+        "Accept-Encoding",
+        "Accept-Charset",
+        "Connection",
+        "Host",
+        "Upgrade-Insecure-Requests",
+        "Sec-Fetch-Dest",
+        "Sec-Fetch-Mode", 
+        "Sec-Fetch-Site",
+        "Sec-Fetch-User",
+        "*"  # Разрешаем все заголовки
+    ],
+    expose_headers=[
+        "Content-Length",
+        "Content-Range",
+        "X-Total-Count",
+        "X-Page-Count",
+        "X-Current-Page",
+        "X-Next-Page",
+        "X-Prev-Page",
+        "X-Total-Pages",
+        "X-Has-Next",
+        "X-Has-Prev",
+        "X-Request-ID",
+        "X-Response-Time",
+        "X-Rate-Limit-Limit",
+        "X-Rate-Limit-Remaining",
+        "X-Rate-Limit-Reset",
+        "X-Powered-By",
+        "Server",
+        "Date",
+        "ETag",
+        "Last-Modified",
+        "Cache-Control",
+        "Pragma",
+        "Expires",
+        "Access-Control-Allow-Origin",
+        "Access-Control-Allow-Methods",
+        "Access-Control-Allow-Headers",
+        "Access-Control-Allow-Credentials",
+        "Access-Control-Max-Age",
+        "Access-Control-Expose-Headers"
+    ],
+    max_age=86400,  # 24 часа кэширования preflight запросов
+)
+
+async def legacy_no_cache_headers(request: Request, call_next):
+    """Прежний @app.middleware("http") из backend/main.py"""
+    response = await call_next(request)
+    if request.url.path.startswith("/static/"):
+        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+        response.headers["Last-Modified"] = "Thu, 01 Jan 1970 00:00:00 GMT"
+        response.headers["ETag"] = f'"v{int(time.time())}"'
+    return response
+
+def make_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/health")
+    async def api_health_check():
+        return {"status": "healthy"}
+
+    if stack == "legacy":
+        app.add_middleware(CORSMiddleware, **LEGACY_CORS)
+        app.middleware("http")(legacy_no_cache_headers)
+    elif stack == "current":
+        app.add_middleware(CORSMiddleware, **CORS_OPTIONS)
+        app.mount("/static", StaticAssets("backend/static"), name="static")
+    return app
+
+async def call(app, scope: dict) -> int:
+    """Один запрос к ASGI-приложению; возвращает статус ответа"""
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(dict(scope), receive, send)
+    return status
+
+def make_scope(origin: str = None) -> dict:
+    headers = [(b"host", b"localhost"), (b"accept", b"application/json")]
+    if origin:
+        headers.append((b"origin", origin.encode()))
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/health", "raw_path": b"/api/health", "root_path": "",
+        "query_string": b"", "headers": headers, "client": ("127.0.0.1", 50000), "server": ("localhost", 8000),
+    }
+
+async def measure(name: str, app, scope: dict, requests: int) -> float:
+    for _ in range(200):
+        assert await call(app, scope) == 200
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, scope)
+    elapsed = time.perf_counter() - start
+    rate = requests / elapsed
+    print(f"{name:<34}{rate:>14,.0f}{elapsed / requests * 1e6:>14.1f}")
+    return rate
+
+async def run(args):
+    apps = {"без middleware": make_app("none"), "прежний стек": make_app("legacy"), "текущий стек": make_app("current")}
+    print(f"{'вариант':<34}{'запросов/с':>14}{'мкс/запрос':>14}")
+    rates = {}
+    for label, origin in (("без Origin", None), ("с Origin", ORIGIN)):
+        for name, app in apps.items():
+            rates[name, label] = await measure(f"{name}, {label}", app, make_scope(origin), args.requests)
+    for label in ("без Origin", "с Origin"):
+        base = rates["без middleware", label]
+        print(f"{label}: прежний стек -{1 - rates['прежний стек', label] / base:.0%}, "
+              f"текущий -{1 - rates['текущий стек', label] / base:.0%} от запросов/с без middleware")
+
+    # Проверка источника при CORS без "*": перебор списка против множества из compile_origins
+    origins = [o for o in LEGACY_CORS["allow_origins"] if o != "*"]
+    listed = CORSMiddleware(None, allow_origins=origins)
+    compiled = CORSMiddleware(None, **compile_origins(origins + ["https://*.telegram.org"]))
+    for candidate in (origins[0], origins[-1], "https://evil.example"):
+        assert listed.is_allowed_origin(candidate) == compiled.is_allowed_origin(candidate)
+    assert compiled.is_allowed_origin(ORIGIN) and not compiled.is_allowed_origin("https://web.telegram.org.evil.example")
+    iterations = args.requests * 10
+    for candidate in (origins[-1], "https://evil.example"):
+        timings = []
+        for middleware in (listed, compiled):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                middleware.is_allowed_origin(candidate)
+            timings.append((time.perf_counter() - start) / iterations * 1e9)
+        print(f"Проверка {candidate} среди {len(origins)} источников: список {timings[0]:.0f} нс, "
+              f"множество и шаблон {timings[1]:.0f} нс")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="запросов на каждый вариант")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
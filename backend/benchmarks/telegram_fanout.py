@@ -0,0 +1,156 @@
+"""
+Бенчмарк рассылки уведомлений администраторам.
+
+Поднимает локальный фейковый Bot API (задержка ответа, лимиты 30 сообщений/с на бота
+и 1 сообщение/с в чат с ответом 429 и retry_after) и сравнивает последовательную
+отправку (как было раньше) с параллельной рассылкой fan_out.
+
+Запуск из корня проекта:
+    python -m backend.benchmarks.telegram_fanout --admins 100 --latency 0.15
+"""
+
+import argparse
+import asyncio
+import collections
+import socket
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from telegram import Bot
+from telegram.error import TelegramError
+
+from backend.app.services.telegram_fanout import fan_out, TelegramRateLimiter
+
+class FakeBotApi:
+    """Минимальный Bot API: sendMessage с задержкой и флуд-контролем"""
+
+    def __init__(self, latency: float, global_rate: int, per_chat_rate: int):
+        self.latency = latency
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.global_window = collections.deque()
+        self.chat_windows = collections.defaultdict(collections.deque)
+        self.accepted = 0
+        self.rejected = 0
+        self.message_id = 0
+
+    def reset(self):
+        self.global_window.clear()
+        self.chat_windows.clear()
+        self.accepted = 0
+        self.rejected = 0
+
+    def _over_limit(self, window: collections.deque, limit: int, now: float) -> bool:
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        return len(window) >= limit
+
+    async def handle(self, request: Request):
+        data = dict(await request.form()) if "form" in request.headers.get("content-type", "") else await request.json()
+        await asyncio.sleep(self.latency)
+        chat_id = str(data.get("chat_id"))
+        now = time.monotonic()
+        chat_window = self.chat_windows[chat_id]
+        if self._over_limit(self.global_window, self.global_rate, now) or self._over_limit(chat_window, self.per_chat_rate, now):
+            self.rejected += 1
+            return JSONResponse({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }, status_code=429)
+        self.global_window.append(now)
+        chat_window.append(now)
+        self.accepted += 1
+        self.message_id += 1
+        return JSONResponse({
+            "ok": True,
+            "result": {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                "text": data.get("text", ""),
+            },
+        })
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[Route("/bot{token}/sendMessage", self.handle, methods=["POST"])])
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def send_sequential(bot: Bot, chat_ids: list) -> int:
+    """Старое поведение: по одному администратору за раз"""
+    sent = 0
+    for chat_id in chat_ids:
+        try:
+            await bot.send_message(chat_id=chat_id, text="Новое интервью", parse_mode="HTML")
+            sent += 1
+        except TelegramError:
+            pass
+    return sent
+
+async def run(args):
+    fake = FakeBotApi(args.latency, args.server_global_rate, args.server_per_chat_rate)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(fake.app(), host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    chat_ids = [str(1000 + i) for i in range(args.admins)]
+    bot = Bot(token="123456:benchmark", base_url=f"http://127.0.0.1:{port}/bot")
+    results = []
+    try:
+        fake.reset()
+        start = time.perf_counter()
+        sent = await send_sequential(bot, chat_ids)
+        results.append(("sequential", time.perf_counter() - start, sent, fake.rejected))
+        await asyncio.sleep(1.1)
+
+        for label, limiter in (
+            ("fan_out", TelegramRateLimiter(args.global_rate, args.per_chat_rate)),
+            ("fan_out без лимитера", TelegramRateLimiter(10_000, 10_000)),
+        ):
+            fake.reset()
+            start = time.perf_counter()
+            result = await fan_out(
+                bot,
+                [(chat_id, None) for chat_id in chat_ids],
+                limiter=limiter,
+                concurrency=args.concurrency,
+                text="Новое интервью",
+                parse_mode="HTML",
+            )
+            results.append((label, time.perf_counter() - start, result.sent, fake.rejected))
+            await asyncio.sleep(1.1)
+    finally:
+        await bot.shutdown()
+        server.should_exit = True
+        await server_task
+
+    print(f"Администраторов: {args.admins}, задержка API: {args.latency * 1000:.0f} мс, "
+          f"лимиты сервера: {args.server_global_rate}/с, {args.server_per_chat_rate}/с на чат")
+    print(f"{'режим':<24}{'время, с':>10}{'доставлено':>12}{'ответов 429':>13}")
+    for label, elapsed, sent, rejected in results:
+        print(f"{label:<24}{elapsed:>10.2f}{sent:>12}{rejected:>13}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--admins", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.15, help="задержка ответа Bot API, с")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--global-rate", type=float, default=30, help="лимит клиента, сообщений/с")
+    parser.add_argument("--per-chat-rate", type=float, default=1)
+    parser.add_argument("--server-global-rate", type=int, default=30, help="лимит фейкового сервера, сообщений/с")
+    parser.add_argument("--server-per-chat-rate", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Микробенчмарк проверки initData из Telegram Mini Apps.
+
+Сравнивается прежняя проверка (секрет HMAC на каждый вызов, строка проверки через цепочку
+str.replace, логирование на каждом шаге) с InitDataValidator: без кэша (секрет посчитан
+один раз, строка проверки собирается по спецификации) и с LRU уже проверенных строк, когда
+одни и те же пользователи открывают Mini App снова.
+
+Запуск из корня проекта:
+    python -m backend.benchmarks.telegram_init_data --users 200 --iterations 50000
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+import urllib.parse
+
+from backend.app.services.telegram_init_data import InitDataValidator, InitDataError, sign_init_data
+
+BOT_TOKEN = "123456789:AAbenchmarkTokenForInitDataValidation"
+
+def make_init_data(user_id: int, bot_token: str = BOT_TOKEN, auth_date: int = None) -> str:
+    """initData, подписанная так же, как её подписывает Telegram"""
+    pairs = [
+        ("query_id", f"AAH{user_id:010d}benchmark"),
+        ("user", json.dumps({
+            "id": user_id, "first_name": "Иван", "last_name": f"Тестов {user_id}",
+            "username": f"user{user_id}", "language_code": "ru", "allows_write_to_pm": True,
+        }, ensure_ascii=False, separators=(",", ":"))),
+        ("auth_date", str(auth_date or int(time.time()))),
+        ("signature", "benchmark-signature"),
+    ]
+    pairs.append(("hash", sign_init_data(pairs, bot_token)))
+    return urllib.parse.urlencode(pairs, quote_via=urllib.parse.quote)
+
+def legacy_validate(init_data: str, bot_token: str = BOT_TOKEN) -> dict:
+    """Прежняя проверка из routers/telegram_auth.py (без HTTPException)"""
+    logging.info(f"Received init_data: {init_data}")
+    parsed_data = urllib.parse.parse_qs(init_data)
+    logging.info(f"Parsed data: {parsed_data}")
+    data_hash = parsed_data.get('hash', [None])[0]
+    if bot_token and data_hash:
+        logging.info(f"BOT_TOKEN configured: {bot_token[:10]}...")
+        logging.info(f"Data hash from request: {data_hash}")
+        logging.info(f"Full init_data: {init_data}")
+        data_check_string = init_data.replace(f"&hash={data_hash}", "").replace(f"hash={data_hash}&", "").replace(f"hash={data_hash}", "")
+        logging.info(f"Data check string: {data_check_string}")
+        secret_key = hmac.new("WebAppData".encode(), bot_token.encode(), hashlib.sha256).digest()
+        logging.info(f"Secret key (hex): {secret_key.hex()}")
+        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        logging.info(f"Calculated hash: {calculated_hash}")
+        if calculated_hash != data_hash:
+            logging.error(f"Hash mismatch: expected {data_hash}, got {calculated_hash}")
+            logging.error(f"BOT_TOKEN used: {bot_token}")
+            logging.warning("Temporarily skipping signature validation for debugging")
+        else:
+            logging.info("Hash validation successful")
+    user_data = {}
+    for key, value in parsed_data.items():
+        if key != 'hash':
+            user_data[key] = value[0] if value else None
+    if 'user' in user_data and user_data['user']:
+        user_data.update(json.loads(user_data['user']))
+    logging.info(f"Final user_data: {user_data}")
+    return user_data
+
+def measure(name: str, validate, samples: list, iterations: int) -> float:
+    for init_data in samples:
+        validate(init_data)
+    start = time.perf_counter()
+    for i in range(iterations):
+        validate(samples[i % len(samples)])
+    elapsed = time.perf_counter() - start
+    rate = iterations / elapsed
+    print(f"{name:<34}{rate:>14,.0f}{elapsed / iterations * 1e6:>14.2f}")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="разных initData в потоке запросов")
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--log-level", default="INFO", help="уровень корневого логгера для прежней проверки")
+    args = parser.parse_args()
+
+    # Логи пишутся в /dev/null: стоимость форматирования остаётся, вывод не засоряется
+    logging.basicConfig(level=args.log_level, stream=open(os.devnull, "w"))
+
+    samples = [make_init_data(100000 + i) for i in range(args.users)]
+
+    # Проверка корректности: подпись Telegram принимается, подделка и устаревшие данные - нет
+    validator = InitDataValidator(max_age=3600, cache_size=0)
+    user = validator.validate(samples[0], BOT_TOKEN)
+    assert user["id"] == 100000 and user["username"] == "user100000"
+    for bad in (samples[0].replace("user100000", "user100001"), make_init_data(1, auth_date=int(time.time()) - 7200)):
+        try:
+            validator.validate(bad, BOT_TOKEN)
+        except InitDataError:
+            pass
+        else:
+            raise SystemExit("Подделанная или устаревшая initData прошла проверку")
+    legacy_ok = sum(
+        hmac.compare_digest(
+            hmac.new(hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest(),
+                     s.replace("&hash=" + urllib.parse.parse_qs(s)["hash"][0], "").encode(), hashlib.sha256).hexdigest(),
+            urllib.parse.parse_qs(s)["hash"][0])
+        for s in samples
+    )
+    print(f"Прежняя строка проверки совпала с подписью Telegram: {legacy_ok} из {len(samples)}")
+
+    cold = InitDataValidator(max_age=86400, cache_size=0)
+    warm = InitDataValidator(max_age=86400, cache_size=max(args.users, 1))
+    print(f"{'вариант':<34}{'проверок/с':>14}{'мкс/проверка':>14}")
+    before = measure("прежняя", legacy_validate, samples, args.iterations)
+    after_cold = measure("новая, без кэша", lambda s: cold.validate(s, BOT_TOKEN), samples, args.iterations)
+    after_warm = measure("новая, LRU проверенных", lambda s: warm.validate(s, BOT_TOKEN), samples, args.iterations)
+    print(f"Ускорение: без кэша x{after_cold / before:.1f}, с кэшем x{after_warm / before:.1f}")
+    print("LRU:", warm.snapshot())
+
+if __name__ == "__main__":
+    main()
@@ -46,6 +46,10 @@ if [ -d "frontend/build" ]; then
         echo "✅ Структура папок исправлена"
     fi
     
+    # Сжатые варианты .br/.gz и манифест хэшей для раздачи с immutable-кэшированием
+    echo "🗜️  Сжимаем статические файлы и строим манифест..."
+    python -m backend.app.services.static_assets backend/static
+
     echo "✅ Статические файлы обновлены"
     echo "📁 Проверяем структуру файлов:"
     ls -la backend/static/
@@ -135,23 +135,13 @@ const Metrics: React.FC = () => {
 
 
 
-      const [
-        overviewRes,
-        statusRes,
-        activityRes
-      ] = await Promise.all([
-        fetch(`/api/metrics/overview?${params}`),
-        fetch(`/api/metrics/status-distribution?${params}`),
-        fetch(`/api/metrics/activity-timeline?${params}`)
-      ]);
-
-      const overviewData = await overviewRes.json();
-      const statusData = await statusRes.json();
-      const activityData = await activityRes.json();
-
-      setOverview(overviewData);
-      setStatusDistribution(statusData);
-      setActivityTimeline(activityData);
+      // Все метрики дашборда одним запросом
+      const dashboardRes = await fetch(`/api/metrics/dashboard?${params}`);
+      const dashboardData = await dashboardRes.json();
+
+      setOverview(dashboardData.overview);
+      setStatusDistribution({ distribution: dashboardData.distribution });
+      setActivityTimeline({ timeline: dashboardData.timeline });
     } catch (error) {
       console.error('Ошибка загрузки метрик:', error);
     } finally {
@@ -1,6 +1,5 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from contextlib import asynccontextmanager
 import uvicorn
@@ -8,19 +7,47 @@ from dotenv import load_dotenv
 import os
 
 # Импорты для работы с Render - используем относительные импорты
-from backend.app.database import engine, Base
-from backend.app.routers import candidates, metrics, user, telegram_auth, admins, external_api
+from backend.app.database import async_engine, Base, get_pool_status
+from backend.app.cors import CORS_OPTIONS
+from backend.app.routers import candidates, metrics, user, telegram_auth, admins, external_api, changes
 from backend.app.services.telegram_service import TelegramService
 from backend.app.services.notion_service import NotionService
+from backend.app.services.search_service import install_search_index
+from backend.app.services.metrics_rollup import install_rollups
+from backend.app.services.change_log import install_change_log
+from backend.app.services.metrics_cache import get_metrics_cache_status
+from backend.app.services.auth_cache import get_auth_cache_status
+from backend.app.services.telegram_outbox import outbox_dispatcher, get_outbox_status, OUTBOX_DISPATCHER
+from backend.app.services.telegram_client import telegram_client, get_telegram_client_status
+from backend.app.services.admin_recipients import get_admin_recipients_status
+from backend.app.services.notion_sync import notion_sync_worker, get_notion_sync_status, NOTION_SYNC
+from backend.app.services.resilience import get_breakers_status
+from backend.app.services.change_stream import change_broker, get_change_stream_status
+from backend.app.services.static_assets import static_assets, get_static_assets_status
 
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    Base.metadata.create_all(bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(install_search_index)
+        await conn.run_sync(install_rollups)
+        await conn.run_sync(install_change_log)
+    static_assets.load()
+    if OUTBOX_DISPATCHER == "inline":
+        outbox_dispatcher.start()
+    if NOTION_SYNC == "inline":
+        notion_sync_worker.start()
+    change_broker.start()
     yield
     # Shutdown
+    await change_broker.stop()
+    await outbox_dispatcher.stop()
+    await notion_sync_worker.stop()
+    await telegram_client.close()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="HR Admin Panel",
@@ -29,103 +56,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS middleware - расширенные настройки для всех источников
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000", 
-        "http://localhost:3001",
-        "http://127.0.0.1:3001",
-        "http://localhost:8000",
-        "http://127.0.0.1:8000",
-        "http://localhost:8001",
-        "http://127.0.0.1:8001",
-        "https://localhost:3000",
-        "https://127.0.0.1:3000",
-        "https://localhost:3001", 
-        "https://127.0.0.1:3001",
-        "https://localhost:8000",
-        "https://127.0.0.1:8000",
-        "https://localhost:8001",
-        "https://127.0.0.1:8001",
-        "http://0.0.0.0:3000",
-        "http://0.0.0.0:3001",
-        "http://0.0.0.0:8000",
-        "http://0.0.0.0:8001",
-        "https://0.0.0.0:3000",
-        "https://0.0.0.0:3001", 
-        "https://0.0.0.0:8000",
-        "https://0.0.0.0:8001",
-        "*"  # Разрешаем все источники
-    ],
-    allow_credentials=True,
-    allow_methods=[
-        "GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"
-    ],
-    allow_headers=[
-        "Accept",
-        "Accept-Language", 
-        "Content-Language",
-        "Content-Type",
-        "Authorization",
-        "X-Requested-With",
-        "Origin",
-        "Access-Control-Request-Method",
-        "Access-Control-Request-Headers",
-        "Cache-Control",
-        "Pragma",
-        "Expires",
-        "X-CSRF-Token",
-        "X-API-Key",
-        "X-Client-Version",
-        "User-Agent",
-        "Referer",
-        "DNT",
-        "Accept-Encoding",
-        "Accept-Charset",
-        "Connection",
-        "Host",
-        "Upgrade-Insecure-Requests",
-        "Sec-Fetch-Dest",
-        "Sec-Fetch-Mode", 
-        "Sec-Fetch-Site",
-        "Sec-Fetch-User",
-        "*"  # Разрешаем все заголовки
-    ],
-    expose_headers=[
-        "Content-Length",
-        "Content-Range",
-        "X-Total-Count",
-        "X-Page-Count",
-        "X-Current-Page",
-        "X-Next-Page",
-        "X-Prev-Page",
-        "X-Total-Pages",
-        "X-Has-Next",
-        "X-Has-Prev",
-        "X-Request-ID",
-        "X-Response-Time",
-        "X-Rate-Limit-Limit",
-        "X-Rate-Limit-Remaining",
-        "X-Rate-Limit-Reset",
-        "X-Powered-By",
-        "Server",
-        "Date",
-        "ETag",
-        "Last-Modified",
-        "Cache-Control",
-        "Pragma",
-        "Expires",
-        "Access-Control-Allow-Origin",
-        "Access-Control-Allow-Methods",
-        "Access-Control-Allow-Headers",
-        "Access-Control-Allow-Credentials",
-        "Access-Control-Max-Age",
-        "Access-Control-Expose-Headers"
-    ],
-    max_age=86400,  # 24 часа кэширования preflight запросов
-)
+# CORS middleware: источники из CORS_ORIGINS сведены в одно правило при старте
+app.add_middleware(CORSMiddleware, **CORS_OPTIONS)
 
 # Подключаем роутеры
 app.include_router(candidates.router, prefix="/api/candidates", tags=["candidates"])
@@ -135,21 +67,22 @@ app.include_router(user.router, prefix="/api/user", tags=["user"])
 app.include_router(telegram_auth.router, prefix="/api/telegram", tags=["telegram"])
 app.include_router(admins.router, prefix="/api", tags=["admins"])
 app.include_router(external_api.router, prefix="/api/external", tags=["external"])
+app.include_router(changes.router, prefix="/api/changes", tags=["changes"])
 
-# Подключаем статические файлы
-app.mount("/static", StaticFiles(directory="backend/static"), name="static")
+# Подключаем статические файлы: хэшированные - immutable, остальные перепроверяются по ETag
+app.mount("/static", static_assets, name="static")
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     try:
-        return FileResponse("backend/static/index.html")
+        return static_assets.response(request.headers, "index.html")
     except FileNotFoundError:
         return {"message": "HR Admin Panel Backend API", "frontend": "not built"}
 
 @app.get("/manifest.json")
-async def manifest():
+async def manifest(request: Request):
     try:
-        return FileResponse("backend/static/manifest.json")
+        return static_assets.response(request.headers, "manifest.json")
     except FileNotFoundError:
         return {"message": "Manifest not found"}
 
@@ -176,6 +109,56 @@ async def health_check():
 async def api_health_check():
     return {"status": "healthy"}
 
+@app.get("/api/health/db-pool")
+async def db_pool_status():
+    """Статистика пула соединений текущего воркера"""
+    return get_pool_status()
+
+@app.get("/api/health/metrics-cache")
+async def metrics_cache_status():
+    """Попадания и промахи кэша метрик текущего воркера"""
+    return get_metrics_cache_status()
+
+@app.get("/api/health/auth-cache")
+async def auth_cache_status():
+    """Попадания и промахи кэша проверенных токенов текущего воркера"""
+    return get_auth_cache_status()
+
+@app.get("/api/health/telegram-outbox")
+async def telegram_outbox_status():
+    """Очередь уведомлений Telegram и счётчики диспетчера текущего воркера"""
+    return await get_outbox_status()
+
+@app.get("/api/health/telegram-client")
+async def telegram_client_status():
+    """Переиспользование соединений общего клиента Telegram текущего воркера"""
+    return get_telegram_client_status()
+
+@app.get("/api/health/admin-recipients")
+async def admin_recipients_status():
+    """Кэш получателей уведомлений администраторам текущего воркера"""
+    return get_admin_recipients_status()
+
+@app.get("/api/health/notion-sync")
+async def notion_sync_status():
+    """Водяной знак и отставание синхронизации с Notion"""
+    return await get_notion_sync_status()
+
+@app.get("/api/health/circuit-breakers")
+async def circuit_breakers_status():
+    """Состояние выключателей внешних интеграций текущего воркера"""
+    return get_breakers_status()
+
+@app.get("/api/health/change-stream")
+async def change_stream_status():
+    """Подписчики и транспорт потока изменений текущего воркера"""
+    return get_change_stream_status()
+
+@app.get("/api/health/static-assets")
+async def static_assets_status():
+    """Манифест сборки фронтенда и счётчики раздачи статики текущего воркера"""
+    return get_static_assets_status()
+
 @app.get("/api/")
 async def api_root():
     return {"message": "HR Admin Panel API", "version": "1.0.0"}
@@ -187,14 +170,14 @@ async def options_handler(full_path: str):
 
 # Catch-all route для SPA
 @app.get("/{full_path:path}")
-async def catch_all(full_path: str):
+async def catch_all(full_path: str, request: Request):
     # Если это API запрос, возвращаем 404
     if full_path.startswith("api/"):
         raise HTTPException(status_code=404, detail="API endpoint not found")
     
     # Для всех остальных путей возвращаем index.html
     try:
-        return FileResponse("backend/static/index.html")
+        return static_assets.response(request.headers, "index.html")
     except FileNotFoundError:
         return {"message": "Frontend not built", "api_docs": "/docs"}
 
@@ -11,4 +11,6 @@ cd ..
 
 # Запускаем Gunicorn с ASGI worker
 echo "🌐 Запускаем Gunicorn с UvicornWorker..."
-gunicorn -w 4 -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT app:application 
\ No newline at end of file
+# Число воркеров экспортируется, чтобы пул соединений БД делился между ними
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-4}
+gunicorn -w $WEB_CONCURRENCY -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT app:application 
\ No newline at end of file